@@ -6,7 +6,7 @@
 
 # 导入endpoints子包，使其可以通过app.api.endpoints访问
 from fastapi import APIRouter
-from app.api.endpoints import auth, users, files, quizzes, chat
+from app.api.endpoints import auth, users, files, quizzes, chat, jobs
 
 api_router = APIRouter()
 
@@ -14,4 +14,5 @@ api_router.include_router(auth.router, prefix="/auth", tags=["auth"])
 api_router.include_router(users.router, prefix="/users", tags=["users"])
 api_router.include_router(files.router, prefix="/files", tags=["files"])
 api_router.include_router(quizzes.router, prefix="/quizzes", tags=["quizzes"])
-api_router.include_router(chat.router, prefix="/chat", tags=["chat"])
\ No newline at end of file
+api_router.include_router(chat.router, prefix="/chat", tags=["chat"])
+api_router.include_router(jobs.router, prefix="/jobs", tags=["jobs"])
\ No newline at end of file
@@ -1,10 +1,10 @@
 # app/api/endpoints/auth.py
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import timedelta
 
-from app.db.base import get_db
+from app.db.base import get_async_db
 from app.schemas.auth import Token
 from app.schemas.user import UserCreate, UserResponse
 from app.services.auth_service import AuthService
@@ -13,9 +13,9 @@ from app.config import settings
 router = APIRouter()
 
 @router.post("/register", response_model=UserResponse)
-def register(
+async def register(
     user_in: UserCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     注册新用户
@@ -24,15 +24,15 @@ def register(
     - **password**: 密码
     - **name**: 姓名（可选）
     
-    返回创建的用户信息（不包含密码）
+    返回创建的用户信息（不包含密码）；密码哈希队列已满时返回 503 和 Retry-After
     """
-    return AuthService.create_user(db, user_in)
+    return await AuthService.register(db, user_in)
 
 
 @router.post("/login", response_model=Token)
-def login(
+async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     用户登录
@@ -40,9 +40,9 @@ def login(
     - **username**: 用户名（邮箱）
     - **password**: 密码
     
-    返回访问令牌
+    返回访问令牌；密码哈希队列已满时返回 503 和 Retry-After
     """
-    user = AuthService.authenticate_user(db, form_data.username, form_data.password)
+    user = await AuthService.login(db, form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -1,64 +1,64 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Body
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, status, Body
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
-from pydantic import BaseModel
-from uuid import uuid4
 
-from app.db.base import get_db
+from app.db.base import get_async_db
 from app.services.auth_service import AuthService
 from app.db.models.user import User
-from app.schemas.chat import ChatRequest, ChatResponse, ConversationCreate, ConversationResponse
+from app.schemas.chat import ChatRequest, ChatResponse, ConversationCreate, ConversationResponse, MessagePage
+from app.services.chat_service import ChatService
 
 router = APIRouter()
 
 @router.post("/{bank_id}/{conversation_id}", response_model=ChatResponse)
 async def chat_with_bank(
     bank_id: int,
+    background_tasks: BackgroundTasks,
     conversation_id: Optional[str] = None,
     chat_request: ChatRequest = Body(...),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(AuthService.get_current_active_user)
 ):
     """
     与特定知识库的特定对话进行交互
     - bank_id: 知识库ID
-    - conversation_id: 对话ID (可选，如果不提供则创建新对话)
+    - conversation_id: 对话ID (不存在时创建新对话，新ID随回复返回)
     - message: 用户发送的消息
     """
-    # 验证知识库是否存在
-    # TODO: 添加知识库验证逻辑
-    
-    # 处理对话ID
-    if not conversation_id:
-        # 创建新对话
-        conversation_id = str(uuid4())
-        # TODO: 在数据库中创建新对话记录
-        print(f"创建新对话: {conversation_id}")
-    else:
-        # 验证对话是否存在且属于当前用户
-        # TODO: 添加对话验证逻辑
-        print(f"使用现有对话: {conversation_id}")
-    
-    # 处理用户消息并生成回复
-    # TODO: 添加消息处理逻辑，考虑对话历史
-    
-    # 示例回复
-    response = {
-        "message_id": f"msg_{uuid4()}",
-        "conversation_id": conversation_id,
-        "content": f"这是来自知识库 {bank_id} 的回复: {chat_request.message}",
-        "created_at": "2023-05-19T10:30:00Z"
-    }
-    
-    # 保存对话历史
-    # TODO: 添加对话历史保存逻辑
-    
+    turn = await ChatService.prepare_turn(db, bank_id, conversation_id, chat_request.message, current_user)
+    response = await ChatService.reply(turn)
+    # 回复发出后再把滑出窗口的历史并入摘要
+    background_tasks.add_task(ChatService.compact, turn.conversation_id)
     return response
 
+@router.post("/{bank_id}/{conversation_id}/stream")
+async def stream_chat_with_bank(
+    bank_id: int,
+    conversation_id: str,
+    chat_request: ChatRequest = Body(...),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(AuthService.get_current_active_user)
+):
+    """
+    流式版本的对话接口（Server-Sent Events）
+
+    依次推送 start、delta（回复片段）、done（完整回复）事件，出错时推送 error。
+    客户端断开连接会取消上游模型调用。响应结束后在后台压缩滚动摘要。
+    """
+    turn = await ChatService.prepare_turn(db, bank_id, conversation_id, chat_request.message, current_user)
+    return StreamingResponse(
+        ChatService.stream_reply(turn),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(ChatService.compact, turn.conversation_id),
+    )
+
 @router.post("/conversations", response_model=ConversationResponse)
 async def create_conversation(
     conversation: ConversationCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(AuthService.get_current_active_user)
 ):
     """
@@ -66,96 +66,49 @@ async def create_conversation(
     - bank_id: 知识库ID
     - title: 对话标题
     """
-    # 验证知识库是否存在
-    # TODO: 添加知识库验证逻辑
-    
-    # 创建新对话
-    conversation_id = str(uuid4())
-    
-    # TODO: 在数据库中创建新对话记录
-    
-    # 示例响应
-    response = {
-        "id": conversation_id,
-        "bank_id": conversation.bank_id,
-        "user_id": current_user.id,
-        "title": conversation.title,
-        "created_at": "2023-05-19T10:30:00Z",
-        "updated_at": "2023-05-19T10:30:00Z"
-    }
-    
-    return response
+    return await ChatService.create_conversation(db, conversation.bank_id, conversation.title, current_user)
 
 @router.get("/conversations", response_model=List[ConversationResponse])
 async def get_user_conversations(
     bank_id: Optional[int] = None,
     skip: int = 0,
-    limit: int = 20,
-    db: Session = Depends(get_db),
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(AuthService.get_current_active_user)
 ):
     """
-    获取用户的所有对话
+    获取用户的所有对话（按最近更新排序）
     - bank_id: 可选，过滤特定知识库的对话
     """
-    # TODO: 实现获取用户对话列表的逻辑
-    
-    # 示例响应
-    conversations = [
-        {
-            "id": f"conv_{i}",
-            "bank_id": bank_id or i,
-            "user_id": current_user.id,
-            "title": f"对话 {i}",
-            "created_at": "2023-05-19T10:30:00Z",
-            "updated_at": "2023-05-19T10:30:00Z"
-        }
-        for i in range(1, 4)
-    ]
-    
-    return conversations
+    return await ChatService.list_conversations(db, current_user, bank_id, skip, limit)
 
 @router.get("/conversations/{conversation_id}", response_model=ConversationResponse)
 async def get_conversation(
     conversation_id: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(AuthService.get_current_active_user)
 ):
-    """获取特定对话的详情"""
-    # TODO: 实现获取特定对话详情的逻辑
-    
-    # 示例响应
-    response = {
-        "id": conversation_id,
-        "bank_id": 1,
-        "user_id": current_user.id,
-        "title": f"对话 {conversation_id}",
-        "created_at": "2023-05-19T10:30:00Z",
-        "updated_at": "2023-05-19T10:30:00Z",
-        "messages": [
-            {
-                "id": f"msg_1_{conversation_id}",
-                "role": "user",
-                "content": "这是用户的问题",
-                "created_at": "2023-05-19T10:30:00Z"
-            },
-            {
-                "id": f"msg_2_{conversation_id}",
-                "role": "assistant",
-                "content": "这是助手的回答",
-                "created_at": "2023-05-19T10:31:00Z"
-            }
-        ]
-    }
-    
-    return response
+    """获取特定对话的详情及最近一页消息"""
+    return await ChatService.get_conversation_detail(db, conversation_id, current_user)
+
+@router.get("/conversations/{conversation_id}/messages", response_model=MessagePage)
+async def get_conversation_messages(
+    conversation_id: str,
+    before: Optional[str] = Query(None, description="分页游标：上一页返回的 next_before"),
+    limit: int = Query(50, ge=1, le=200),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(AuthService.get_current_active_user)
+):
+    """
+    分页获取对话消息，从最新的一页开始往前翻
+    """
+    return await ChatService.list_messages(db, conversation_id, current_user, before, limit)
 
 @router.delete("/conversations/{conversation_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_conversation(
     conversation_id: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(AuthService.get_current_active_user)
 ):
     """删除特定对话"""
-    # TODO: 实现删除对话的逻辑
-    return None
+    await ChatService.delete_conversation(db, conversation_id, current_user)
@@ -1,47 +1,83 @@
 # app/api/endpoints/files.py
-from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, status, BackgroundTasks
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 
-from app.db.base import get_db
+from app.db.base import get_async_db
 from app.db.models.user import User
 from app.services.auth_service import AuthService
 from app.services.file_service import FileService
-from app.schemas.file import FileResponse
+from app.services.parse_service import ParseService, PENDING, FAILED
+from app.schemas.file import FileResponse, FileParseStatus
 
 router = APIRouter()
 
 @router.post("/upload/{bank_id}", response_model=FileResponse)
 async def upload_file(
     bank_id: int,
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(AuthService.get_current_active_user)
 ):
     """
     上传文件到指定题库
+    
+    上传完成后在后台解析文件内容，解析进度通过 GET /files/{file_id}/parse 查询
     """
-    return await FileService.upload_file(db, file, bank_id, current_user)
+    result = await FileService.upload_file(db, file, bank_id, current_user)
+    background_tasks.add_task(ParseService.parse_file, result["id"])
+    return result
 
 @router.get("/bank/{bank_id}", response_model=List[FileResponse])
 async def get_files_by_bank(
     bank_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(AuthService.get_current_active_user)
 ):
     """
     获取指定题库的所有文件
     """
-    return FileService.get_files_by_bank(db, bank_id, current_user)
+    return await FileService.get_files_by_bank(db, bank_id, current_user)
 
 @router.delete("/{file_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_file(
     file_id: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(AuthService.get_current_active_user)
 ):
     """
     删除文件
     """
-    FileService.delete_file(db, file_id, current_user)
-    return None
\ No newline at end of file
+    await FileService.delete_file(db, file_id, current_user)
+    return None
+
+@router.get("/{file_id}/parse", response_model=FileParseStatus)
+async def get_parse_status(
+    file_id: str,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(AuthService.get_current_active_user)
+):
+    """
+    获取文件解析状态（pending, processing, done, failed, skipped）
+    """
+    file = await FileService.get_file(db, file_id, current_user)
+    return await ParseService.get_status(db, file)
+
+@router.post("/{file_id}/parse", response_model=FileParseStatus, status_code=status.HTTP_202_ACCEPTED)
+async def retry_parse(
+    file_id: str,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(AuthService.get_current_active_user)
+):
+    """
+    重新解析失败的文件
+    """
+    file = await FileService.get_file(db, file_id, current_user)
+    if file.parse_status == FAILED:
+        file.parse_status = PENDING
+        file.parse_error = None
+        await db.commit()
+        background_tasks.add_task(ParseService.parse_file, file.id)
+    return await ParseService.get_status(db, file)
\ No newline at end of file
@@ -0,0 +1,87 @@
+# app/api/endpoints/jobs.py
+from fastapi import APIRouter, Depends, Query, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+
+from app.db.base import get_async_db
+from app.db.models.user import User
+from app.services.auth_service import AuthService
+from app.services.job_service import JobService
+from app.schemas.job import Job as JobSchema, JobCreate
+
+router = APIRouter()
+
+
+@router.post("", response_model=JobSchema, status_code=status.HTTP_202_ACCEPTED)
+async def submit_job(
+    job_in: JobCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(AuthService.get_current_active_user)
+):
+    """
+    提交后台任务
+
+    - **kind**: 任务类型（generate_questions, parse_file）
+    - **payload**: 任务参数
+    - **priority**: 优先级，越大越先执行
+
+    立即返回任务ID，通过 GET /jobs/{job_id} 或 GET /jobs/{job_id}/events 获取进度
+    """
+    return await JobService.submit(db, current_user, job_in.kind, job_in.payload, job_in.priority)
+
+
+@router.get("", response_model=List[JobSchema])
+async def list_jobs(
+    status: Optional[str] = Query(None, description="按状态过滤"),
+    limit: int = Query(50, ge=1, le=200),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(AuthService.get_current_active_user)
+):
+    """
+    获取当前用户最近的任务
+    """
+    return await JobService.list_jobs(db, current_user, status, limit)
+
+
+@router.get("/{job_id}", response_model=JobSchema)
+async def get_job(
+    job_id: str,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(AuthService.get_current_active_user)
+):
+    """
+    获取任务状态、进度和结果
+    """
+    return await JobService.get_job(db, job_id, current_user)
+
+
+@router.get("/{job_id}/events")
+async def job_events(
+    job_id: str,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(AuthService.get_current_active_user)
+):
+    """
+    订阅任务进度（Server-Sent Events），任务结束后连接关闭
+    """
+    await JobService.get_job(db, job_id, current_user)
+    return StreamingResponse(
+        JobService.events(job_id, current_user),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"}
+    )
+
+
+@router.post("/{job_id}/cancel", response_model=JobSchema)
+async def cancel_job(
+    job_id: str,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(AuthService.get_current_active_user)
+):
+    """
+    取消任务
+
+    排队中的任务立即取消；运行中的任务会在下一次进度汇报或心跳时中止
+    """
+    return await JobService.cancel(db, job_id, current_user)
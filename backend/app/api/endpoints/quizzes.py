@@ -1,23 +1,59 @@
 # app/api/endpoints/quizzes.py
-from fastapi import APIRouter, Depends, HTTPException, status, Query, Path, Body
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Path, Body, Request, Response
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime
+from typing import Dict, List, Literal, Optional, Union
 
+from app.api.responses import FastJSONResponse, JSONSerializer
 from app.services.auth_service import AuthService
-from app.db.base import get_db
+from app.db.base import get_db, get_async_db
 from app.db.models.user import User
 from app.services.quiz_service import QuizService
+from app.services.bank_version import bank_etag, http_date
+from app.services.import_service import ImportService, IMPORT_FORMATS
+from app.services.generation_service import GenerationService
+from app.services.job_service import JobService
+from app.services.search_service import SearchService
+from app.services.grading_service import GradingService
+from app.services.quiz_paper import QuizPaperService
 from app.schemas.quiz import (
     QuestionBank as QuestionBankSchema,
-    QuestionBankCreate, QuestionBankUpdate,
+    QuestionBankCreate, QuestionBankUpdate, QuestionBankSummary,
     Question as QuestionSchema,
     QuestionCreate, QuestionUpdate,
     Quiz as QuizSchema,
-    QuizCreate, QuizUpdate,
-    QuizSubmissionCreate
+    QuizCreate, QuizUpdate, QuizPaper,
+    QuizSubmissionCreate, QuizSubmissionResult,
+    QuestionImportResult,
+    QuestionGenerateRequest, QuestionGenerateResult,
+    QuestionSearchHit, QuestionDuplicate, DifficultyEnum
 )
+from app.schemas.job import Job as JobSchema
+
+router = APIRouter(default_response_class=FastJSONResponse)
+
+# 大列表响应的预编译序列化器
+BANK_JSON = JSONSerializer(QuestionBankSchema)
+BANK_LIST_JSON = JSONSerializer(List[QuestionBankSchema])
+BANK_SUMMARY_LIST_JSON = JSONSerializer(List[QuestionBankSummary])
+QUESTION_LIST_JSON = JSONSerializer(List[QuestionSchema])
+SEARCH_HIT_LIST_JSON = JSONSerializer(List[QuestionSearchHit])
+
+
+def _validators(etag: str, last_modified: datetime) -> Dict[str, str]:
+    """条件 GET 的响应头；no-cache 让客户端每次带 If-None-Match 重新验证"""
+    return {"ETag": etag, "Last-Modified": http_date(last_modified), "Cache-Control": "private, no-cache"}
+
+
+def _not_modified(request: Request, etag: str) -> bool:
+    """If-None-Match 是否命中（按弱比较，忽略 W/ 前缀）"""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in [tag[2:] if tag.startswith("W/") else tag for tag in tags]
 
-router = APIRouter()
 
 # ==================== 题库管理 ====================
 
@@ -40,28 +76,42 @@ def create_question_bank(
     return QuizService.create_question_bank(db, bank_in, current_user)
 
 
-@router.get("/banks", response_model=List[QuestionBankSchema])
+@router.get("/banks", response_model=Union[List[QuestionBankSummary], List[QuestionBankSchema]])
 def list_question_banks(
-    skip: int = 0,
-    limit: int = 100,
+    view: Literal["summary", "full"] = "summary",
+    after_id: Optional[int] = Query(None, description="上一页最后一个题库的ID"),
+    limit: int = Query(100, ge=1, le=500),
     db: Session = Depends(get_db),
     current_user: User = Depends(AuthService.get_current_active_user)
 ):
     """
     获取题库列表
     
-    获取当前用户创建的所有题库
+    获取当前用户创建的所有题库，按ID升序做键集分页
     
-    - **skip**: 跳过的记录数（分页用）
+    - **view**: summary 只返回问题数量、难度分布等摘要；full 返回包含全部问题的完整题库
+    - **after_id**: 从该ID之后开始返回（分页用）
     - **limit**: 返回的最大记录数（分页用）
     
-    返回题库列表
+    返回题库列表；如果还有下一页，响应头 X-Next-Cursor 给出下一页的 after_id
     """
-    return QuizService.list_question_banks(db, current_user, skip, limit)
+    if view == "full":
+        banks = QuizService.list_question_banks(db, current_user, after_id, limit)
+        serializer = BANK_LIST_JSON
+    else:
+        banks = QuizService.list_question_bank_summaries(db, current_user, after_id, limit)
+        serializer = BANK_SUMMARY_LIST_JSON
+    
+    headers = {}
+    if len(banks) == limit:
+        last = banks[-1]
+        headers["X-Next-Cursor"] = str(last["id"] if isinstance(last, dict) else last.id)
+    return serializer.response(banks, headers=headers)
 
 
 @router.get("/banks/{bank_id}", response_model=QuestionBankSchema)
 def get_question_bank(
+    request: Request,
     bank_id: int = Path(..., title="题库ID", description="要获取的题库的ID"),
     db: Session = Depends(get_db),
     current_user: User = Depends(AuthService.get_current_active_user)
@@ -73,9 +123,13 @@ def get_question_bank(
     
     - **bank_id**: 题库ID
     
-    返回题库详情，包括题库中的问题
+    返回题库详情，包括题库中的问题；带 If-None-Match 且题库未变化时返回 304
     """
-    return QuizService.get_question_bank(db, bank_id, current_user)
+    version, updated_at = QuizService.get_bank_version(db, bank_id, current_user)
+    headers = _validators(bank_etag(bank_id, version, "detail"), updated_at)
+    if _not_modified(request, headers["ETag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return BANK_JSON.response(QuizService.get_question_bank(db, bank_id, current_user), headers=headers)
 
 
 @router.put("/banks/{bank_id}", response_model=QuestionBankSchema)
@@ -100,9 +154,9 @@ def update_question_bank(
 
 
 @router.delete("/banks/{bank_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_question_bank(
+async def delete_question_bank(
     bank_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(AuthService.get_current_active_user)
 ):
     """
@@ -114,7 +168,7 @@ def delete_question_bank(
     
     无返回内容
     """
-    QuizService.delete_question_bank(db, bank_id, current_user)
+    await QuizService.delete_question_bank(db, bank_id, current_user)
     return None
 
 
@@ -124,6 +178,8 @@ def delete_question_bank(
 def create_question(
     bank_id: int,
     question_in: QuestionCreate,
+    response: Response,
+    reject_duplicates: bool = Query(False, description="题库中已有近似重复的问题时返回 409"),
     db: Session = Depends(get_db),
     current_user: User = Depends(AuthService.get_current_active_user)
 ):
@@ -138,14 +194,102 @@ def create_question(
     - **explanation**: 解释（可选）
     - **difficulty**: 难度（easy, medium, hard）
     - **options**: 选项列表（可选）
+    - **reject_duplicates**: 为真时拒绝近似重复的问题，否则照常创建并在 X-Duplicate-Of 头中列出重复问题的ID
     
     返回创建的问题信息
     """
+    duplicates = QuizService.check_duplicates(db, bank_id, question_in.prompt, current_user, reject=reject_duplicates)
+    if duplicates:
+        response.headers["X-Duplicate-Of"] = ",".join(str(question_id) for question_id, _ in duplicates)
     return QuizService.create_question(db, bank_id, question_in, current_user)
 
 
+@router.post("/banks/{bank_id}/questions/import", response_model=QuestionImportResult)
+async def import_questions(
+    bank_id: int,
+    request: Request,
+    format: Optional[str] = Query(None, description="jsonl 或 csv，默认按 Content-Type 判断"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(AuthService.get_current_active_user)
+):
+    """
+    批量导入问题
+    
+    请求体为 JSON Lines（每行一个问题对象）或带表头的 CSV，按流读取并分批写入
+    
+    - **bank_id**: 题库ID
+    - **format**: 导入格式（jsonl, csv）
+    
+    返回导入结果，包括逐行错误和吞吐量
+    """
+    if format is None:
+        content_type = request.headers.get("content-type", "")
+        format = "csv" if "csv" in content_type else "jsonl"
+    return await ImportService.import_questions(
+        db, bank_id, request.stream(), format, current_user
+    )
+
+
+@router.post("/banks/{bank_id}/questions/import/jobs", response_model=JobSchema, status_code=status.HTTP_202_ACCEPTED)
+async def import_questions_job(
+    bank_id: int,
+    request: Request,
+    format: Optional[str] = Query(None, description="jsonl 或 csv，默认按 Content-Type 判断"),
+    priority: int = Query(0, ge=-100, le=100),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(AuthService.get_current_active_user)
+):
+    """
+    以后台任务方式批量导入问题
+    
+    请求体先写入暂存文件，导入在任务队列中执行；返回任务，通过 /jobs/{job_id} 查询进度和结果
+    """
+    if format is None:
+        content_type = request.headers.get("content-type", "")
+        format = "csv" if "csv" in content_type else "jsonl"
+    if format not in IMPORT_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"不支持的导入格式，可选: {', '.join(IMPORT_FORMATS)}"
+        )
+    await ImportService.check_bank(db, bank_id, current_user)
+    path = await ImportService.spool_body(request.stream())
+    return await JobService.submit(
+        db, current_user, "import_questions",
+        {"bank_id": bank_id, "format": format, "path": path},
+        priority=priority, internal=True
+    )
+
+
+@router.post("/banks/{bank_id}/questions/generate", response_model=QuestionGenerateResult)
+async def generate_questions(
+    bank_id: int,
+    generate_in: QuestionGenerateRequest,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(AuthService.get_current_active_user)
+):
+    """
+    根据文件生成问题
+    
+    把已解析文件的文本分块并发交给 LLM 生成问题，每完成一块就去重并写入题库
+    
+    - **bank_id**: 题库ID
+    - **file_id**: 已完成解析的文件ID
+    - **num_questions**: 生成的问题总数，按块大小分配
+    - **bypass_cache**: 跳过生成缓存，重新生成
+    
+    返回生成、写入、去重的数量
+    """
+    return await GenerationService.generate_from_file(
+        db, bank_id, generate_in.file_id, generate_in.num_questions, current_user,
+        question_type=generate_in.question_type,
+        bypass_cache=generate_in.bypass_cache
+    )
+
+
 @router.get("/banks/{bank_id}/questions", response_model=List[QuestionSchema])
 def list_questions(
+    request: Request,
     bank_id: int,
     skip: int = 0,
     limit: int = 100,
@@ -161,9 +305,74 @@ def list_questions(
     - **skip**: 跳过的记录数（分页用）
     - **limit**: 返回的最大记录数（分页用）
     
-    返回问题列表
+    返回问题列表；带 If-None-Match 且题库未变化时返回 304
     """
-    return QuizService.list_questions(db, bank_id, current_user, skip, limit)
+    version, updated_at = QuizService.get_bank_version(db, bank_id, current_user)
+    headers = _validators(bank_etag(bank_id, version, "questions", skip=skip, limit=limit), updated_at)
+    if _not_modified(request, headers["ETag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return QUESTION_LIST_JSON.response(QuizService.list_questions(db, bank_id, current_user, skip, limit), headers=headers)
+
+
+@router.get("/banks/{bank_id}/questions/duplicates", response_model=List[QuestionDuplicate])
+def find_duplicate_questions(
+    bank_id: int,
+    prompt: str = Query(..., min_length=1, description="待检查的题干"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(AuthService.get_current_active_user)
+):
+    """
+    检查近似重复
+    
+    返回题库中与给定题干近似重复的问题（题干字符 3-gram 的 MinHash 相似度），按相似度降序
+    """
+    return [
+        QuestionDuplicate(question_id=question_id, similarity=score)
+        for question_id, score in QuizService.check_duplicates(db, bank_id, prompt, current_user)
+    ]
+
+
+@router.post("/banks/{bank_id}/questions/dedup/jobs", response_model=JobSchema, status_code=status.HTTP_202_ACCEPTED)
+async def dedup_questions_job(
+    bank_id: int,
+    threshold: Optional[float] = Query(None, gt=0, le=1, description="相似度阈值，默认使用服务端配置"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(AuthService.get_current_active_user)
+):
+    """
+    以后台任务方式查找题库中的近似重复问题
+    
+    任务结果中的 clusters 为近似重复的问题ID分组；不会删除任何问题
+    """
+    return await JobService.submit(
+        db, current_user, "dedup_bank", {"bank_id": bank_id, "threshold": threshold}
+    )
+
+
+@router.get("/questions/search", response_model=List[QuestionSearchHit])
+async def search_questions(
+    q: str = Query(..., min_length=1, max_length=200, description="检索词"),
+    bank_id: Optional[int] = Query(None, description="只在指定题库中检索"),
+    difficulty: Optional[DifficultyEnum] = Query(None, description="按难度过滤"),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(AuthService.get_current_active_user)
+):
+    """
+    全文检索问题
+    
+    在当前用户的题库中检索题干、答案、解析和选项，按相关度排序
+    
+    - **q**: 检索词，所有词都需要命中
+    - **bank_id**: 可选，限定题库
+    - **difficulty**: 可选，限定难度
+    
+    返回问题、相关度分数和高亮摘要（命中词以 <mark> 标出）
+    """
+    return SEARCH_HIT_LIST_JSON.response(
+        await SearchService.search_questions(db, current_user, q, bank_id, difficulty, skip, limit)
+    )
 
 
 @router.get("/questions/{question_id}", response_model=QuestionSchema)
@@ -240,11 +449,53 @@ def create_quiz(
     创建一个新的测验
     
     - **bank_id**: 题库ID
-    - **name**: 测验名称
-    - **description**: 测验描述（可选）
-    - **time_limit**: 时间限制（分钟，可选）
-    - **question_count**: 问题数量（可选）
+    - **title**: 测验名称
+    - **duration_seconds**: 时间限制（秒）
+    - **question_count**: 随机抽取的问题数量（可选）
+    - **difficulty_counts**: 按难度分层抽取的数量（可选）
     
     返回创建的测验信息
     """
-    return QuizService.create_quiz(db, quiz_in, current_user)
\ No newline at end of file
+    return QuizService.create_quiz(db, quiz_in, current_user)
+
+
+@router.get("/quizzes/{quiz_id}/paper", response_model=QuizPaper)
+async def get_quiz_paper(
+    quiz_id: int,
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(AuthService.get_current_active_user)
+):
+    """
+    获取作答用的试卷
+    
+    不包含答案、解析和正确选项；测验设置了 random_order 时，
+    每位考生的题目顺序固定但彼此不同；带 If-None-Match 且题目未变化时返回 304
+    
+    - **quiz_id**: 测验ID
+    """
+    paper = await QuizPaperService.get_paper(db, quiz_id)
+    headers = _validators(paper.etag(current_user.id), paper.updated_at)
+    if _not_modified(request, headers["ETag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=paper.render(current_user.id), media_type="application/json", headers=headers)
+
+
+@router.post("/quizzes/{quiz_id}/submissions", response_model=QuizSubmissionResult, status_code=status.HTTP_201_CREATED)
+async def submit_quiz(
+    quiz_id: int,
+    submission_in: QuizSubmissionCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(AuthService.get_current_active_user)
+):
+    """
+    提交测验答案
+    
+    由服务端按标准答案判分并保存提交记录
+    
+    - **quiz_id**: 测验ID
+    - **answers**: 以问题ID为键的答案，值为选项ID、选项ID列表（多选）或文本答案
+    
+    返回分数（百分制）、答对数量和每道题的判分结果
+    """
+    return await GradingService.submit(db, quiz_id, submission_in.answers, current_user)
@@ -0,0 +1,48 @@
+# app/api/responses.py
+from typing import Any, Generic, Optional, TypeVar
+
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+try:  # 编码普通 dict / list 响应（已列入 requirements.txt，缺失时退回标准库 json）
+    import orjson
+except ImportError:  # pragma: no cover - 取决于部署环境
+    orjson = None
+
+T = TypeVar("T")
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    content 为 bytes 时视为已序列化的 JSON 原样输出；
+    否则优先用 orjson 编码，未安装时退回标准库 json
+    """
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        if orjson is not None:
+            return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+        return super().render(content)
+
+
+class JSONSerializer(Generic[T]):
+    """
+    预编译的响应序列化器
+
+    TypeAdapter 在导入时构建一次；请求中直接从 ORM 对象、Row 或字典（from_attributes）
+    校验并由 pydantic-core 输出 JSON 字节，绕过 FastAPI 逐字段校验 + jsonable_encoder + json.dumps
+    的通用路径。端点仍声明 response_model 用于生成文档
+    """
+
+    def __init__(self, type_: Any):
+        self.adapter: TypeAdapter[T] = TypeAdapter(type_)
+
+    def validate(self, value: Any) -> T:
+        return self.adapter.validate_python(value, from_attributes=True)
+
+    def dump(self, value: Any) -> bytes:
+        return self.adapter.dump_json(self.validate(value))
+
+    def response(self, value: Any, status_code: int = 200, headers: Optional[dict] = None) -> FastJSONResponse:
+        return FastJSONResponse(self.dump(value), status_code=status_code, headers=headers)
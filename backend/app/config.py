@@ -9,19 +9,110 @@ class Settings(BaseSettings):
     
     # 数据库配置
     DATABASE_URL: str = os.getenv("DATABASE_URL", "postgresql://zjc:123456@db:5432/aiquiz")
+    DB_ECHO: bool = os.getenv("DB_ECHO", "false").lower() == "true"
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+    DB_POOL_TIMEOUT: int = int(os.getenv("DB_POOL_TIMEOUT", "30"))  # 等待连接的秒数
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+    DB_STATEMENT_TIMEOUT_MS: int = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "30000"))  # 0 表示不限制
     
     # JWT配置
     SECRET_KEY: str = os.getenv("SECRET_KEY", "your-secret-key-here")
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
-    
+
+    # 密码哈希配置
+    BCRYPT_ROUNDS: int = int(os.getenv("BCRYPT_ROUNDS", "12"))  # 修改后已有用户在下次登录时按新成本重新哈希
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 2)))
+    PASSWORD_HASH_MAX_PENDING: int = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "64"))  # 执行中加排队中的上限，超出返回 503
+
+    # 认证主体缓存配置（0 表示禁用）
+    PRINCIPAL_CACHE_SIZE: int = int(os.getenv("PRINCIPAL_CACHE_SIZE", "1024"))
+    PRINCIPAL_CACHE_TTL_SECONDS: int = int(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "60"))
+
     # LLM配置
     LLM_API_KEY: Optional[str] = os.getenv("LLM_API_KEY")
     LLM_MODEL: str = os.getenv("LLM_MODEL", "gpt-3.5-turbo")
+    LLM_BASE_URL: str = os.getenv("LLM_BASE_URL", "https://api.openai.com/v1")
+    LLM_TIMEOUT_SECONDS: float = float(os.getenv("LLM_TIMEOUT_SECONDS", "60"))
+    LLM_CONNECT_TIMEOUT_SECONDS: float = float(os.getenv("LLM_CONNECT_TIMEOUT_SECONDS", "5"))
+    LLM_MAX_CONNECTIONS: int = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+    LLM_MAX_KEEPALIVE_CONNECTIONS: int = int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "10"))
+    LLM_KEEPALIVE_EXPIRY_SECONDS: float = float(os.getenv("LLM_KEEPALIVE_EXPIRY_SECONDS", "30"))
+    LLM_MAX_CONCURRENCY: int = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))  # 同时进行的请求数上限
+    LLM_MAX_RETRIES: int = int(os.getenv("LLM_MAX_RETRIES", "3"))
+    LLM_BACKOFF_BASE_SECONDS: float = float(os.getenv("LLM_BACKOFF_BASE_SECONDS", "0.5"))
+    LLM_BACKOFF_MAX_SECONDS: float = float(os.getenv("LLM_BACKOFF_MAX_SECONDS", "20"))
+
+    # LLM 生成结果缓存（SQLite 文件，0 表示禁用）
+    LLM_CACHE_PATH: str = os.getenv("LLM_CACHE_PATH", "./cache/llm_generations.sqlite3")
+    LLM_CACHE_SIZE: int = int(os.getenv("LLM_CACHE_SIZE", "10000"))
+    LLM_CACHE_TTL_SECONDS: int = int(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
     
     # 文件上传配置
     UPLOAD_DIRECTORY: str = os.getenv("UPLOAD_DIRECTORY", "./uploads")
+    # 按内容哈希保存的上传文件，不能放在 UPLOAD_DIRECTORY 下（该目录以 /uploads 公开挂载）
+    BLOB_DIRECTORY: str = os.getenv("BLOB_DIRECTORY", "./blobs")
+    BLOB_LOCK_POLL_SECONDS: float = 0.02  # 等待其它进程释放 blob 文件锁的轮询间隔
     MAX_UPLOAD_SIZE: int = 10 * 1024 * 1024  # 10MB
+    UPLOAD_CHUNK_SIZE: int = 1024 * 1024  # 流式写入的块大小 1MB
+
+    # 文档解析配置
+    PARSE_MAX_WORKERS: int = int(os.getenv("PARSE_MAX_WORKERS", "2"))  # 解析进程池大小
+    PARSE_CHUNK_TOKENS: int = int(os.getenv("PARSE_CHUNK_TOKENS", "500"))  # 每个文本块的 token 上限
+    PARSE_STALE_SECONDS: float = float(os.getenv("PARSE_STALE_SECONDS", "600"))  # 解析中超过该时长视为解析进程已退出
+
+    # 基于文件生成问题的配置
+    GENERATION_CHUNK_TOKENS: int = int(os.getenv("GENERATION_CHUNK_TOKENS", "2000"))  # 每次 LLM 调用的内容 token 上限
+    GENERATION_MAX_CONCURRENCY: int = int(os.getenv("GENERATION_MAX_CONCURRENCY", "4"))  # 单次生成同时进行的 LLM 调用数
+    GENERATION_DEDUP_THRESHOLD: float = float(os.getenv("GENERATION_DEDUP_THRESHOLD", "0.8"))  # 题干相似度超过该值视为重复
+
+    # 后台任务队列配置
+    JOB_WORKERS: int = int(os.getenv("JOB_WORKERS", "4"))  # 每个进程的工作协程数
+    JOB_MAX_PER_USER: int = int(os.getenv("JOB_MAX_PER_USER", "2"))  # 每个用户同时运行的任务数上限
+    JOB_MAX_ATTEMPTS: int = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))  # 可重试任务的最大执行次数
+    JOB_POLL_INTERVAL_SECONDS: float = float(os.getenv("JOB_POLL_INTERVAL_SECONDS", "2"))
+    JOB_HEARTBEAT_SECONDS: float = float(os.getenv("JOB_HEARTBEAT_SECONDS", "10"))
+    JOB_STALE_SECONDS: float = float(os.getenv("JOB_STALE_SECONDS", "60"))  # 心跳超时视为工作进程已退出
+    JOB_EVENTS_POLL_SECONDS: float = 0.5
+
+    # 题库问答配置
+    CHAT_CONTEXT_TOKENS: int = int(os.getenv("CHAT_CONTEXT_TOKENS", "3000"))  # 发送给模型的历史消息 token 预算
+    CHAT_SUMMARY_TOKENS: int = int(os.getenv("CHAT_SUMMARY_TOKENS", "300"))  # 滚动摘要的长度上限
+    CHAT_HISTORY_PAGE_SIZE: int = int(os.getenv("CHAT_HISTORY_PAGE_SIZE", "50"))  # 按页读取历史消息的大小
+
+    # 题库内容检索索引配置
+    RETRIEVAL_TOP_K: int = int(os.getenv("RETRIEVAL_TOP_K", "4"))  # 每轮问答附带的参考片段数
+    RETRIEVAL_CACHE_SIZE: int = int(os.getenv("RETRIEVAL_CACHE_SIZE", "64"))  # 进程内缓存索引的题库数
+    RETRIEVAL_CACHE_TTL_SECONDS: int = int(os.getenv("RETRIEVAL_CACHE_TTL_SECONDS", "600"))
+    CHAT_TEMPERATURE: float = float(os.getenv("CHAT_TEMPERATURE", "0.3"))
+
+    # 近似重复问题检测配置
+    DUPLICATE_THRESHOLD: float = float(os.getenv("DUPLICATE_THRESHOLD", "0.8"))  # 题干 MinHash 相似度超过该值视为重复
+    DUPLICATE_CACHE_SIZE: int = int(os.getenv("DUPLICATE_CACHE_SIZE", "64"))  # 进程内缓存签名索引的题库数
+    DUPLICATE_CACHE_TTL_SECONDS: int = int(os.getenv("DUPLICATE_CACHE_TTL_SECONDS", "600"))
+    DUPLICATE_MAX_CLUSTERS: int = 1000  # 去重任务结果中返回的重复组数上限
+
+    # 测验判分配置
+    ANSWER_KEY_CACHE_SIZE: int = int(os.getenv("ANSWER_KEY_CACHE_SIZE", "256"))  # 进程内缓存标准答案的测验数
+    ANSWER_KEY_CACHE_TTL_SECONDS: int = int(os.getenv("ANSWER_KEY_CACHE_TTL_SECONDS", "300"))
+    QUIZ_PAPER_CACHE_SIZE: int = int(os.getenv("QUIZ_PAPER_CACHE_SIZE", "256"))  # 进程内缓存试卷快照的测验数
+    QUIZ_PAPER_CACHE_TTL_SECONDS: int = int(os.getenv("QUIZ_PAPER_CACHE_TTL_SECONDS", "300"))
+
+    # 题目统计写回配置
+    STAT_FLUSH_INTERVAL_SECONDS: float = float(os.getenv("STAT_FLUSH_INTERVAL_SECONDS", "1"))  # 累加的答题统计写回间隔
+    STAT_FLUSH_BATCH_SIZE: int = int(os.getenv("STAT_FLUSH_BATCH_SIZE", "500"))  # 每条 UPDATE 覆盖的问题数
+    STAT_LOG_DIRECTORY: str = os.getenv("STAT_LOG_DIRECTORY", "./cache/question_stats")  # 未写回增量的日志目录
+
+    # 题目批量导入配置
+    IMPORT_BATCH_SIZE: int = int(os.getenv("IMPORT_BATCH_SIZE", "1000"))
+    IMPORT_MAX_ERRORS: int = 1000  # 返回的逐行错误数上限
+    IMPORT_MAX_SIZE: int = int(os.getenv("IMPORT_MAX_SIZE", str(100 * 1024 * 1024)))  # 后台导入暂存请求体的上限 100MB
+
+    # 抽题引擎的题库ID缓存配置
+    SAMPLER_CACHE_SIZE: int = int(os.getenv("SAMPLER_CACHE_SIZE", "256"))
+    SAMPLER_CACHE_TTL_SECONDS: int = int(os.getenv("SAMPLER_CACHE_TTL_SECONDS", "300"))
 
     class Config:
         env_file = ".env"
@@ -1,17 +1,65 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
 from app.config import settings
 
+# 同步驱动 -> 异步驱动
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def _engine_options(url, is_async: bool) -> dict:
+    """按数据库类型生成连接池和语句超时配置"""
+    options = {
+        "echo": settings.DB_ECHO,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+    if url.get_backend_name() == "sqlite":
+        # SQLite 没有服务端连接，使用默认连接池
+        return options
+
+    options.update(
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+    )
+    if settings.DB_STATEMENT_TIMEOUT_MS and url.get_backend_name() == "postgresql":
+        timeout = str(settings.DB_STATEMENT_TIMEOUT_MS)
+        if is_async:
+            options["connect_args"] = {"server_settings": {"statement_timeout": timeout}}
+        else:
+            options["connect_args"] = {"options": f"-c statement_timeout={timeout}"}
+    return options
+
+
+def async_database_url(database_url: str):
+    """把同步连接串换成对应的异步驱动"""
+    url = make_url(database_url)
+    driver = ASYNC_DRIVERS.get(url.get_backend_name())
+    if driver is None:
+        raise ValueError(f"No async driver configured for {url.get_backend_name()}")
+    return url.set(drivername=driver)
+
+
 # 创建数据库引擎
-engine = create_engine(
-    settings.DATABASE_URL, echo=True
-)
-# 如果使用PostgreSQL，移除connect_args参数
+sync_url = make_url(settings.DATABASE_URL)
+engine = create_engine(sync_url, **_engine_options(sync_url, is_async=False))
+
+# 异步引擎，供 async 路由使用，避免在事件循环上执行阻塞查询
+async_url = async_database_url(settings.DATABASE_URL)
+async_engine = create_async_engine(async_url, **_engine_options(async_url, is_async=True))
 
 # 创建会话本地类
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
 
 # 创建Base类，所有模型都将继承这个类
 Base = declarative_base()
@@ -22,4 +70,10 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+# 依赖函数，用于在 async 路由中获取异步数据库会话
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
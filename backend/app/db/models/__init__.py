@@ -1,9 +1,12 @@
 from .user import User, UserProfile, OAuthAccount
 from .quiz import (
-    QuestionBank, Question, QuestionOption, QuestionStat, QuestionBankShare,
+    QuestionBank, Question, QuestionOption, QuestionStat, QuestionStatFlush, QuestionBankShare,
     Quiz, QuizQuestion, QuizSubmission, DifficultyEnum
 )
-from .file import File
+from .file import File, FileChunk
+from .job import Job
+from .chat import Conversation, Message, MessageRole
+from .search import QuestionSearch
 
 # 导出 Base
 from app.db.base import Base
@@ -11,8 +14,10 @@ from app.db.base import Base
 # For Alembic to detect models
 __all__ = [
     "User", "UserProfile", "OAuthAccount",
-    "QuestionBank", "Question", "QuestionOption", "QuestionStat", "QuestionBankShare",
+    "QuestionBank", "Question", "QuestionOption", "QuestionStat", "QuestionStatFlush", "QuestionBankShare",
     "Quiz", "QuizQuestion", "QuizSubmission", "DifficultyEnum",
-    "File",
-    "Conversation", "Message"
+    "File", "FileChunk",
+    "Job",
+    "Conversation", "Message", "MessageRole",
+    "QuestionSearch"
 ]
\ No newline at end of file
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Enum
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Enum, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import enum
@@ -15,15 +15,19 @@ class Conversation(Base):
     __tablename__ = "conversations"
 
     id = Column(String(36), primary_key=True, index=True)
-    bank_id = Column(Integer, ForeignKey("banks.id"), nullable=False)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    bank_id = Column(Integer, ForeignKey("question_banks.id", ondelete="CASCADE"), nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
     title = Column(String(255), nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # 滚动摘要：按 (created_at, id) 排在游标（含）之前的消息已并入 summary，不再发送给模型
+    summary = Column(Text, nullable=True)
+    summarized_until = Column(DateTime(timezone=True), nullable=True)
+    summarized_until_id = Column(String(36), nullable=True)
 
     # 关系
     user = relationship("User", back_populates="conversations")
-    bank = relationship("Bank", back_populates="conversations")
+    bank = relationship("QuestionBank", back_populates="conversations")
     messages = relationship("Message", back_populates="conversation", cascade="all, delete-orphan")
 
 class Message(Base):
@@ -31,10 +35,15 @@ class Message(Base):
     __tablename__ = "messages"
 
     id = Column(String(36), primary_key=True, index=True)
-    conversation_id = Column(String(36), ForeignKey("conversations.id"), nullable=False)
+    conversation_id = Column(String(36), ForeignKey("conversations.id", ondelete="CASCADE"), nullable=False)
     role = Column(Enum(MessageRole), default=MessageRole.user, nullable=False)
     content = Column(Text, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     # 关系
-    conversation = relationship("Conversation", back_populates="messages") 
\ No newline at end of file
+    conversation = relationship("Conversation", back_populates="messages")
+
+    __table_args__ = (
+        # 按对话分页读取历史、取最近的上下文窗口都走这个索引
+        Index("ix_messages_conversation_id_created_at", "conversation_id", "created_at"),
+    ) 
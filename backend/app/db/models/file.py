@@ -1,5 +1,5 @@
 # app/db/models/file.py
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from datetime import datetime
@@ -15,10 +15,36 @@ class File(Base):
     filepath = Column(String, nullable=False)
     filetype = Column(String, nullable=True)
     filesize = Column(Integer, nullable=True)
+    content_hash = Column(String(64), nullable=True, index=True)  # SHA-256
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"))
     bank_id = Column(Integer, ForeignKey("question_banks.id", ondelete="CASCADE"))
     parsed_text = Column(Text, nullable=True)  # 添加解析文本字段
+    parse_status = Column(String(16), nullable=False, default="pending", index=True)  # pending/processing/done/failed/skipped
+    parse_error = Column(Text, nullable=True)
+    parse_started_at = Column(DateTime(timezone=True), nullable=True)  # 领取解析的时间，超时视为解析进程已退出
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     # 关系
-    user = relationship("User", back_populates="files")
\ No newline at end of file
+    user = relationship("User", back_populates="files")
+    chunks = relationship(
+        "FileChunk", back_populates="file", cascade="all, delete-orphan",
+        order_by="FileChunk.chunk_index"
+    )
+
+
+class FileChunk(Base):
+    """文件解析后的文本块"""
+    __tablename__ = "file_chunks"
+
+    id = Column(Integer, primary_key=True, index=True)
+    file_id = Column(String, ForeignKey("files.id", ondelete="CASCADE"), nullable=False)
+    chunk_index = Column(Integer, nullable=False)
+    content = Column(Text, nullable=False)
+    token_count = Column(Integer, nullable=False)
+
+    # 关系
+    file = relationship("File", back_populates="chunks")
+
+    __table_args__ = (
+        Index("ix_file_chunks_file_id_chunk_index", "file_id", "chunk_index", unique=True),
+    )
\ No newline at end of file
@@ -0,0 +1,32 @@
+# app/db/models/job.py
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text, Float, Boolean, JSON, Index
+from sqlalchemy.sql import func
+
+from app.db.base import Base
+
+
+class Job(Base):
+    """后台任务（生成问题、解析文件、批量导入等）"""
+    __tablename__ = "jobs"
+
+    id = Column(String(36), primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    kind = Column(String(32), nullable=False)
+    status = Column(String(16), nullable=False, default="queued")  # queued/running/succeeded/failed/cancelled
+    priority = Column(Integer, nullable=False, default=0)  # 越大越先执行
+    payload = Column(JSON, nullable=False, default=dict)
+    result = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+    progress = Column(Float, nullable=False, default=0.0)  # 0 ~ 1
+    message = Column(String, nullable=True)
+    cancel_requested = Column(Boolean, nullable=False, default=False)
+    attempts = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        # 领取任务时按 (status, priority DESC, created_at) 查找
+        Index("ix_jobs_status_priority_created_at", "status", "priority", "created_at"),
+    )
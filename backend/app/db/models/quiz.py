@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, String, Integer, DateTime, ForeignKey, JSON, Enum, Text, Float
+from sqlalchemy import Boolean, Column, String, Integer, DateTime, ForeignKey, JSON, Enum, Text, Float, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from ..base import Base
@@ -18,12 +18,14 @@ class QuestionBank(Base):
     description = Column(Text)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    version = Column(Integer, nullable=False, default=1, server_default="1")  # 问题或选项写入时递增，用于 ETag
 
     # Relationships
     user = relationship("User", back_populates="question_banks")
     questions = relationship("Question", back_populates="bank", cascade="all, delete-orphan")
     shares = relationship("QuestionBankShare", back_populates="bank", cascade="all, delete-orphan")
     quizzes = relationship("Quiz", back_populates="bank", cascade="all, delete-orphan")
+    conversations = relationship("Conversation", back_populates="bank", cascade="all, delete-orphan")
 
 
 class Question(Base):
@@ -43,12 +45,17 @@ class Question(Base):
     stats = relationship("QuestionStat", back_populates="question", uselist=False, cascade="all, delete-orphan")
     quiz_questions = relationship("QuizQuestion", back_populates="question", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        # 按题库取问题、按难度分层抽题都走这个索引
+        Index("ix_questions_bank_id_difficulty", "bank_id", "difficulty"),
+    )
+
 
 class QuestionOption(Base):
     __tablename__ = "question_options"
 
     id = Column(Integer, primary_key=True, index=True)
-    question_id = Column(Integer, ForeignKey("questions.id", ondelete="CASCADE"))
+    question_id = Column(Integer, ForeignKey("questions.id", ondelete="CASCADE"), index=True)
     content = Column(Text)
     is_correct = Column(Boolean, default=False)
 
@@ -60,7 +67,7 @@ class QuestionStat(Base):
     __tablename__ = "question_stats"
 
     id = Column(Integer, primary_key=True, index=True)
-    question_id = Column(Integer, ForeignKey("questions.id", ondelete="CASCADE"))
+    question_id = Column(Integer, ForeignKey("questions.id", ondelete="CASCADE"), index=True)
     attempts = Column(Integer, default=0)
     correct_attempts = Column(Integer, default=0)
 
@@ -68,6 +75,14 @@ class QuestionStat(Base):
     question = relationship("Question", back_populates="stats")
 
 
+class QuestionStatFlush(Base):
+    """已写入 question_stats 的增量日志段；重放日志时据此跳过已生效的段，保证只累加一次"""
+    __tablename__ = "question_stat_flushes"
+
+    segment = Column(String(36), primary_key=True)
+    flushed_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
 class QuestionBankShare(Base):
     __tablename__ = "question_bank_shares"
 
@@ -104,7 +119,7 @@ class QuizQuestion(Base):
     __tablename__ = "quiz_questions"
 
     id = Column(Integer, primary_key=True, index=True)
-    quiz_id = Column(Integer, ForeignKey("quizzes.id", ondelete="CASCADE"))
+    quiz_id = Column(Integer, ForeignKey("quizzes.id", ondelete="CASCADE"), index=True)
     question_id = Column(Integer, ForeignKey("questions.id", ondelete="CASCADE"))
     sequence_index = Column(Integer)
 
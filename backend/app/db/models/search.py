@@ -0,0 +1,46 @@
+# app/db/models/search.py
+from sqlalchemy import Column, DDL, ForeignKey, Integer, String, Text, event
+
+from ..base import Base
+
+
+class QuestionSearch(Base):
+    """
+    问题的全文检索文档
+
+    document 为题干、答案、解析和选项拼接的原文，用于生成摘要；terms 为分词结果
+    （英文按词、中文按二字组，空格分隔），由数据库的全文索引收录：
+    PostgreSQL 上是 to_tsvector('simple', terms) 的 GIN 索引，
+    SQLite 上是以本表为外部内容的 FTS5 虚拟表 question_search_fts。
+    FTS5 不能与普通索引组合过滤，filters 把所有者、题库、难度写成特殊词一并收录（不参与打分）。
+    """
+    __tablename__ = "question_search"
+
+    question_id = Column(Integer, ForeignKey("questions.id", ondelete="CASCADE"), primary_key=True)
+    bank_id = Column(Integer, ForeignKey("question_banks.id", ondelete="CASCADE"), nullable=False, index=True)
+    difficulty = Column(String(16), nullable=True)
+    document = Column(Text, nullable=False)
+    terms = Column(Text, nullable=False)
+    filters = Column(Text, nullable=False)
+
+
+event.listen(QuestionSearch.__table__, "after_create", DDL(
+    "CREATE INDEX IF NOT EXISTS ix_question_search_terms "
+    "ON question_search USING gin (to_tsvector('simple', terms))"
+).execute_if(dialect="postgresql"))
+
+# FTS5 外部内容表只保存倒排索引，通过触发器与 question_search 保持同步
+for statement in (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS question_search_fts USING fts5("
+    "terms, filters, content='question_search', content_rowid='question_id')",
+    "CREATE TRIGGER IF NOT EXISTS question_search_ai AFTER INSERT ON question_search BEGIN "
+    "INSERT INTO question_search_fts(rowid, terms, filters) VALUES (new.question_id, new.terms, new.filters); END",
+    "CREATE TRIGGER IF NOT EXISTS question_search_ad AFTER DELETE ON question_search BEGIN "
+    "INSERT INTO question_search_fts(question_search_fts, rowid, terms, filters) "
+    "VALUES ('delete', old.question_id, old.terms, old.filters); END",
+    "CREATE TRIGGER IF NOT EXISTS question_search_au AFTER UPDATE ON question_search BEGIN "
+    "INSERT INTO question_search_fts(question_search_fts, rowid, terms, filters) "
+    "VALUES ('delete', old.question_id, old.terms, old.filters); "
+    "INSERT INTO question_search_fts(rowid, terms, filters) VALUES (new.question_id, new.terms, new.filters); END",
+):
+    event.listen(QuestionSearch.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
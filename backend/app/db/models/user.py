@@ -30,6 +30,8 @@ class User(Base):
     # Quiz 与提交
     quizzes = relationship("Quiz", back_populates="user", cascade="all, delete-orphan")
     quiz_submissions = relationship("QuizSubmission", back_populates="user", cascade="all, delete-orphan")
+    # 问答对话
+    conversations = relationship("Conversation", back_populates="user", cascade="all, delete-orphan")
 
 class UserProfile(Base):
     __tablename__ = "user_profiles"
@@ -9,8 +9,17 @@ LLM 模块
 - 上下文处理
 """
 
-from app.llm.client import LLMClient
+from app.llm.client import LLMClient, LLMError
+from app.llm.cache import GenerationCache, generation_cache
+from app.llm.retrieval import Embedder, Passage, RetrievalIndex, retrieval_index
 
 __all__ = [
     "LLMClient",
+    "LLMError",
+    "GenerationCache",
+    "generation_cache",
+    "Embedder",
+    "Passage",
+    "RetrievalIndex",
+    "retrieval_index",
 ]
\ No newline at end of file
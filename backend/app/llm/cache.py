@@ -0,0 +1,140 @@
+# app/llm/cache.py
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Any, Dict, Optional
+
+from app.config import settings
+
+
+def generation_cache_key(model: str, prompt: str, **params) -> str:
+    """
+    生成缓存键：规范化后的提示词、模型和生成参数的 sha256
+
+    规范化只做 NFKC 和空白合并，内容本身不同的提示词不会共用缓存。
+    """
+    normalized = re.sub(r"\s+", " ", unicodedata.normalize("NFKC", prompt)).strip()
+    payload = json.dumps(
+        {"model": model, "prompt": normalized, "params": params},
+        ensure_ascii=False, sort_keys=True, separators=(",", ":")
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class GenerationCache:
+    """
+    持久化的 LLM 生成结果缓存（SQLite，LRU + TTL）
+
+    以独立的 SQLite 文件保存，进程重启后仍然有效，也不占用业务数据库。
+    读取时更新访问时间，写入后超出 maxsize 的条目按最久未访问淘汰；
+    超过 TTL 的条目读取时视为未命中并删除。
+    """
+
+    def __init__(self, path: Optional[str] = None, maxsize: int = 10000, ttl: float = 7 * 24 * 3600):
+        self._path = path
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def path(self) -> str:
+        # 未指定时跟随当前配置
+        return self._path or settings.LLM_CACHE_PATH
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS generations ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_generations_accessed_at ON generations (accessed_at)")
+            self._conn = conn
+        return self._conn
+
+    def get(self, key: str) -> Optional[Any]:
+        """读取缓存的生成结果，未命中或已过期时返回 None"""
+        if self.maxsize <= 0:
+            return None
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT value, created_at FROM generations WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or row[1] + self.ttl <= now:
+                if row is not None:
+                    conn.execute("DELETE FROM generations WHERE key = ?", (key,))
+                self.misses += 1
+                return None
+            conn.execute("UPDATE generations SET accessed_at = ? WHERE key = ?", (now, key))
+            self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Any):
+        """写入生成结果，超出容量时淘汰最久未访问的条目"""
+        if self.maxsize <= 0:
+            return
+        now = time.time()
+        data = json.dumps(value, ensure_ascii=False)
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO generations (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, data, now, now)
+            )
+            conn.execute(
+                "DELETE FROM generations WHERE key IN ("
+                " SELECT key FROM generations ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.maxsize,)
+            )
+
+    def invalidate(self, key: str):
+        with self._lock:
+            self._connection().execute("DELETE FROM generations WHERE key = ?", (key,))
+
+    def clear(self):
+        """清空缓存并重置计数器"""
+        with self._lock:
+            self._connection().execute("DELETE FROM generations")
+            self.hits = 0
+            self.misses = 0
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def stats(self) -> Dict[str, Any]:
+        """命中率等指标"""
+        with self._lock:
+            size = self._connection().execute("SELECT COUNT(*) FROM generations").fetchone()[0]
+            total = self.hits + self.misses
+            return {
+                "size": size,
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+
+generation_cache = GenerationCache(
+    maxsize=settings.LLM_CACHE_SIZE,
+    ttl=settings.LLM_CACHE_TTL_SECONDS,
+)
@@ -0,0 +1,276 @@
+import asyncio
+import contextlib
+import json
+import logging
+import random
+from typing import AsyncIterator, List, Dict, Any, Optional
+
+import httpx
+
+from app.config import settings
+from app.llm.cache import GenerationCache, generation_cache, generation_cache_key
+from app.llm.stream_parser import QuestionStreamParser, extract_json_items
+from app.schemas.quiz import QuestionCreate
+
+logger = logging.getLogger(__name__)
+
+# 这些状态码视为临时错误，按指数退避重试
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class LLMError(Exception):
+    """LLM API 调用失败"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class LLMClient:
+    """
+    用于与LLM API交互的异步客户端
+
+    同一事件循环内的所有实例共享一个带连接池（keep-alive）的 httpx.AsyncClient，
+    并发请求数受信号量限制；429/5xx 和网络错误按带抖动的指数退避重试。
+    """
+
+    # 按事件循环保存共享的连接池和并发信号量，测试中每个 TestClient 有自己的事件循环
+    _pools: Dict[asyncio.AbstractEventLoop, "tuple[httpx.AsyncClient, asyncio.Semaphore]"] = {}
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        model: Optional[str] = None,
+        base_url: Optional[str] = None,
+        max_retries: Optional[int] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        cache: Optional[GenerationCache] = None,
+    ):
+        self.api_key = api_key or settings.LLM_API_KEY
+        self.model = model or settings.LLM_MODEL
+        self.base_url = (base_url or settings.LLM_BASE_URL).rstrip("/")
+        self.max_retries = settings.LLM_MAX_RETRIES if max_retries is None else max_retries
+        # 指定 transport 时（测试用）使用独立的客户端，不进入共享连接池
+        self._transport = transport
+        self._own_pool = None
+        self.cache = cache or generation_cache
+
+    def _pool(self):
+        if self._transport is not None:
+            if self._own_pool is None:
+                self._own_pool = (
+                    httpx.AsyncClient(transport=self._transport, timeout=self._timeout()),
+                    asyncio.Semaphore(settings.LLM_MAX_CONCURRENCY),
+                )
+            return self._own_pool
+
+        loop = asyncio.get_running_loop()
+        pool = self._pools.get(loop)
+        if pool is None or pool[0].is_closed:
+            # 清理已关闭事件循环上的连接池
+            for stale in [l for l in self._pools if l.is_closed()]:
+                del self._pools[stale]
+            pool = (
+                httpx.AsyncClient(
+                    timeout=self._timeout(),
+                    limits=httpx.Limits(
+                        max_connections=settings.LLM_MAX_CONNECTIONS,
+                        max_keepalive_connections=settings.LLM_MAX_KEEPALIVE_CONNECTIONS,
+                        keepalive_expiry=settings.LLM_KEEPALIVE_EXPIRY_SECONDS,
+                    ),
+                ),
+                asyncio.Semaphore(settings.LLM_MAX_CONCURRENCY),
+            )
+            self._pools[loop] = pool
+        return pool
+
+    @staticmethod
+    def _timeout() -> httpx.Timeout:
+        return httpx.Timeout(
+            settings.LLM_TIMEOUT_SECONDS,
+            connect=settings.LLM_CONNECT_TIMEOUT_SECONDS,
+        )
+
+    @classmethod
+    async def aclose(cls):
+        """关闭当前事件循环上的共享连接池（应用关闭时调用）"""
+        pool = cls._pools.pop(asyncio.get_running_loop(), None)
+        if pool is not None:
+            await pool[0].aclose()
+
+    @staticmethod
+    def _backoff(attempt: int, retry_after: Optional[str] = None) -> float:
+        """第 attempt 次重试前的等待秒数：优先使用 Retry-After，否则全抖动指数退避"""
+        if retry_after:
+            try:
+                return min(float(retry_after), settings.LLM_BACKOFF_MAX_SECONDS)
+            except ValueError:
+                pass
+        ceiling = min(settings.LLM_BACKOFF_MAX_SECONDS, settings.LLM_BACKOFF_BASE_SECONDS * (2 ** attempt))
+        return random.uniform(0, ceiling)
+
+    async def _send(self, data: Dict[str, Any], stream: bool = False) -> httpx.Response:
+        """
+        发送 chat/completions 请求，429/5xx 和网络错误按退避重试
+
+        stream=True 时返回尚未读取响应体的响应，调用方负责关闭；
+        重试只发生在收到响应头之前，开始输出后不再重试。
+        """
+        if not self.api_key:
+            raise LLMError("LLM API key not set")
+
+        headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+        client, semaphore = self._pool()
+        request_context = contextlib.nullcontext() if stream else semaphore
+
+        attempt = 0
+        while True:
+            retry_after = None
+            try:
+                async with request_context:
+                    response = await client.send(
+                        client.build_request(
+                            "POST", f"{self.base_url}/chat/completions",
+                            headers=headers, json=data
+                        ),
+                        stream=stream
+                    )
+            except httpx.TransportError as e:
+                if attempt >= self.max_retries:
+                    raise LLMError(f"LLM API request failed: {e.__class__.__name__}") from e
+                logger.warning("LLM request failed (%s), retrying", e.__class__.__name__)
+            else:
+                if response.status_code == 200:
+                    return response
+                await response.aread()
+                await response.aclose()
+                if response.status_code not in RETRYABLE_STATUS_CODES or attempt >= self.max_retries:
+                    raise LLMError(f"LLM API error: {response.text}", response.status_code)
+                logger.warning("LLM API returned %s, retrying", response.status_code)
+                retry_after = response.headers.get("Retry-After")
+
+            await asyncio.sleep(self._backoff(attempt, retry_after))
+            attempt += 1
+
+    async def chat_completion(self, messages: List[Dict[str, str]], **params) -> Dict[str, Any]:
+        """
+        调用 chat/completions 接口，返回解析后的 JSON 响应
+        """
+        response = await self._send({"model": self.model, "messages": messages, **params})
+        return response.json()
+
+    async def stream_completion(self, messages: List[Dict[str, str]], **params) -> AsyncIterator[str]:
+        """
+        以流式方式调用 chat/completions，逐段产出模型输出的文本
+
+        整个输出期间占用一个并发名额；调用方提前停止迭代（例如客户端断开）时关闭上游连接。
+        """
+        data = {"model": self.model, "messages": messages, **params, "stream": True}
+        _, semaphore = self._pool()
+        async with semaphore:
+            response = await self._send(data, stream=True)
+            try:
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    payload = line[len("data:"):].strip()
+                    if payload == "[DONE]":
+                        return
+                    try:
+                        choice = json.loads(payload)["choices"][0]
+                    except (ValueError, KeyError, IndexError):
+                        continue
+                    content = (choice.get("delta") or {}).get("content")
+                    if content:
+                        yield content
+            except httpx.TransportError as e:
+                raise LLMError(f"LLM stream interrupted: {e.__class__.__name__}") from e
+            finally:
+                await response.aclose()
+
+    @staticmethod
+    def _questions_prompt(content: str, num_questions: int, question_type: str) -> str:
+        return f"""
+        基于以下内容生成{num_questions}道{question_type}类型的问题。
+        每个问题应包含问题内容、选项（如适用）、正确答案和解释。
+        以JSON数组格式输出，每个元素形如：
+        {{"prompt": "问题内容", "options": [{{"content": "选项", "is_correct": true}}],
+          "answer": "正确答案", "explanation": "解释", "difficulty": "easy|medium|hard"}}
+
+        内容：
+        {content}
+        """
+
+    async def generate_questions(
+        self,
+        content: str,
+        num_questions: int = 5,
+        question_type: str = "multiple_choice",
+        bypass_cache: bool = False,
+    ) -> List[Dict[str, Any]]:
+        """
+        根据内容生成问题
+
+        相同内容、模型和参数的结果从生成缓存读取；bypass_cache=True 时强制重新生成
+        （新结果仍会写回缓存）。输出中单个格式有误的对象只丢弃它自己。
+        """
+        prompt = self._questions_prompt(content, num_questions, question_type)
+        params = {"temperature": 0.7}
+        key = generation_cache_key(self.model, prompt, **params)
+        if not bypass_cache:
+            # SQLite 读写放到线程中，不阻塞事件循环
+            cached = await asyncio.to_thread(self.cache.get, key)
+            if cached is not None:
+                return cached
+
+        result = await self.chat_completion(
+            [{"role": "user", "content": prompt}],
+            **params
+        )
+        questions = extract_json_items(result["choices"][0]["message"]["content"])
+        await asyncio.to_thread(self.cache.set, key, questions)
+        return questions
+
+    async def stream_questions(
+        self,
+        content: str,
+        bank_id: int,
+        num_questions: int = 5,
+        question_type: str = "multiple_choice",
+        bypass_cache: bool = False,
+        errors: Optional[List[str]] = None,
+    ) -> AsyncIterator[QuestionCreate]:
+        """
+        流式生成问题：每道题的 JSON 对象一闭合就校验并产出 QuestionCreate
+
+        格式或校验有误的题目被丢弃，原因追加到 errors；完整输出结束后才写入生成缓存，
+        与 generate_questions 共用缓存条目。
+        """
+        prompt = self._questions_prompt(content, num_questions, question_type)
+        params = {"temperature": 0.7}
+        key = generation_cache_key(self.model, prompt, **params)
+        parser = QuestionStreamParser(bank_id)
+
+        cached = None if bypass_cache else await asyncio.to_thread(self.cache.get, key)
+        if cached is not None:
+            for item in cached:
+                question = parser.validate(item)
+                if question is not None:
+                    yield question
+        else:
+            questions = []
+            async for text in self.stream_completion([{"role": "user", "content": prompt}], **params):
+                for question in parser.feed(text):
+                    questions.append(question)
+                    yield question
+            parser.close()
+            await asyncio.to_thread(
+                self.cache.set, key,
+                [question.model_dump(mode="json", exclude={"bank_id"}) for question in questions]
+            )
+
+        if errors is not None:
+            errors.extend(parser.errors)
@@ -0,0 +1,289 @@
+# app/llm/retrieval.py
+"""
+题库内容的本地检索索引（RAG 的检索部分）
+
+每个题库在进程内维护一份倒排索引，覆盖已解析文件的文本块和问题，用 BM25 打分；
+配置了本地向量模型（Embedder）且安装了 NumPy 时，再与向量相似度做倒数排名融合。
+索引在首次查询时从数据库加载，之后随文件解析、删除和问题增删改增量更新，
+并按 TTL 重新加载以发现其它进程的写入。
+"""
+import asyncio
+import heapq
+import math
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Protocol, Sequence, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.db.models.file import File, FileChunk
+from app.db.models.quiz import Question
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - 取决于部署环境
+    np = None
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+RRF_K = 60  # 倒数排名融合的平滑常数
+
+_WORD = re.compile(r"[a-z0-9]+(?:['.][a-z0-9]+)*")
+_CJK_RUN = re.compile(r"[\u3040-\u30ff\u3400-\u9fff\uf900-\ufaff\uac00-\ud7af]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    检索用的分词：拉丁字母和数字按词，CJK 按相邻二字组
+
+    不收录单字，常用字的倒排表过长，会拖慢查询；单独一个字的片段保留单字。
+    """
+    text = text.lower()
+    terms = _WORD.findall(text)
+    for run in _CJK_RUN.findall(text):
+        if len(run) == 1:
+            terms.append(run)
+        else:
+            terms.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return terms
+
+
+def question_text(prompt: str, answer: Optional[str], explanation: Optional[str]) -> str:
+    return "\n".join(part for part in (prompt, answer, explanation) if part)
+
+
+class Embedder(Protocol):
+    """本地向量模型：把一批文本编码为 (len(texts), dim) 的矩阵"""
+
+    def embed(self, texts: Sequence[str]) -> "np.ndarray": ...
+
+
+@dataclass
+class Passage:
+    source: str  # "file:<file_id>" 或 "question:<question_id>"
+    text: str
+    score: float
+
+
+class BankIndex:
+    """一个题库的倒排索引，文档按来源（文件、问题）整体增删"""
+
+    def __init__(self):
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._docs: Dict[int, Tuple[str, str, int]] = {}  # 文档ID -> (来源, 文本, 词数)
+        self._sources: Dict[str, List[int]] = {}
+        self._vectors: Dict[int, "np.ndarray"] = {}
+        self._matrix: Optional[Tuple[List[int], "np.ndarray"]] = None
+        self._total_length = 0
+        self._next_id = 0
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def replace(self, source: str, texts: Sequence[str], vectors: Optional["np.ndarray"] = None):
+        """用新的文本替换某个来源下的全部文档"""
+        self.remove(source)
+        doc_ids = []
+        for i, text in enumerate(texts):
+            terms = Counter(tokenize(text))
+            if not terms:
+                continue
+            doc_id = self._next_id
+            self._next_id += 1
+            length = sum(terms.values())
+            self._docs[doc_id] = (source, text, length)
+            self._total_length += length
+            for term, tf in terms.items():
+                self._postings.setdefault(term, {})[doc_id] = tf
+            if vectors is not None:
+                self._vectors[doc_id] = vectors[i]
+            doc_ids.append(doc_id)
+        if doc_ids:
+            self._sources[source] = doc_ids
+            self._matrix = None
+
+    def remove(self, source: str):
+        for doc_id in self._sources.pop(source, ()):
+            _, text, length = self._docs.pop(doc_id)
+            self._total_length -= length
+            self._vectors.pop(doc_id, None)
+            for term in set(tokenize(text)):
+                postings = self._postings.get(term)
+                if postings is not None:
+                    postings.pop(doc_id, None)
+                    if not postings:
+                        del self._postings[term]
+            self._matrix = None
+
+    def bm25(self, query: str, k: int) -> List[Tuple[float, int]]:
+        """只遍历查询词的倒排表，代价与命中的文档数成正比"""
+        if not self._docs:
+            return []
+        n = len(self._docs)
+        avg_length = self._total_length / n
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, tf in postings.items():
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self._docs[doc_id][2] / avg_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+        return heapq.nlargest(k, ((score, doc_id) for doc_id, score in scores.items()))
+
+    def dense(self, query_vector: "np.ndarray", k: int) -> List[Tuple[float, int]]:
+        if not self._vectors:
+            return []
+        if self._matrix is None:
+            doc_ids = list(self._vectors)
+            matrix = np.stack([self._vectors[doc_id] for doc_id in doc_ids]).astype(np.float32)
+            matrix /= np.linalg.norm(matrix, axis=1, keepdims=True) + 1e-12
+            self._matrix = (doc_ids, matrix)
+        doc_ids, matrix = self._matrix
+        similarities = matrix @ (query_vector / (np.linalg.norm(query_vector) + 1e-12))
+        top = np.argsort(-similarities)[:k]
+        return [(float(similarities[i]), doc_ids[i]) for i in top]
+
+    def search(self, query: str, k: int, query_vector: Optional["np.ndarray"] = None) -> List[Passage]:
+        lexical = self.bm25(query, k if query_vector is None else k * 4)
+        if query_vector is None:
+            ranked = lexical
+        else:
+            # 两路结果各取 4k 个候选，按倒数排名融合
+            fused: Dict[int, float] = {}
+            for results in (lexical, self.dense(query_vector, k * 4)):
+                for rank, (_, doc_id) in enumerate(results):
+                    fused[doc_id] = fused.get(doc_id, 0.0) + 1 / (RRF_K + rank + 1)
+            ranked = heapq.nlargest(k, ((score, doc_id) for doc_id, score in fused.items()))
+        return [
+            Passage(source=self._docs[doc_id][0], text=self._docs[doc_id][1], score=round(score, 4))
+            for score, doc_id in ranked[:k]
+        ]
+
+
+class RetrievalIndex:
+    """
+    按题库缓存 BankIndex（LRU + TTL）
+
+    写操作通过 update_file / remove_file / add_questions / remove_questions 增量更新
+    已加载的索引；未加载的题库不做任何事，下次查询时从数据库完整加载。
+    配置了向量模型时 update_file / add_questions 会同步编码文本，异步代码应在线程中调用。
+    """
+
+    def __init__(self, maxsize: int = 64, ttl: float = 600.0, embedder: Optional[Embedder] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.embedder = embedder
+        self._banks: "OrderedDict[int, Tuple[float, BankIndex]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def set_embedder(self, embedder: Optional[Embedder]):
+        """切换向量模型，已加载的索引全部失效"""
+        if embedder is not None and np is None:
+            raise RuntimeError("Dense retrieval requires the 'numpy' package")
+        self.embedder = embedder
+        self.clear()
+
+    def invalidate(self, bank_id: int):
+        with self._lock:
+            self._banks.pop(bank_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._banks.clear()
+
+    def _embed(self, texts: Sequence[str]) -> Optional["np.ndarray"]:
+        if self.embedder is None or not texts:
+            return None
+        return np.asarray(self.embedder.embed(list(texts)), dtype=np.float32)
+
+    def _update(self, bank_id: int, changes: Iterable[Tuple[str, Sequence[str]]]):
+        with self._lock:
+            entry = self._banks.get(bank_id)
+        if entry is None:
+            return
+        changes = list(changes)
+        vectors = self._embed([text for _, texts in changes for text in texts])
+        offset = 0
+        with self._lock:
+            for source, texts in changes:
+                entry[1].replace(source, texts, None if vectors is None else vectors[offset:offset + len(texts)])
+                offset += len(texts)
+
+    def update_file(self, bank_id: int, file_id: str, chunks: Sequence[str]):
+        """文件解析完成后调用"""
+        self._update(bank_id, [(f"file:{file_id}", chunks)])
+
+    def remove_file(self, bank_id: int, file_id: str):
+        self._update(bank_id, [(f"file:{file_id}", ())])
+
+    def add_questions(self, bank_id: int, questions: Iterable[Tuple[int, str]]):
+        """问题新增或修改后调用，questions 为 (问题ID, 文本)"""
+        self._update(bank_id, [(f"question:{question_id}", [text]) for question_id, text in questions])
+
+    def remove_questions(self, bank_id: int, question_ids: Iterable[int]):
+        self._update(bank_id, [(f"question:{question_id}", ()) for question_id in question_ids])
+
+    async def search(self, db: AsyncSession, bank_id: int, query: str, k: Optional[int] = None) -> List[Passage]:
+        """返回与 query 最相关的 k 个片段"""
+        k = k or settings.RETRIEVAL_TOP_K
+        index = await self._index(db, bank_id)
+        query_vector = None
+        if self.embedder is not None and len(index):
+            query_vector = (await asyncio.to_thread(self._embed, [query]))[0]
+        with self._lock:
+            return index.search(query, k, query_vector)
+
+    async def _index(self, db: AsyncSession, bank_id: int) -> BankIndex:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._banks.get(bank_id)
+            if entry is not None and entry[0] > now:
+                self._banks.move_to_end(bank_id)
+                return entry[1]
+
+        chunks = (await db.execute(
+            select(FileChunk.file_id, FileChunk.content)
+            .join(File, File.id == FileChunk.file_id)
+            .where(File.bank_id == bank_id)
+            .order_by(FileChunk.file_id, FileChunk.chunk_index)
+        )).all()
+        questions = (await db.execute(
+            select(Question.id, Question.prompt, Question.answer, Question.explanation)
+            .where(Question.bank_id == bank_id)
+        )).all()
+
+        sources: Dict[str, List[str]] = {}
+        for file_id, content in chunks:
+            sources.setdefault(f"file:{file_id}", []).append(content)
+        for question_id, prompt, answer, explanation in questions:
+            sources[f"question:{question_id}"] = [question_text(prompt, answer, explanation)]
+
+        def build() -> BankIndex:
+            # 向量模型一次编码全部文本，再按来源切分
+            vectors = self._embed([text for texts in sources.values() for text in texts])
+            index, offset = BankIndex(), 0
+            for source, texts in sources.items():
+                index.replace(source, texts, None if vectors is None else vectors[offset:offset + len(texts)])
+                offset += len(texts)
+            return index
+
+        index = await asyncio.to_thread(build)
+        with self._lock:
+            self._banks[bank_id] = (now + self.ttl, index)
+            self._banks.move_to_end(bank_id)
+            while len(self._banks) > self.maxsize:
+                self._banks.popitem(last=False)
+        return index
+
+
+retrieval_index = RetrievalIndex(
+    maxsize=settings.RETRIEVAL_CACHE_SIZE,
+    ttl=settings.RETRIEVAL_CACHE_TTL_SECONDS,
+)
@@ -0,0 +1,185 @@
+# app/llm/stream_parser.py
+"""
+LLM 输出的增量 JSON 解析
+
+模型输出按 token 陆续到达，这里逐字符扫描，每当一道题的 JSON 对象闭合就立即解析、
+校验并产出，不必等整段输出结束；单个对象格式有误时尝试修复，修复不了只丢弃这一个。
+"""
+import json
+import re
+from typing import Any, Iterator, List, Optional
+
+from pydantic import ValidationError
+
+from app.schemas.quiz import QuestionCreate
+
+# 包裹题目数组的常见键名，例如 {"questions": [...]}
+WRAPPER_KEYS = {"questions", "items", "data", "results"}
+
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+_PYTHON_LITERALS = re.compile(r"(?<=[:\[,\s])(True|False|None)(?=\s*[,}\]])")
+_LITERALS = {"True": "true", "False": "false", "None": "null"}
+_KEY_BEFORE_ARRAY = re.compile(r'"(\w+)"\s*:\s*$')
+
+
+def _loads(raw: str) -> Any:
+    """解析单个对象；失败时修复尾随逗号、Python 字面量后重试"""
+    try:
+        return json.loads(raw, strict=False)
+    except json.JSONDecodeError:
+        repaired = _TRAILING_COMMA.sub(r"\1", raw)
+        repaired = _PYTHON_LITERALS.sub(lambda m: _LITERALS[m.group(1)], repaired)
+        return json.loads(repaired, strict=False)
+
+
+class JSONItemStream:
+    """
+    从流式文本中逐个提取题目对象
+
+    支持 `[{...}, {...}]`、`{"questions": [{...}]}` 和逐行的 `{...}`，
+    对象外的文字（说明、```json 围栏）直接忽略。
+    """
+
+    def __init__(self):
+        self._stack: List[str] = []  # "{"、"[" 或 "W"（包裹题目的数组）
+        self._in_string = False
+        self._escape = False
+        self._item: Optional[List[str]] = None
+        self._item_depth = 0
+        self.count = 0
+        self.errors: List[str] = []
+
+    def feed(self, text: str) -> Iterator[Any]:
+        for ch in text:
+            item = self._consume(ch)
+            if item is not None:
+                yield item
+
+    def close(self) -> Iterator[Any]:
+        if self._item is not None:
+            self.count += 1
+            self.errors.append(f"第 {self.count} 个对象不完整：输出在对象中间结束")
+        self._item = None
+        self._stack = []
+        self._in_string = self._escape = False
+        return iter(())
+
+    def _consume(self, ch: str) -> Optional[Any]:
+        if self._item is not None:
+            self._item.append(ch)
+
+        if self._in_string:
+            if self._escape:
+                self._escape = False
+            elif ch == "\\":
+                self._escape = True
+            elif ch == '"':
+                self._in_string = False
+            return None
+
+        if ch == '"':
+            # 容器之外的引号属于说明文字
+            if self._stack:
+                self._in_string = True
+        elif ch == "{":
+            if self._item is None and self._stack in ([], ["["], ["{", "W"]):
+                self._item = ["{"]
+                self._item_depth = len(self._stack)
+            self._stack.append("{")
+        elif ch == "[":
+            kind = "["
+            if self._stack == ["{"] and self._item is not None:
+                key = _KEY_BEFORE_ARRAY.search("".join(self._item[:-1]))
+                if key and key.group(1) in WRAPPER_KEYS:
+                    # 外层对象只是包裹，题目在这个数组里
+                    kind = "W"
+                    self._item = None
+            self._stack.append(kind)
+        elif ch in "}]" and self._stack:
+            self._stack.pop()
+            if ch == "}" and self._item is not None and len(self._stack) == self._item_depth:
+                raw = "".join(self._item)
+                self._item = None
+                return self._parse(raw)
+        return None
+
+    def _parse(self, raw: str) -> Optional[Any]:
+        self.count += 1
+        try:
+            return _loads(raw)
+        except json.JSONDecodeError as e:
+            self.errors.append(f"第 {self.count} 个对象无法解析: {e.msg}")
+            return None
+
+
+def extract_json_items(content: str) -> List[Any]:
+    """从完整的模型输出中提取所有能解析的题目对象"""
+    stream = JSONItemStream()
+    items = list(stream.feed(content))
+    stream.close()
+    return items
+
+
+def to_question_create(item: Any, bank_id: int) -> QuestionCreate:
+    """
+    把模型输出的一道题转换为 QuestionCreate
+
+    兼容常见的变体：题干字段叫 question，选项是字符串列表，答案是选项字母。
+    """
+    if not isinstance(item, dict):
+        raise ValueError("问题必须是 JSON 对象")
+    data = dict(item)
+    if "prompt" not in data and "question" in data:
+        data["prompt"] = data.pop("question")
+
+    options = data.get("options") or []
+    if options and all(isinstance(option, str) for option in options):
+        answer = str(data.get("answer", "")).strip()
+        letters = [chr(ord("A") + i) for i in range(len(options))]
+        options = [
+            {"content": option, "is_correct": answer in (option, letters[i])}
+            for i, option in enumerate(options)
+        ]
+        if answer in letters:
+            data["answer"] = options[letters.index(answer)]["content"]
+    data["options"] = options
+
+    if not data.get("answer"):
+        correct = [option["content"] for option in options if isinstance(option, dict) and option.get("is_correct")]
+        if correct:
+            data["answer"] = "; ".join(correct)
+    return QuestionCreate(**{**data, "bank_id": bank_id})
+
+
+class QuestionStreamParser:
+    """增量解析并校验题目：每道题闭合后立即产出 QuestionCreate，格式或校验错误记入 errors"""
+
+    def __init__(self, bank_id: int):
+        self.bank_id = bank_id
+        self._items = JSONItemStream()
+        self._invalid: List[str] = []
+
+    @property
+    def errors(self) -> List[str]:
+        return self._items.errors + self._invalid
+
+    def feed(self, text: str) -> Iterator[QuestionCreate]:
+        for item in self._items.feed(text):
+            question = self.validate(item)
+            if question is not None:
+                yield question
+
+    def close(self) -> Iterator[QuestionCreate]:
+        self._items.close()
+        return iter(())
+
+    def validate(self, item: Any) -> Optional[QuestionCreate]:
+        try:
+            return to_question_create(item, self.bank_id)
+        except ValidationError as e:
+            self._invalid.append("; ".join(
+                f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}" for err in e.errors()
+            ))
+        except ValueError as e:
+            self._invalid.append(str(e))
+        return None
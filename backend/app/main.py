@@ -1,4 +1,5 @@
 import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.openapi.docs import get_swagger_ui_html, get_redoc_html
@@ -8,14 +9,39 @@ from app.config import settings
 from app.api import api_router
 
 from app.db.models import Base  # 来自 models/__init__.py 中 re-export
-from app.db.base import engine
+from app.db.base import engine, AsyncSessionLocal
+from app.services.parse_service import ParseService
+from app.llm import LLMClient
+from app.services.job_service import job_queue
+from app.services.password_hasher import password_hasher
+from app.services.search_service import SearchService
+from app.services.stat_accumulator import stat_accumulator
 
 Base.metadata.create_all(bind=engine)
 
 # 确保上传目录存在
 os.makedirs(settings.UPLOAD_DIRECTORY, exist_ok=True)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 重新排队上次进程退出时未完成的解析任务
+    await ParseService.recover()
+    # 为升级前已有的问题补建全文检索文档
+    async with AsyncSessionLocal() as db:
+        await SearchService.backfill(db)
+        # 重放上次进程崩溃时未写回的答题统计
+        await stat_accumulator.recover(db)
+    await stat_accumulator.start()
+    await job_queue.start()
+    yield
+    await job_queue.stop()
+    await stat_accumulator.stop()
+    ParseService.shutdown()
+    password_hasher.shutdown()
+    await LLMClient.aclose()
+
 app = FastAPI(
+    lifespan=lifespan,
     title=settings.PROJECT_NAME,
     description="aiquiz",
     version="0.1.0",
@@ -22,7 +22,15 @@ class MessageBase(BaseModel):
 class MessageResponse(MessageBase):
     """消息响应模型"""
     id: str = Field(..., description="消息ID")
-    created_at: str = Field(..., description="创建时间")
+    created_at: datetime = Field(..., description="创建时间")
+
+    class Config:
+        from_attributes = True
+
+class MessagePage(BaseModel):
+    """按时间倒序分页的消息列表"""
+    items: List[MessageResponse] = Field(default=[], description="消息列表（按时间正序）")
+    next_before: Optional[str] = Field(None, description="下一页游标，作为 before 参数传入；没有更早的消息时为空")
 
 class ConversationBase(BaseModel):
     """对话基础模型"""
@@ -37,9 +45,9 @@ class ConversationResponse(ConversationBase):
     """对话响应模型"""
     id: str = Field(..., description="对话ID")
     user_id: int = Field(..., description="用户ID")
-    created_at: str = Field(..., description="创建时间")
-    updated_at: str = Field(..., description="更新时间")
-    messages: Optional[List[MessageResponse]] = Field(default=[], description="消息列表")
+    created_at: datetime = Field(..., description="创建时间")
+    updated_at: Optional[datetime] = Field(None, description="更新时间")
+    messages: Optional[List[MessageResponse]] = Field(default=[], description="最近的消息")
 
     class Config:
-        orm_mode = True 
\ No newline at end of file
+        from_attributes = True
@@ -51,4 +51,12 @@ class FileResponse(BaseModel):
     created_at: datetime
     
     class Config:
-        orm_mode = True
\ No newline at end of file
+        orm_mode = True
+
+
+class FileParseStatus(BaseModel):
+    """文件解析任务状态"""
+    file_id: str
+    status: str
+    error: Optional[str] = None
+    chunk_count: int = 0
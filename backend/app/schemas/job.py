@@ -0,0 +1,53 @@
+from pydantic import BaseModel, Field
+from typing import Any, Dict, Optional
+from datetime import datetime
+
+from app.schemas.quiz import QuestionGenerateRequest
+
+
+class JobCreate(BaseModel):
+    """提交后台任务"""
+    kind: str
+    payload: Dict[str, Any] = {}
+    priority: int = Field(0, ge=-100, le=100)
+
+
+class Job(BaseModel):
+    """后台任务状态"""
+    id: str
+    kind: str
+    status: str
+    priority: int
+    progress: float
+    message: Optional[str] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
+class GenerateQuestionsPayload(QuestionGenerateRequest):
+    """generate_questions 任务参数"""
+    bank_id: int
+
+
+class ParseFilePayload(BaseModel):
+    """parse_file 任务参数"""
+    file_id: str
+
+
+class ImportQuestionsPayload(BaseModel):
+    """import_questions 任务参数（仅由导入接口内部提交）"""
+    bank_id: int
+    format: str
+    path: str
+
+
+class DedupBankPayload(BaseModel):
+    """dedup_bank 任务参数"""
+    bank_id: int
+    threshold: Optional[float] = Field(None, gt=0, le=1)  # 默认使用 DUPLICATE_THRESHOLD
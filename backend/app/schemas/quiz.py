@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional, List, Dict, Any
+from typing import Annotated, Optional, List, Dict, Any, Union
 from datetime import datetime
 from enum import Enum
 
@@ -36,9 +36,16 @@ class QuestionBase(BaseModel):
     difficulty: DifficultyEnum = DifficultyEnum.medium
 
 
+class QuestionOptionBase(BaseModel):
+    """问题选项基础信息"""
+    content: str
+    is_correct: bool = False
+
+
 class QuestionCreate(QuestionBase):
     """创建问题请求模型"""
     bank_id: int
+    options: List[QuestionOptionBase] = []
 
 
 class QuestionUpdate(BaseModel):
@@ -49,12 +56,6 @@ class QuestionUpdate(BaseModel):
     difficulty: Optional[DifficultyEnum] = None
 
 
-class QuestionOptionBase(BaseModel):
-    """问题选项基础信息"""
-    content: str
-    is_correct: bool = False
-
-
 class QuestionOptionCreate(QuestionOptionBase):
     """创建问题选项请求模型"""
     question_id: int
@@ -124,6 +125,55 @@ class Question(QuestionBase):
         orm_mode = True
 
 
+class QuestionSearchHit(BaseModel):
+    """全文检索的一条结果"""
+    question: Question
+    score: float
+    snippet: str  # 命中附近的原文，命中词以 <mark> 标出
+
+
+class QuestionDuplicate(BaseModel):
+    """题库中与给定题干近似重复的问题"""
+    question_id: int
+    similarity: float  # MinHash 估计的题干 Jaccard 相似度
+
+
+class QuestionImportError(BaseModel):
+    """批量导入中单行的错误"""
+    line: int
+    error: str
+
+
+class QuestionImportResult(BaseModel):
+    """批量导入结果"""
+    total: int
+    imported: int
+    failed: int
+    errors: List[QuestionImportError] = []
+    elapsed_seconds: float
+    rows_per_second: float
+
+
+class QuestionGenerateRequest(BaseModel):
+    """根据已上传文件生成问题"""
+    file_id: str
+    num_questions: int = Field(10, ge=1, le=200)
+    question_type: str = "multiple_choice"
+    bypass_cache: bool = False
+
+
+class QuestionGenerateResult(BaseModel):
+    """问题生成结果"""
+    requested: int
+    generated: int
+    inserted: int
+    duplicates: int
+    invalid: int
+    chunks: int
+    failed_chunks: int
+    elapsed_seconds: float
+
+
 class QuestionBankShareBase(BaseModel):
     """题库分享基础信息"""
     share_token: str
@@ -164,6 +214,16 @@ class QuestionBankInDB(QuestionBankBase):
         orm_mode = True
 
 
+class QuestionBankSummary(QuestionBankBase):
+    """题库列表摘要（不含问题）"""
+    id: int
+    user_id: int
+    question_count: int = 0
+    difficulty_counts: Dict[DifficultyEnum, int] = {}
+    created_at: datetime
+    updated_at: datetime
+
+
 class QuestionBank(QuestionBankBase):
     """题库响应模型"""
     id: int
@@ -187,6 +247,10 @@ class QuizBase(BaseModel):
 class QuizCreate(QuizBase):
     """创建测验请求模型"""
     bank_id: int
+    question_count: Optional[int] = Field(None, ge=1, description="随机抽取的问题数量")
+    difficulty_counts: Optional[Dict[DifficultyEnum, Annotated[int, Field(ge=0)]]] = Field(
+        None, description="按难度分层抽取的数量，如 {\"easy\": 5, \"hard\": 2}"
+    )
     # 移除 user_id 字段，因为它会从当前登录用户获取
 
 class QuizUpdate(BaseModel):
@@ -227,12 +291,12 @@ class QuizSubmissionBase(BaseModel):
 
 
 class QuizSubmissionCreate(BaseModel):
-    """创建测验提交请求模型"""
-    quiz_id: int
-    user_id: int
-    answers: Dict[str, Any]
-    score: float
-    correct_count: int
+    """
+    提交测验答案请求模型（分数由服务端判定）
+
+    answers 以问题ID为键，值为选项ID、选项ID列表（多选）或文本答案
+    """
+    answers: Dict[str, Union[int, List[int], str, None]]
 
 
 class QuizSubmissionInDB(QuizSubmissionBase):
@@ -246,6 +310,34 @@ class QuizSubmissionInDB(QuizSubmissionBase):
         orm_mode = True
 
 
+class QuizSubmissionResult(QuizSubmissionInDB):
+    """测验提交的判分结果"""
+    answers: Dict[str, Any] = {}
+    total: int
+    results: Dict[str, bool]  # 问题ID -> 是否答对
+
+
+class QuizPaperOption(BaseModel):
+    """试卷中的选项（不含是否正确）"""
+    id: int
+    content: str
+
+
+class QuizPaperQuestion(BaseModel):
+    """试卷中的题目（不含答案和解析）"""
+    id: int
+    prompt: str
+    difficulty: Optional[DifficultyEnum] = None
+    options: List[QuizPaperOption] = []
+
+
+class QuizPaper(QuizBase):
+    """考生作答用的试卷"""
+    id: int
+    start_time: datetime
+    questions: List[QuizPaperQuestion] = []
+
+
 class QuizInDB(QuizBase):
     """数据库中的测验模型"""
     id: int
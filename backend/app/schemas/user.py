@@ -28,6 +28,7 @@ class UserResponse(BaseModel):
         
 class UserUpdate(BaseModel):
     """更新用户请求模型"""
+    name: Optional[str] = None
     email: Optional[EmailStr] = None
     password: Optional[str] = Field(None, min_length=6)
     is_active: Optional[bool] = None
@@ -3,10 +3,20 @@ from app.services.auth_service import AuthService
 from app.services.user_service import UserService
 from app.services.quiz_service import QuizService
 from app.services.file_service import FileService
+from app.services.import_service import ImportService
+from app.services.generation_service import GenerationService
+from app.services.chat_service import ChatService
+from app.services.search_service import SearchService
+from app.services.grading_service import GradingService
 
 __all__ = [
     "AuthService",
     "UserService",
     "QuizService",
     "FileService",
+    "ImportService",
+    "GenerationService",
+    "ChatService",
+    "SearchService",
+    "GradingService",
 ]
\ No newline at end of file
@@ -1,19 +1,21 @@
 # app/services/auth_service.py
-from sqlalchemy.orm import Session
+from sqlalchemy import inspect, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, make_transient_to_detached
 from fastapi import HTTPException, status, Depends
 from fastapi.security import OAuth2PasswordBearer
 from datetime import datetime, timedelta
 from jose import jwt, JWTError
-from passlib.context import CryptContext
 from typing import Optional
+import time
 
 from app.config import settings
 from app.db.models.user import User
 from app.schemas.user import UserCreate
 from app.db.base import get_db
-
-# 密码哈希上下文
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from app.services.password_hasher import password_hasher, pwd_context
+from app.services.principal_cache import principal_cache
 
 # OAuth2 密码Bearer流程
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/login")
@@ -42,6 +44,54 @@ class AuthService:
         
         return db_user
     
+    @staticmethod
+    async def register(db: AsyncSession, user_in: UserCreate) -> User:
+        """注册新用户；密码哈希在 password_hasher 的线程池中计算"""
+        if await db.scalar(select(User.id).where(User.email == user_in.email)):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="邮箱已被注册"
+            )
+        # 计算哈希前结束只读事务，把连接还给连接池
+        await db.commit()
+        
+        db_user = User(
+            email=user_in.email,
+            hashed_password=await password_hasher.hash(user_in.password)
+        )
+        db.add(db_user)
+        try:
+            await db.commit()
+        except IntegrityError:
+            # 哈希计算期间同一邮箱被并发注册，由唯一约束兜底
+            await db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="邮箱已被注册"
+            )
+        await db.refresh(db_user)
+        
+        return db_user
+    
+    @staticmethod
+    async def login(db: AsyncSession, email: str, password: str) -> Optional[User]:
+        """
+        验证邮箱和密码，失败返回 None
+
+        校验在 password_hasher 的线程池中进行；已有哈希的成本因子与 BCRYPT_ROUNDS 不一致时顺带重新哈希并保存
+        """
+        user = await db.scalar(select(User).where(User.email == email))
+        if not user:
+            return None
+        await db.commit()  # 计算哈希前把连接还给连接池（expire_on_commit=False，user 仍可用）
+        verified, new_hash = await password_hasher.verify_and_update(password, user.hashed_password)
+        if not verified:
+            return None
+        if new_hash:
+            user.hashed_password = new_hash
+            await db.commit()
+        return user
+    
     @staticmethod
     def authenticate_user(db: Session, email: str, password: str):
         """验证用户"""
@@ -94,13 +144,38 @@ class AuthService:
         except JWTError:
             raise credentials_exception
         
+        exp = payload.get("exp")
+        
+        # 优先使用缓存的用户快照，避免每个请求都查询一次用户表
+        snapshot = principal_cache.get(email, exp)
+        if snapshot is not None:
+            return AuthService._user_from_snapshot(db, snapshot)
+        
         # 查询用户
         user = db.query(User).filter(User.email == email).first()
         if user is None:
             raise credentials_exception
         
+        expires_in = exp - time.time() if isinstance(exp, (int, float)) else None
+        principal_cache.set(email, exp, AuthService._user_snapshot(user), expires_in)
+        
         return user
     
+    @staticmethod
+    def _user_snapshot(user: User) -> dict:
+        """提取用户的列属性快照（不含关系）"""
+        return {
+            attr.key: getattr(user, attr.key)
+            for attr in inspect(User).column_attrs
+        }
+    
+    @staticmethod
+    def _user_from_snapshot(db: Session, snapshot: dict) -> User:
+        """由快照重建用户并挂到当前会话上，不产生 SELECT"""
+        user = User(**snapshot)
+        make_transient_to_detached(user)
+        return db.merge(user, load=False)
+    
     @staticmethod
     def get_current_active_user(current_user: User = Depends(get_current_user)):
         """获取当前活跃用户"""
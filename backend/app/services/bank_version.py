@@ -0,0 +1,33 @@
+# app/services/bank_version.py
+from datetime import datetime, timezone
+from email.utils import format_datetime
+
+from sqlalchemy import Update, update
+
+from app.db.models.quiz import QuestionBank
+
+
+def bump_bank_version(bank_id: int) -> Update:
+    """
+    题库内容（题库本身、问题或选项）变化时递增版本号，同时刷新 updated_at
+
+    与写入放在同一事务中执行，条件 GET 只需按主键取回版本号即可判断是否变化
+    """
+    return update(QuestionBank).where(QuestionBank.id == bank_id).values(version=QuestionBank.version + 1)
+
+
+def bank_etag(bank_id: int, version: int, view: str, **params) -> str:
+    """
+    题库内容的强 ETag
+
+    强 ETag 要求字节相同，view 和分页参数区分同一版本下的不同表示（题库详情、问题列表的各页）
+    """
+    suffix = "".join(f"-{name}{value}" for name, value in sorted(params.items()))
+    return f'"bank-{bank_id}-v{version}-{view}{suffix}"'
+
+
+def http_date(value: datetime) -> str:
+    """Last-Modified 使用的 HTTP 日期；SQLite 返回的无时区时间按 UTC 处理"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
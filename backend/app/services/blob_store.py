@@ -0,0 +1,96 @@
+# app/services/blob_store.py
+import asyncio
+import contextlib
+import os
+import uuid
+import weakref
+from pathlib import Path
+from typing import AsyncIterator
+
+from app.config import settings
+
+try:  # 多个工作进程之间用文件锁互斥（仅 POSIX）
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+
+class BlobStore:
+    """
+    按内容哈希寻址的上传文件存储
+
+    相同内容只在磁盘上保存一份：`<root>/<h[:2]>/<h[2:4]>/<sha256>`。
+    引用计数来自 File 表中相同 content_hash 的记录数，
+    最后一条引用删除后才删除物理文件。根目录不在公开挂载的上传目录下，
+    否则知道文件哈希就能确认某份文档是否被上传过。
+    """
+
+    def __init__(self, root=None):
+        self._root = Path(root) if root is not None else None
+        self._locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+    @property
+    def root(self) -> Path:
+        # 未指定时跟随当前配置
+        return self._root or Path(settings.BLOB_DIRECTORY)
+
+    def path_for(self, content_hash: str) -> Path:
+        return self.root / content_hash[:2] / content_hash[2:4] / content_hash
+
+    def tmp_path(self) -> Path:
+        """上传过程中使用的临时文件路径（与 blob 同一文件系统，保证重命名是原子的）"""
+        tmp_dir = self.root / "tmp"
+        tmp_dir.mkdir(parents=True, exist_ok=True)
+        return tmp_dir / f"{uuid.uuid4()}.part"
+
+    def lock_path(self, content_hash: str) -> Path:
+        return self.root / "locks" / content_hash[:2] / f"{content_hash}.lock"
+
+    @contextlib.asynccontextmanager
+    async def lock(self, content_hash: str) -> AsyncIterator[None]:
+        """
+        同一哈希的写入与删除互斥，避免删除最后引用时与新上传交错
+
+        进程内先用 asyncio.Lock 排队，再对 lock_path 加 flock 与其它进程互斥。
+        flock 以非阻塞方式轮询，不占用线程，等待期间被取消也不会遗留锁。
+        锁文件在 blob 删除后保留，删掉会让等待中的进程锁住已脱离目录的文件。
+        """
+        local = self._locks.get(content_hash)
+        if local is None:
+            local = asyncio.Lock()
+            self._locks[content_hash] = local
+        async with local:
+            if fcntl is None:  # pragma: no cover
+                yield
+                return
+            path = self.lock_path(content_hash)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(path, "ab") as file:
+                while True:
+                    try:
+                        fcntl.flock(file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                        break
+                    except BlockingIOError:
+                        await asyncio.sleep(settings.BLOB_LOCK_POLL_SECONDS)
+                # 关闭文件即释放 flock
+                yield
+
+    def store(self, tmp_path: Path, content_hash: str) -> Path:
+        """把临时文件放到 blob 位置；已存在相同内容时直接丢弃临时文件"""
+        path = self.path_for(content_hash)
+        if path.exists():
+            os.remove(tmp_path)
+        else:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(tmp_path, path)
+        return path
+
+    def remove(self, content_hash: str):
+        try:
+            os.remove(self.path_for(content_hash))
+        except OSError:
+            # 如果文件不存在，忽略错误
+            pass
+
+
+blob_store = BlobStore()
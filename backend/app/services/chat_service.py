@@ -0,0 +1,410 @@
+# app/services/chat_service.py
+import json
+import logging
+import uuid
+from contextlib import aclosing
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import and_, delete, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.db.base import AsyncSessionLocal
+from app.db.models.chat import Conversation, Message, MessageRole
+from app.db.models.quiz import QuestionBank
+from app.db.models.user import User
+from app.llm import LLMClient, LLMError, retrieval_index
+from app.schemas.chat import ChatResponse, ConversationResponse, MessagePage, MessageResponse
+from app.services.document_parser import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+TITLE_LENGTH = 50
+MESSAGE_OVERHEAD_TOKENS = 4  # 每条消息的角色、分隔符开销
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def _message_tokens(message: Message) -> int:
+    return estimate_tokens(message.content) + MESSAGE_OVERHEAD_TOKENS
+
+
+def _older_than(message: Message):
+    """键集分页条件：排在 message 之前的消息（按 created_at, id）"""
+    return or_(
+        Message.created_at < message.created_at,
+        and_(Message.created_at == message.created_at, Message.id < message.id),
+    )
+
+
+def _not_summarized(conversation: Conversation):
+    """尚未并入摘要的消息：排在摘要游标 (summarized_until, summarized_until_id) 之后"""
+    return or_(
+        Message.created_at > conversation.summarized_until,
+        and_(
+            Message.created_at == conversation.summarized_until,
+            Message.id > conversation.summarized_until_id,
+        ),
+    )
+
+
+def _conversation_response(conversation: Conversation, messages: Sequence[Message] = ()) -> ConversationResponse:
+    return ConversationResponse(
+        id=conversation.id,
+        bank_id=conversation.bank_id,
+        user_id=conversation.user_id,
+        title=conversation.title,
+        created_at=conversation.created_at,
+        updated_at=conversation.updated_at,
+        messages=[MessageResponse.model_validate(message) for message in messages],
+    )
+
+
+@dataclass
+class ChatTurn:
+    """一轮问答的上下文：用户消息已保存，messages 为发送给模型的消息列表"""
+    conversation_id: str
+    messages: List[Dict[str, str]]
+
+
+class ChatService:
+    @staticmethod
+    async def _get_bank(db: AsyncSession, bank_id: int, current_user: User) -> QuestionBank:
+        bank = await db.scalar(select(QuestionBank).where(
+            QuestionBank.id == bank_id,
+            QuestionBank.user_id == current_user.id
+        ))
+        if not bank:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="题库不存在或无权访问"
+            )
+        return bank
+
+    @staticmethod
+    async def get_conversation(db: AsyncSession, conversation_id: str, current_user: User) -> Conversation:
+        conversation = await db.get(Conversation, conversation_id)
+        if not conversation or conversation.user_id != current_user.id:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="对话不存在或无权访问"
+            )
+        return conversation
+
+    @staticmethod
+    async def create_conversation(
+        db: AsyncSession, bank_id: int, title: str, current_user: User
+    ) -> ConversationResponse:
+        await ChatService._get_bank(db, bank_id, current_user)
+        now = _now()
+        conversation = Conversation(
+            id=str(uuid.uuid4()), bank_id=bank_id, user_id=current_user.id,
+            title=title, created_at=now, updated_at=now,
+        )
+        db.add(conversation)
+        await db.commit()
+        return _conversation_response(conversation)
+
+    @staticmethod
+    async def list_conversations(
+        db: AsyncSession, current_user: User, bank_id: Optional[int] = None, skip: int = 0, limit: int = 20
+    ) -> List[ConversationResponse]:
+        query = select(Conversation).where(Conversation.user_id == current_user.id)
+        if bank_id is not None:
+            query = query.where(Conversation.bank_id == bank_id)
+        conversations = await db.scalars(
+            query.order_by(Conversation.updated_at.desc(), Conversation.id).offset(skip).limit(limit)
+        )
+        return [_conversation_response(conversation) for conversation in conversations]
+
+    @staticmethod
+    async def get_conversation_detail(
+        db: AsyncSession, conversation_id: str, current_user: User
+    ) -> ConversationResponse:
+        """对话详情，附带最近一页消息；更早的消息通过 list_messages 分页获取"""
+        conversation = await ChatService.get_conversation(db, conversation_id, current_user)
+        page = await ChatService.list_messages(db, conversation_id, current_user)
+        return _conversation_response(conversation, page.items)
+
+    @staticmethod
+    async def delete_conversation(db: AsyncSession, conversation_id: str, current_user: User):
+        conversation = await ChatService.get_conversation(db, conversation_id, current_user)
+        await db.execute(delete(Message).where(Message.conversation_id == conversation.id))
+        await db.execute(delete(Conversation).where(Conversation.id == conversation.id))
+        await db.commit()
+
+    @staticmethod
+    async def list_messages(
+        db: AsyncSession,
+        conversation_id: str,
+        current_user: User,
+        before: Optional[str] = None,
+        limit: Optional[int] = None
+    ) -> MessagePage:
+        """
+        键集分页读取消息：返回 before 之前最近的 limit 条（按时间正序）
+
+        按 (created_at, id) 定位，翻页代价与对话长度无关。
+        """
+        await ChatService.get_conversation(db, conversation_id, current_user)
+        limit = limit or settings.CHAT_HISTORY_PAGE_SIZE
+        query = select(Message).where(Message.conversation_id == conversation_id)
+        if before:
+            cursor = await db.get(Message, before)
+            if cursor is None or cursor.conversation_id != conversation_id:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="无效的分页游标"
+                )
+            query = query.where(_older_than(cursor))
+        messages = list((await db.scalars(
+            query.order_by(Message.created_at.desc(), Message.id.desc()).limit(limit + 1)
+        )).all())
+
+        has_more = len(messages) > limit
+        messages = list(reversed(messages[:limit]))
+        return MessagePage(
+            items=[MessageResponse.model_validate(message) for message in messages],
+            next_before=messages[0].id if has_more else None,
+        )
+
+    @staticmethod
+    async def _load_window(db: AsyncSession, conversation: Conversation) -> Tuple[List[Message], bool]:
+        """
+        从最新的消息往前按页读取，直到用完 token 预算
+
+        只读取尚未并入摘要的消息。返回窗口内的消息（按时间正序），以及窗口之外
+        是否还有未并入摘要的更早消息。
+        """
+        budget = settings.CHAT_CONTEXT_TOKENS
+        window: List[Message] = []
+        query = select(Message).where(Message.conversation_id == conversation.id)
+        if conversation.summarized_until is not None:
+            query = query.where(_not_summarized(conversation))
+        query = query.order_by(Message.created_at.desc(), Message.id.desc())
+
+        while True:
+            page_query = query if not window else query.where(_older_than(window[-1]))
+            page = (await db.scalars(page_query.limit(settings.CHAT_HISTORY_PAGE_SIZE))).all()
+            for message in page:
+                tokens = _message_tokens(message)
+                if tokens > budget:
+                    return list(reversed(window)), True
+                budget -= tokens
+                window.append(message)
+            if len(page) < settings.CHAT_HISTORY_PAGE_SIZE:
+                return list(reversed(window)), False
+
+    @staticmethod
+    async def prepare_turn(
+        db: AsyncSession,
+        bank_id: int,
+        conversation_id: Optional[str],
+        content: str,
+        current_user: User
+    ) -> ChatTurn:
+        """
+        校验题库与对话，保存用户消息并组装发送给模型的上下文
+
+        上下文只包含检索到的相关题库片段、滚动摘要和 token 预算内的最近消息，
+        每轮的读取量和模型输入长度不随对话或文档变长而增长。对话不存在时（例如前端传入占位ID）新建一个对话，
+        新ID随回复返回。
+        """
+        bank = await ChatService._get_bank(db, bank_id, current_user)
+
+        conversation = await db.get(Conversation, conversation_id) if conversation_id else None
+        if conversation is None:
+            now = _now()
+            conversation = Conversation(
+                id=str(uuid.uuid4()),
+                bank_id=bank_id,
+                user_id=current_user.id,
+                title=content.strip()[:TITLE_LENGTH] or "新对话",
+                created_at=now,
+                updated_at=now,
+            )
+            db.add(conversation)
+            history = []
+        elif conversation.user_id != current_user.id or conversation.bank_id != bank_id:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="对话不存在或无权访问"
+            )
+        else:
+            history, _ = await ChatService._load_window(db, conversation)
+
+        db.add(Message(
+            id=str(uuid.uuid4()),
+            conversation_id=conversation.id,
+            role=MessageRole.user,
+            content=content,
+            created_at=_now(),
+        ))
+        await db.commit()
+
+        # 只把与本轮问题相关的题库片段发给模型，而不是整份文档
+        passages = await retrieval_index.search(db, bank_id, content)
+        system = f"你是题库「{bank.name}」的学习助手，请结合题库主题简洁、准确地回答用户的问题。"
+        if passages:
+            references = "\n\n".join(f"[{i}] {passage.text}" for i, passage in enumerate(passages, start=1))
+            system += f"\n请优先依据以下题库资料作答，资料中没有的内容请说明：\n{references}"
+        messages = [{"role": "system", "content": system}]
+        if conversation.summary:
+            messages.append({"role": "system", "content": f"此前对话的摘要：{conversation.summary}"})
+        messages += [{"role": message.role.value, "content": message.content} for message in history]
+        messages.append({"role": "user", "content": content})
+        return ChatTurn(conversation_id=conversation.id, messages=messages)
+
+    @staticmethod
+    async def compact(conversation_id: str, client: Optional[LLMClient] = None):
+        """
+        把滑出上下文窗口的消息并入滚动摘要
+
+        每次最多并入一页消息，在回复发出之后执行；摘要失败时只记录日志，
+        下一轮仍使用预算内的窗口。读取和写入各用一个短会话，调用模型期间
+        不占用数据库连接；写入时若摘要已被并发的压缩推进，则放弃本次结果。
+        """
+        async with AsyncSessionLocal() as db:
+            conversation = await db.get(Conversation, conversation_id)
+            if conversation is None:
+                return
+            window, overflow = await ChatService._load_window(db, conversation)
+            if not overflow:
+                return
+
+            query = select(Message).where(Message.conversation_id == conversation_id)
+            if conversation.summarized_until is not None:
+                query = query.where(_not_summarized(conversation))
+            if window:
+                query = query.where(_older_than(window[0]))
+            folded = (await db.scalars(
+                query.order_by(Message.created_at, Message.id).limit(settings.CHAT_HISTORY_PAGE_SIZE)
+            )).all()
+            if not folded:
+                return
+
+            previous = (conversation.summarized_until, conversation.summarized_until_id)
+            cursor = (folded[-1].created_at, folded[-1].id)
+            transcript = "\n".join(
+                f"{'用户' if message.role == MessageRole.user else '助手'}：{message.content}"
+                for message in folded
+            )
+            prompt = (
+                "请把以下新增对话并入已有摘要，保留用户关心的问题、得到的结论和尚未解决的事项，"
+                f"只输出更新后的摘要，不超过{settings.CHAT_SUMMARY_TOKENS}字。\n"
+                f"已有摘要：{conversation.summary or '无'}\n新增对话：\n{transcript}"
+            )
+
+        client = client or LLMClient()
+        try:
+            response = await client.chat_completion(
+                [{"role": "user", "content": prompt}],
+                temperature=0, max_tokens=settings.CHAT_SUMMARY_TOKENS
+            )
+            summary = response["choices"][0]["message"]["content"]
+        except (LLMError, KeyError, IndexError, TypeError) as e:
+            logger.warning("Summarizing conversation %s failed: %s", conversation_id, e)
+            return
+
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                update(Conversation)
+                .where(
+                    Conversation.id == conversation_id,
+                    Conversation.summarized_until.is_not_distinct_from(previous[0]),
+                    Conversation.summarized_until_id.is_not_distinct_from(previous[1]),
+                )
+                .values(
+                    summary=(summary or "").strip(),
+                    summarized_until=cursor[0],
+                    summarized_until_id=cursor[1],
+                )
+            )
+            await db.commit()
+            if result.rowcount == 0:
+                logger.info("Summary of conversation %s was advanced concurrently, dropping", conversation_id)
+
+    @staticmethod
+    async def save_reply(conversation_id: str, content: str, message_id: Optional[str] = None) -> Message:
+        """在新的短会话中保存助手回复，不依赖请求期间的数据库会话"""
+        message = Message(
+            id=message_id or str(uuid.uuid4()),
+            conversation_id=conversation_id,
+            role=MessageRole.assistant,
+            content=content,
+            created_at=_now(),
+        )
+        async with AsyncSessionLocal() as db:
+            db.add(message)
+            await db.execute(
+                update(Conversation)
+                .where(Conversation.id == conversation_id)
+                .values(updated_at=message.created_at)
+            )
+            await db.commit()
+        return message
+
+    @staticmethod
+    async def reply(turn: ChatTurn, client: Optional[LLMClient] = None) -> ChatResponse:
+        """一次性生成完整回复并保存"""
+        client = client or LLMClient()
+        try:
+            response = await client.chat_completion(turn.messages, temperature=settings.CHAT_TEMPERATURE)
+            content = response["choices"][0]["message"]["content"] or ""
+        except LLMError as e:
+            raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=f"模型调用失败: {e}")
+        except (KeyError, IndexError, TypeError):
+            raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail="模型返回格式有误")
+
+        message = await ChatService.save_reply(turn.conversation_id, content)
+        return ChatResponse(
+            message_id=message.id,
+            conversation_id=turn.conversation_id,
+            content=content,
+            created_at=message.created_at.isoformat(),
+        )
+
+    @staticmethod
+    async def stream_reply(turn: ChatTurn, client: Optional[LLMClient] = None) -> AsyncIterator[str]:
+        """
+        以 Server-Sent Events 逐段推送回复
+
+        事件依次为 start（对话与消息ID）、若干 delta、done 或 error。客户端断开时
+        生成器被取消，上游 LLM 请求随之关闭，未完成的回复不保存；完整回复在结束后
+        用新的短会话写入，推送期间不占用数据库连接。摘要压缩由接口在响应结束后
+        作为后台任务执行。
+        """
+        client = client or LLMClient()
+        message_id = str(uuid.uuid4())
+        yield _sse("start", {"conversation_id": turn.conversation_id, "message_id": message_id})
+
+        parts: List[str] = []
+        try:
+            # 本生成器在 yield 处被关闭时也立即关闭上游流，而不是等垃圾回收
+            async with aclosing(client.stream_completion(
+                turn.messages, temperature=settings.CHAT_TEMPERATURE
+            )) as deltas:
+                async for delta in deltas:
+                    parts.append(delta)
+                    yield _sse("delta", {"content": delta})
+        except LLMError as e:
+            logger.warning("Chat stream for conversation %s failed: %s", turn.conversation_id, e)
+            yield _sse("error", {"detail": f"模型调用失败: {e}"})
+            return
+
+        message = await ChatService.save_reply(turn.conversation_id, "".join(parts), message_id)
+        yield _sse("done", {
+            "message_id": message.id,
+            "conversation_id": turn.conversation_id,
+            "content": message.content,
+            "created_at": message.created_at.isoformat(),
+        })
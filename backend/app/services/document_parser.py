@@ -0,0 +1,184 @@
+# app/services/document_parser.py
+"""
+文档文本提取、规范化与分块
+
+这里只有纯函数，不依赖数据库，供解析进程池中的工作进程调用。
+"""
+import html
+import os
+import re
+import unicodedata
+from html.parser import HTMLParser
+from typing import List, Optional, Tuple
+
+SUPPORTED_TYPES = ("text", "markdown", "html", "pdf")
+
+_EXTENSIONS = {
+    ".txt": "text",
+    ".text": "text",
+    ".md": "markdown",
+    ".markdown": "markdown",
+    ".html": "html",
+    ".htm": "html",
+    ".pdf": "pdf",
+}
+
+_CONTENT_TYPES = {
+    "text/plain": "text",
+    "text/markdown": "markdown",
+    "text/html": "html",
+    "application/pdf": "pdf",
+}
+
+# 中日韩字符大致一个字一个 token，其它文字按单词/标点计
+_TOKEN_PATTERN = re.compile(r"[\u3040-\u30ff\u3400-\u9fff\uf900-\ufaff\uac00-\ud7af]|\w+|[^\w\s]")
+
+
+def detect_type(filename: Optional[str], content_type: Optional[str]) -> Optional[str]:
+    """根据扩展名或 Content-Type 判断文档类型，不支持时返回 None"""
+    extension = os.path.splitext(filename or "")[1].lower()
+    if extension in _EXTENSIONS:
+        return _EXTENSIONS[extension]
+    if content_type:
+        return _CONTENT_TYPES.get(content_type.split(";")[0].strip().lower())
+    return None
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估计 token 数，用于按预算分块"""
+    return len(_TOKEN_PATTERN.findall(text))
+
+
+class _HTMLTextExtractor(HTMLParser):
+    _SKIP = {"script", "style", "noscript", "head", "template"}
+    _BLOCK = {"p", "div", "br", "li", "tr", "h1", "h2", "h3", "h4", "h5", "h6",
+              "section", "article", "pre", "blockquote", "table", "ul", "ol"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts: List[str] = []
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self._SKIP:
+            self._skip_depth += 1
+        elif tag in self._BLOCK:
+            self.parts.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in self._SKIP:
+            self._skip_depth = max(self._skip_depth - 1, 0)
+        elif tag in self._BLOCK:
+            self.parts.append("\n")
+
+    def handle_data(self, data):
+        if not self._skip_depth:
+            self.parts.append(data)
+
+
+def _html_to_text(source: str) -> str:
+    extractor = _HTMLTextExtractor()
+    extractor.feed(source)
+    extractor.close()
+    return "".join(extractor.parts)
+
+
+_MD_RULES = [
+    (re.compile(r"^```.*$", re.MULTILINE), ""),              # 代码块围栏
+    (re.compile(r"!\[([^\]]*)\]\([^)]*\)"), r"\1"),           # 图片
+    (re.compile(r"\[([^\]]+)\]\([^)]*\)"), r"\1"),            # 链接
+    (re.compile(r"^\s{0,3}#{1,6}\s*", re.MULTILINE), ""),     # 标题
+    (re.compile(r"^\s{0,3}>\s?", re.MULTILINE), ""),          # 引用
+    (re.compile(r"^\s*[-*+]\s+", re.MULTILINE), ""),          # 列表
+    (re.compile(r"(\*\*|__|\*|_|`)(?=\S)(.+?)(?<=\S)\1"), r"\2"),  # 强调、行内代码
+]
+
+
+def _markdown_to_text(source: str) -> str:
+    for pattern, replacement in _MD_RULES:
+        source = pattern.sub(replacement, source)
+    return html.unescape(source)
+
+
+def _pdf_to_text(path: str) -> str:
+    try:
+        from pypdf import PdfReader
+    except ImportError as e:  # pragma: no cover - 取决于部署环境
+        raise RuntimeError("PDF parsing requires the 'pypdf' package") from e
+    reader = PdfReader(path)
+    return "\n\n".join(page.extract_text() or "" for page in reader.pages)
+
+
+def extract_text(path: str, doc_type: str) -> str:
+    """从文件中提取原始文本"""
+    if doc_type == "pdf":
+        return _pdf_to_text(path)
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        source = f.read()
+    if doc_type == "html":
+        return _html_to_text(source)
+    if doc_type == "markdown":
+        return _markdown_to_text(source)
+    return source
+
+
+def normalize_text(text: str) -> str:
+    """统一 Unicode 形式和空白：行内多余空白合并，最多保留一个空行"""
+    text = unicodedata.normalize("NFKC", text)
+    text = text.replace("\r\n", "\n").replace("\r", "\n")
+    text = "".join(ch for ch in text if ch in "\n\t" or unicodedata.category(ch)[0] != "C")
+    lines = [re.sub(r"[ \t]+", " ", line).strip() for line in text.split("\n")]
+    text = "\n".join(lines)
+    return re.sub(r"\n{3,}", "\n\n", text).strip()
+
+
+def chunk_text(text: str, max_tokens: int) -> List[Tuple[str, int]]:
+    """
+    按段落把文本切成不超过 max_tokens 的块
+
+    段落尽量保持完整，过长的段落再按句子切分。返回 [(块内容, token 数)]。
+    """
+    pieces: List[Tuple[str, int]] = []
+    for paragraph in text.split("\n\n"):
+        tokens = estimate_tokens(paragraph)
+        if tokens <= max_tokens:
+            pieces.append((paragraph, tokens))
+            continue
+        for sentence in re.split(r"(?<=[。！？.!?；;])\s*|\n", paragraph):
+            if sentence:
+                pieces.extend(_split_long(sentence, max_tokens))
+
+    chunks: List[Tuple[str, int]] = []
+    current: List[str] = []
+    current_tokens = 0
+    for piece, tokens in pieces:
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append(("\n\n".join(current), current_tokens))
+            current, current_tokens = [], 0
+        current.append(piece)
+        current_tokens += tokens
+    if current:
+        chunks.append(("\n\n".join(current), current_tokens))
+    return chunks
+
+
+def _split_long(sentence: str, max_tokens: int) -> List[Tuple[str, int]]:
+    """单个句子仍超出预算时按 token 边界硬切"""
+    tokens = estimate_tokens(sentence)
+    if tokens <= max_tokens:
+        return [(sentence, tokens)]
+    matches = list(_TOKEN_PATTERN.finditer(sentence))
+    parts = []
+    for start in range(0, len(matches), max_tokens):
+        window = matches[start:start + max_tokens]
+        end = matches[start + max_tokens].start() if start + max_tokens < len(matches) else len(sentence)
+        parts.append((sentence[window[0].start():end].strip(), len(window)))
+    return parts
+
+
+def parse_document(path: str, doc_type: str, max_tokens: int) -> Tuple[str, List[Tuple[str, int]]]:
+    """工作进程入口：提取、规范化并分块，返回 (规范化全文, 分块列表)"""
+    if doc_type not in SUPPORTED_TYPES:
+        raise ValueError(f"Unsupported document type: {doc_type}")
+    text = normalize_text(extract_text(path, doc_type))
+    return text, chunk_text(text, max_tokens) if text else []
@@ -0,0 +1,262 @@
+# app/services/duplicate_index.py
+import random
+import re
+import threading
+import time
+import unicodedata
+import zlib
+from array import array
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple, Union
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.db.models.quiz import Question
+
+try:  # 可选依赖：批量计算签名时向量化
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+NUM_PERM = 64
+BANDS = 16  # 16 段 × 4 行：相似度 0.8 的一对几乎必然落入同一桶，0.3 以下极少成为候选
+ROWS = NUM_PERM // BANDS
+SIGNATURE_BATCH_SIZE = 1000
+_PRIME = (1 << 31) - 1  # 哈希族 (a·h + b) mod p，乘积小于 2^63，numpy 可以直接用 uint64 计算
+_rng = random.Random(20240501)
+_A = [_rng.randrange(1, _PRIME) for _ in range(NUM_PERM)]
+_B = [_rng.randrange(0, _PRIME) for _ in range(NUM_PERM)]
+
+
+def shingles(prompt: str) -> Set[str]:
+    """题干规范化后的字符 3-gram，用于近似重复判断"""
+    text = unicodedata.normalize("NFKC", prompt).lower()
+    text = re.sub(r"[\W_]+", "", text)
+    if len(text) < 3:
+        return {text}
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _hashes(prompt: str) -> List[int]:
+    return [zlib.crc32(s.encode("utf-8")) for s in shingles(prompt)]
+
+
+def signatures(prompts: Sequence[str]) -> List[array]:
+    """
+    题干 3-gram 集合的 MinHash 签名；两个签名相同位置相等的比例估计 Jaccard 相似度
+
+    安装了 numpy 时按批向量化计算，结果与逐个计算相同
+    """
+    if np is None:
+        return [
+            array("I", (min([(a * h + b) % _PRIME for h in hashes]) for a, b in zip(_A, _B)))
+            for hashes in map(_hashes, prompts)
+        ]
+
+    a = np.array(_A, dtype=np.uint64)
+    b = np.array(_B, dtype=np.uint64)
+    result: List[array] = []
+    for start in range(0, len(prompts), SIGNATURE_BATCH_SIZE):
+        batch = [_hashes(prompt) for prompt in prompts[start:start + SIGNATURE_BATCH_SIZE]]
+        offsets = np.cumsum([0] + [len(hashes) for hashes in batch[:-1]])
+        hashes = np.fromiter((h for hs in batch for h in hs), dtype=np.uint64)
+        values = (hashes[:, None] * a + b) % np.uint64(_PRIME)
+        for row in np.minimum.reduceat(values, offsets, axis=0).astype(np.uint32):
+            result.append(array("I", row.tobytes()))
+    return result
+
+
+def signature(prompt: str) -> array:
+    return signatures([prompt])[0]
+
+
+def similarity(a: array, b: array) -> float:
+    return sum(x == y for x, y in zip(a, b)) / NUM_PERM
+
+
+def _bands(sig: array) -> List[int]:
+    """每段签名的桶键；哈希碰撞只会多出候选，确认时会被过滤"""
+    return [hash((i, sig[i * ROWS:(i + 1) * ROWS].tobytes())) for i in range(BANDS)]
+
+
+class SignatureIndex:
+    """
+    一组问题的 MinHash/LSH 索引
+
+    签名按段分桶，只有至少一段完全相同的问题才成为候选，再用签名估计相似度确认。
+    查询、增删的代价与桶的大小相关，与问题总数无关。
+    绝大多数桶只有一个问题，直接存问题ID而不是集合，减少对象数量。
+    """
+
+    def __init__(self, threshold: float):
+        self.threshold = threshold
+        self._signatures: Dict[int, array] = {}
+        self._buckets: Dict[int, Union[int, Set[int]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def add(self, question_id: int, sig: array):
+        self.remove(question_id)
+        self._signatures[question_id] = sig
+        buckets = self._buckets
+        for key in _bands(sig):
+            bucket = buckets.get(key)
+            if bucket is None:
+                buckets[key] = question_id
+            elif isinstance(bucket, set):
+                bucket.add(question_id)
+            else:
+                buckets[key] = {bucket, question_id}
+
+    def remove(self, question_id: int):
+        sig = self._signatures.pop(question_id, None)
+        if sig is None:
+            return
+        for key in _bands(sig):
+            bucket = self._buckets.get(key)
+            if bucket == question_id:
+                del self._buckets[key]
+            elif isinstance(bucket, set):
+                bucket.discard(question_id)
+                if len(bucket) == 1:
+                    self._buckets[key] = bucket.pop()
+
+    def query(self, sig: array, exclude: Optional[int] = None) -> List[Tuple[int, float]]:
+        """返回相似度不低于阈值的 (问题ID, 相似度)，按相似度降序"""
+        candidates: Set[int] = set()
+        for key in _bands(sig):
+            bucket = self._buckets.get(key)
+            if isinstance(bucket, set):
+                candidates |= bucket
+            elif bucket is not None:
+                candidates.add(bucket)
+        candidates.discard(exclude)
+        matches = [(question_id, similarity(sig, self._signatures[question_id])) for question_id in candidates]
+        return sorted(
+            ((question_id, score) for question_id, score in matches if score >= self.threshold),
+            key=lambda match: (-match[1], match[0])
+        )
+
+    def clusters(self) -> List[List[int]]:
+        """
+        把近似重复的问题归为一组（并查集），返回至少两个问题的组
+
+        每个桶内的问题依次与桶中已有的代表比较，与第一个确认相似的代表合并，都不相似时自己成为
+        新的代表；代表数通常很少，整体代价与问题数、段数近似成线性关系
+        """
+        parent = {question_id: question_id for question_id in self._signatures}
+
+        def find(x: int) -> int:
+            while parent[x] != x:
+                parent[x] = parent[parent[x]]
+                x = parent[x]
+            return x
+
+        for bucket in self._buckets.values():
+            if not isinstance(bucket, set):
+                continue
+            representatives: List[int] = []
+            for question_id in sorted(bucket):
+                for representative in representatives:
+                    if find(question_id) == find(representative):
+                        break
+                    if similarity(
+                        self._signatures[representative], self._signatures[question_id]
+                    ) >= self.threshold:
+                        parent[find(question_id)] = find(representative)
+                        break
+                else:
+                    representatives.append(question_id)
+
+        groups: Dict[int, List[int]] = {}
+        for question_id in sorted(self._signatures):
+            groups.setdefault(find(question_id), []).append(question_id)
+        return [group for group in groups.values() if len(group) > 1]
+
+
+class DuplicateIndex:
+    """
+    按题库缓存 SignatureIndex（LRU + TTL）
+
+    写操作通过 add / remove 增量更新已加载的索引；未加载的题库不做任何事，
+    下次检查时从数据库加载题干重新计算签名。
+    """
+
+    def __init__(self, threshold: float = 0.8, maxsize: int = 64, ttl: float = 600.0):
+        self.threshold = threshold
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._banks: "OrderedDict[int, Tuple[float, SignatureIndex]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def invalidate(self, bank_id: int):
+        with self._lock:
+            self._banks.pop(bank_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._banks.clear()
+
+    def add(self, bank_id: int, questions: Iterable[Tuple[int, str]]):
+        """问题新增或题干修改后调用，questions 为 (问题ID, 题干)"""
+        with self._lock:
+            entry = self._banks.get(bank_id)
+        if entry is None:
+            return
+        questions = list(questions)
+        question_ids, prompts = zip(*questions) if questions else ((), ())
+        computed = signatures(prompts)
+        with self._lock:
+            for question_id, sig in zip(question_ids, computed):
+                entry[1].add(question_id, sig)
+
+    def remove(self, bank_id: int, question_ids: Iterable[int]):
+        with self._lock:
+            entry = self._banks.get(bank_id)
+            if entry is not None:
+                for question_id in question_ids:
+                    entry[1].remove(question_id)
+
+    def find(self, db: Session, bank_id: int, prompt: str, exclude: Optional[int] = None) -> List[Tuple[int, float]]:
+        """返回题库中与 prompt 近似重复的 (问题ID, 相似度)"""
+        index = self._index(db, bank_id)
+        sig = signature(prompt)
+        with self._lock:
+            return index.query(sig, exclude)
+
+    def _index(self, db: Session, bank_id: int) -> SignatureIndex:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._banks.get(bank_id)
+            if entry is not None and entry[0] > now:
+                self._banks.move_to_end(bank_id)
+                return entry[1]
+
+        index = build_index(
+            db.connection().execute(select(Question.id, Question.prompt).where(Question.bank_id == bank_id)).all(),
+            self.threshold
+        )
+        with self._lock:
+            self._banks[bank_id] = (now + self.ttl, index)
+            self._banks.move_to_end(bank_id)
+            while len(self._banks) > self.maxsize:
+                self._banks.popitem(last=False)
+        return index
+
+
+def build_index(questions: Sequence[Tuple[int, str]], threshold: float) -> SignatureIndex:
+    index = SignatureIndex(threshold)
+    question_ids, prompts = zip(*questions) if questions else ((), ())
+    for question_id, sig in zip(question_ids, signatures(prompts)):
+        index.add(question_id, sig)
+    return index
+
+
+duplicate_index = DuplicateIndex(
+    threshold=settings.DUPLICATE_THRESHOLD,
+    maxsize=settings.DUPLICATE_CACHE_SIZE,
+    ttl=settings.DUPLICATE_CACHE_TTL_SECONDS,
+)
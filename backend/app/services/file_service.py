@@ -1,64 +1,65 @@
 # app/services/file_service.py
-from sqlalchemy.orm import Session
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import HTTPException, status, UploadFile
+from fastapi.concurrency import run_in_threadpool
+import hashlib
 import os
 import uuid
 from datetime import datetime
-import shutil
 from pathlib import Path
+from typing import Iterable, Optional, Tuple
 
 from app.db.models.user import User
 from app.db.models.file import File
 from app.db.models.quiz import QuestionBank
 from app.config import settings
+from app.llm.retrieval import retrieval_index
+from app.services.blob_store import blob_store
 
 class FileService:
     @staticmethod
-    async def upload_file(db: Session, file: UploadFile, bank_id: int, current_user: User):
-        """上传文件到指定题库"""
-        # 检查题库是否存在且属于当前用户
-        bank = db.query(QuestionBank).filter(
+    async def _check_bank(db: AsyncSession, bank_id: int, current_user: User):
+        """检查题库是否存在且属于当前用户"""
+        bank = await db.scalar(select(QuestionBank.id).where(
             QuestionBank.id == bank_id,
             QuestionBank.user_id == current_user.id
-        ).first()
+        ))
         
         if not bank:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Question bank not found or access denied"
             )
+    
+    @staticmethod
+    async def upload_file(db: AsyncSession, file: UploadFile, bank_id: int, current_user: User):
+        """上传文件到指定题库"""
+        await FileService._check_bank(db, bank_id, current_user)
         
-        # 生成唯一文件名
+        # 保存文件：分块写入临时文件，按内容哈希放入 blob 存储
         file_id = str(uuid.uuid4())
-        file_extension = os.path.splitext(file.filename)[1] if file.filename else ""
-        file_name = f"{file_id}{file_extension}"
-        
-        # 确保上传目录存在
-        upload_dir = Path(settings.UPLOAD_DIRECTORY) / str(current_user.id) / str(bank_id)
-        upload_dir.mkdir(parents=True, exist_ok=True)
-        
-        # 保存文件
-        file_path = upload_dir / file_name
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        
-        # 获取文件大小
-        file_size = os.path.getsize(file_path)
-        
-        # 创建文件记录
-        db_file = File(
-            id=file_id,
-            user_id=current_user.id,
-            bank_id=bank_id,
-            filename=file.filename,
-            filepath=str(file_path),
-            filetype=file.content_type,
-            filesize=file_size
-        )
-        
-        db.add(db_file)
-        db.commit()
-        db.refresh(db_file)
+        tmp_path = await run_in_threadpool(blob_store.tmp_path)
+        file_size, content_hash = await FileService._save_upload(file, tmp_path)
+        
+        async with blob_store.lock(content_hash):
+            file_path = await run_in_threadpool(blob_store.store, tmp_path, content_hash)
+            
+            # 创建文件记录
+            db_file = File(
+                id=file_id,
+                user_id=current_user.id,
+                bank_id=bank_id,
+                filename=file.filename,
+                filepath=str(file_path),
+                filetype=file.content_type,
+                filesize=file_size,
+                content_hash=content_hash
+            )
+            
+            db.add(db_file)
+            await db.commit()
+        await db.refresh(db_file)
         
         return {
             "id": db_file.id,
@@ -69,25 +70,62 @@ class FileService:
         }
     
     @staticmethod
-    def get_files_by_bank(db: Session, bank_id: int, current_user: User):
+    async def _save_upload(file: UploadFile, tmp_path: Path):
+        """
+        以流的方式把上传文件写入临时文件
+        
+        每次读取 UPLOAD_CHUNK_SIZE 字节，磁盘写入放到线程池中执行，不阻塞事件循环；
+        边写边统计大小和 SHA-256，超过 MAX_UPLOAD_SIZE 立即中止并删除临时文件。
+        写完后由 blob 存储原子重命名到最终位置，不会留下不完整的文件。
+        
+        返回 (文件大小, SHA-256 十六进制摘要)
+        """
+        if file.size is not None and file.size > settings.MAX_UPLOAD_SIZE:
+            raise FileService._too_large()
+        
+        digest = hashlib.sha256()
+        size = 0
+        buffer = await run_in_threadpool(open, tmp_path, "wb")
+        try:
+            while chunk := await file.read(settings.UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                if size > settings.MAX_UPLOAD_SIZE:
+                    raise FileService._too_large()
+                digest.update(chunk)
+                await run_in_threadpool(buffer.write, chunk)
+            await run_in_threadpool(buffer.close)
+        except BaseException:
+            await run_in_threadpool(buffer.close)
+            await run_in_threadpool(FileService.remove_quietly, tmp_path)
+            raise
+        
+        return size, digest.hexdigest()
+    
+    @staticmethod
+    def _too_large():
+        return HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"File exceeds the {settings.MAX_UPLOAD_SIZE} byte upload limit"
+        )
+    
+    @staticmethod
+    def remove_quietly(path):
+        """删除文件，文件不存在或已被删除时忽略"""
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+    
+    @staticmethod
+    async def get_files_by_bank(db: AsyncSession, bank_id: int, current_user: User):
         """获取指定题库的所有文件"""
-        # 检查题库是否存在且属于当前用户
-        bank = db.query(QuestionBank).filter(
-            QuestionBank.id == bank_id,
-            QuestionBank.user_id == current_user.id
-        ).first()
-        
-        if not bank:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Question bank not found or access denied"
-            )
+        await FileService._check_bank(db, bank_id, current_user)
         
         # 获取文件列表
-        files = db.query(File).filter(
+        files = (await db.scalars(select(File).where(
             File.bank_id == bank_id,
             File.user_id == current_user.id
-        ).all()
+        ))).all()
         
         return [
             {
@@ -101,13 +139,13 @@ class FileService:
         ]
     
     @staticmethod
-    def delete_file(db: Session, file_id: str, current_user: User):
+    async def delete_file(db: AsyncSession, file_id: str, current_user: User):
         """删除文件"""
         # 查找文件
-        file = db.query(File).filter(
+        file = await db.scalar(select(File).where(
             File.id == file_id,
             File.user_id == current_user.id
-        ).first()
+        ))
         
         if not file:
             raise HTTPException(
@@ -115,35 +153,67 @@ class FileService:
                 detail="File not found or access denied"
             )
         
-        # 删除物理文件
-        try:
-            os.remove(file.filepath)
-        except OSError:
-            # 如果文件不存在，忽略错误
-            pass
-        
-        # 删除数据库记录
-        db.delete(file)
-        db.commit()
+        if file.content_hash is None:
+            # 旧数据：每个文件单独存放
+            await db.delete(file)
+            await db.commit()
+            retrieval_index.remove_file(file.bank_id, file.id)
+            await run_in_threadpool(FileService.remove_quietly, file.filepath)
+            return {"success": True}
+        
+        # 删除数据库记录，最后一个引用消失时才删除物理文件
+        content_hash = file.content_hash
+        async with blob_store.lock(content_hash):
+            await db.delete(file)
+            await db.commit()
+            retrieval_index.remove_file(file.bank_id, file.id)
+            references = await db.scalar(select(func.count()).select_from(File).where(
+                File.content_hash == content_hash
+            ))
+            if references == 0:
+                await run_in_threadpool(blob_store.remove, content_hash)
         
         return {"success": True}
     
     @staticmethod
-    def get_user_files(db: Session, current_user: User, skip: int = 0, limit: int = 100):
+    async def release_storage(db: AsyncSession, stored: Iterable[Tuple[str, Optional[str]]]):
+        """
+        文件记录删除并提交后清理磁盘上的内容
+        
+        stored 为被删除文件的 (filepath, content_hash)：旧数据直接删除文件，
+        blob 在同一哈希的锁内确认已没有引用后才删除，与上传互斥
+        """
+        content_hashes = set()
+        for filepath, content_hash in stored:
+            if content_hash is None:
+                await run_in_threadpool(FileService.remove_quietly, filepath)
+            else:
+                content_hashes.add(content_hash)
+        
+        for content_hash in content_hashes:
+            async with blob_store.lock(content_hash):
+                references = await db.scalar(select(func.count()).select_from(File).where(
+                    File.content_hash == content_hash
+                ))
+                if references == 0:
+                    await run_in_threadpool(blob_store.remove, content_hash)
+    
+    @staticmethod
+    async def get_user_files(db: AsyncSession, current_user: User, skip: int = 0, limit: int = 100):
         """获取用户文件列表"""
-        files = db.query(File).filter(
+        files = (await db.scalars(select(File).where(
             File.user_id == current_user.id
-        ).offset(skip).limit(limit).all()
+        ).offset(skip).limit(limit))).all()
         
         return files
     
     @staticmethod
-    def get_file(db: Session, file_id: int, current_user: User):
+    async def get_file(db: AsyncSession, file_id: str, current_user: User):
         """获取文件详情"""
-        file = db.query(File).filter(
+        file = await db.scalar(select(File).where(
             File.id == file_id,
             File.user_id == current_user.id
-        ).first()
+        ))
         
         if not file:
             raise HTTPException(
@@ -154,12 +224,12 @@ class FileService:
         return file
     
     @staticmethod
-    def update_file(db: Session, file_id: int, file_update, current_user: User):
+    async def update_file(db: AsyncSession, file_id: str, file_update, current_user: User):
         """更新文件信息"""
-        file = db.query(File).filter(
+        file = await db.scalar(select(File).where(
             File.id == file_id,
             File.user_id == current_user.id
-        ).first()
+        ))
         
         if not file:
             raise HTTPException(
@@ -172,7 +242,7 @@ class FileService:
         for key, value in update_data.items():
             setattr(file, key, value)
         
-        db.commit()
-        db.refresh(file)
+        await db.commit()
+        await db.refresh(file)
         
         return file
\ No newline at end of file
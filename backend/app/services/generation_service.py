@@ -0,0 +1,139 @@
+# app/services/generation_service.py
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.db.models.user import User
+from app.llm import LLMClient, LLMError
+from app.schemas.quiz import QuestionCreate, QuestionGenerateResult
+from app.services.document_parser import chunk_text
+from app.services.duplicate_index import SignatureIndex, signature
+from app.services.file_service import FileService
+from app.services.import_service import ImportService
+from app.services.parse_service import DONE
+from app.services.question_sampler import question_sampler
+
+logger = logging.getLogger(__name__)
+
+# 进度回调：(已完成块数, 总块数, 已写入问题数)
+ProgressCallback = Callable[[int, int, int], Awaitable[None]]
+
+
+def allocate_questions(sizes: List[int], total: int) -> List[int]:
+    """按块大小把 total 道题分配到各块（最大余数法），合计恰好为 total"""
+    weight = sum(sizes)
+    if total <= 0 or weight <= 0:
+        return [0] * len(sizes)
+    quotas = [total * size / weight for size in sizes]
+    counts = [int(quota) for quota in quotas]
+    order = sorted(range(len(sizes)), key=lambda i: (quotas[i] - counts[i], sizes[i]), reverse=True)
+    for i in order[:total - sum(counts)]:
+        counts[i] += 1
+    return counts
+
+
+class QuestionDeduplicator:
+    """按题干 MinHash 签名过滤本次生成中近似重复的问题，每次判断只比较同桶的候选"""
+
+    def __init__(self, threshold: float):
+        self._index = SignatureIndex(threshold)
+
+    def add(self, prompt: str) -> bool:
+        """未与已接受的问题重复时记录并返回 True"""
+        sig = signature(prompt)
+        if self._index.query(sig):
+            return False
+        self._index.add(len(self._index), sig)
+        return True
+
+
+class GenerationService:
+    @staticmethod
+    async def generate_from_file(
+        db: AsyncSession,
+        bank_id: int,
+        file_id: str,
+        num_questions: int,
+        current_user: User,
+        question_type: str = "multiple_choice",
+        bypass_cache: bool = False,
+        client: Optional[LLMClient] = None,
+        on_progress: Optional[ProgressCallback] = None,
+    ) -> QuestionGenerateResult:
+        """
+        根据已解析的文件生成问题（map-reduce）
+
+        把解析出的全文按 token 预算切块，题目数按块大小分配，各块并发调用 LLM；
+        每完成一块就去重并写入题库，不等待全部完成。
+        """
+        await ImportService.check_bank(db, bank_id, current_user)
+        file = await FileService.get_file(db, file_id, current_user)
+        if file.parse_status != DONE or not file.parsed_text:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="文件尚未解析完成或没有可用文本"
+            )
+
+        started = time.perf_counter()
+        client = client or LLMClient()
+        chunks = chunk_text(file.parsed_text, settings.GENERATION_CHUNK_TOKENS)
+        counts = allocate_questions([tokens for _, tokens in chunks], num_questions)
+        jobs = [(content, count) for (content, _), count in zip(chunks, counts) if count]
+
+        semaphore = asyncio.Semaphore(settings.GENERATION_MAX_CONCURRENCY)
+
+        async def generate(content: str, count: int):
+            """流式生成一块的问题；中途失败时保留已解析出的部分"""
+            questions: List[QuestionCreate] = []
+            errors: List[str] = []
+            failed = False
+            async with semaphore:
+                try:
+                    async for question in client.stream_questions(
+                        content, bank_id, num_questions=count, question_type=question_type,
+                        bypass_cache=bypass_cache, errors=errors
+                    ):
+                        questions.append(question)
+                except LLMError as e:
+                    logger.warning("Question generation for a chunk of file %s failed: %s", file_id, e)
+                    failed = True
+            return questions, errors, failed
+
+        deduplicator = QuestionDeduplicator(settings.GENERATION_DEDUP_THRESHOLD)
+        stats: Dict[str, int] = {"generated": 0, "inserted": 0, "duplicates": 0, "invalid": 0, "failed_chunks": 0}
+        tasks = [asyncio.ensure_future(generate(content, count)) for content, count in jobs]
+        try:
+            for done, next_result in enumerate(asyncio.as_completed(tasks), start=1):
+                generated, errors, failed = await next_result
+                stats["failed_chunks"] += failed
+                stats["invalid"] += len(errors)
+                stats["generated"] += len(generated) + len(errors)
+
+                questions = []
+                for question in generated:
+                    if deduplicator.add(question.prompt):
+                        questions.append(question)
+                    else:
+                        stats["duplicates"] += 1
+
+                if questions:
+                    await ImportService.insert_batch(db, bank_id, questions, current_user.id)
+                    question_sampler.invalidate(bank_id)
+                    stats["inserted"] += len(questions)
+                if on_progress is not None:
+                    await on_progress(done, len(tasks), stats["inserted"])
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        return QuestionGenerateResult(
+            requested=num_questions,
+            chunks=len(tasks),
+            elapsed_seconds=round(time.perf_counter() - started, 4),
+            **stats,
+        )
@@ -0,0 +1,238 @@
+# app/services/grading_service.py
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, Iterable, Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.db.models.quiz import Question, QuestionOption, Quiz, QuizQuestion, QuizSubmission
+from app.db.models.user import User
+from app.schemas.quiz import QuizSubmissionResult
+from app.services.stat_accumulator import stat_accumulator
+
+
+def normalize_answer(text: Any) -> str:
+    """文本答案的比较形式：全半角统一、忽略大小写和空白"""
+    return "".join(unicodedata.normalize("NFKC", str(text)).casefold().split())
+
+
+@dataclass(frozen=True)
+class AnswerKey:
+    """一份测验的标准答案，按题目顺序排列"""
+    quiz_id: int
+    bank_id: int
+    question_ids: Tuple[int, ...]
+    correct_options: Dict[int, FrozenSet[int]]  # 选择题：问题ID -> 正确选项ID
+    options: Dict[int, FrozenSet[int]]  # 选择题：问题ID -> 全部选项ID
+    answers: Dict[int, str]  # 问题ID -> 规范化后的文本答案
+
+    def grade(self, answers: Dict[int, Any]) -> Dict[int, bool]:
+        """
+        一次遍历判分，返回每道题是否答对（未作答视为答错）
+
+        有选项的题目按选项ID判分，多选题需与正确选项完全一致；
+        也可以直接提交文本答案，与 Question.answer 比较
+        """
+        results: Dict[int, bool] = {}
+        for question_id in self.question_ids:
+            answer = answers.get(question_id)
+            if answer is None:
+                results[question_id] = False
+            elif isinstance(answer, str):
+                results[question_id] = normalize_answer(answer) == self.answers[question_id]
+            else:
+                selected = frozenset(answer) if isinstance(answer, list) else frozenset((answer,))
+                correct = self.correct_options.get(question_id)
+                results[question_id] = bool(correct) and selected == correct
+        return results
+
+
+class AnswerKeyCache:
+    """
+    按测验缓存标准答案（LRU + TTL）
+
+    测验创建后题目固定，只有题目本身（答案、选项）被修改或删除时需要失效；
+    本进程内的修改通过 invalidate_questions / invalidate_bank 立即生效，其它进程的修改在 TTL 后生效
+    """
+
+    def __init__(self, maxsize: int = 256, ttl: float = 300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._keys: "OrderedDict[int, Tuple[float, AnswerKey]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def invalidate(self, quiz_id: int):
+        with self._lock:
+            self._keys.pop(quiz_id, None)
+
+    def invalidate_questions(self, question_ids: Iterable[int]):
+        question_ids = set(question_ids)
+        with self._lock:
+            for quiz_id in [
+                quiz_id for quiz_id, (_, key) in self._keys.items()
+                if not question_ids.isdisjoint(key.question_ids)
+            ]:
+                del self._keys[quiz_id]
+
+    def invalidate_bank(self, bank_id: int):
+        with self._lock:
+            for quiz_id in [quiz_id for quiz_id, (_, key) in self._keys.items() if key.bank_id == bank_id]:
+                del self._keys[quiz_id]
+
+    def clear(self):
+        with self._lock:
+            self._keys.clear()
+
+    async def get(self, db: AsyncSession, quiz_id: int) -> Optional[AnswerKey]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._keys.get(quiz_id)
+            if entry is not None and entry[0] > now:
+                self._keys.move_to_end(quiz_id)
+                return entry[1]
+
+        key = await self._load(db, quiz_id)
+        if key is None:
+            return None
+        with self._lock:
+            self._keys[quiz_id] = (now + self.ttl, key)
+            self._keys.move_to_end(quiz_id)
+            while len(self._keys) > self.maxsize:
+                self._keys.popitem(last=False)
+        return key
+
+    @staticmethod
+    async def _load(db: AsyncSession, quiz_id: int) -> Optional[AnswerKey]:
+        """测验、题目、答案和选项用一条外连接查询取回"""
+        rows = (await db.execute(
+            select(
+                Quiz.bank_id, QuizQuestion.question_id, Question.answer,
+                QuestionOption.id.label("option_id"), QuestionOption.is_correct
+            )
+            .select_from(Quiz)
+            .outerjoin(QuizQuestion, QuizQuestion.quiz_id == Quiz.id)
+            .outerjoin(Question, Question.id == QuizQuestion.question_id)
+            .outerjoin(QuestionOption, QuestionOption.question_id == Question.id)
+            .where(Quiz.id == quiz_id)
+            .order_by(QuizQuestion.sequence_index, QuizQuestion.id, QuestionOption.id)
+        )).all()
+        if not rows:
+            return None
+
+        question_ids: Dict[int, None] = {}
+        answers: Dict[int, str] = {}
+        options: Dict[int, set] = {}
+        correct: Dict[int, set] = {}
+        for row in rows:
+            if row.question_id is None:
+                continue
+            question_ids.setdefault(row.question_id)
+            answers[row.question_id] = normalize_answer(row.answer or "")
+            if row.option_id is not None:
+                options.setdefault(row.question_id, set()).add(row.option_id)
+                if row.is_correct:
+                    correct.setdefault(row.question_id, set()).add(row.option_id)
+        return AnswerKey(
+            quiz_id=quiz_id,
+            bank_id=rows[0].bank_id,
+            question_ids=tuple(question_ids),
+            correct_options={question_id: frozenset(ids) for question_id, ids in correct.items()},
+            options={question_id: frozenset(ids) for question_id, ids in options.items()},
+            answers=answers,
+        )
+
+
+answer_key_cache = AnswerKeyCache(
+    maxsize=settings.ANSWER_KEY_CACHE_SIZE,
+    ttl=settings.ANSWER_KEY_CACHE_TTL_SECONDS,
+)
+
+
+class GradingService:
+    @staticmethod
+    def _parse_answers(key: AnswerKey, answers: Dict[str, Any]) -> Dict[int, Any]:
+        """校验答案引用的问题和选项都属于该测验"""
+        parsed: Dict[int, Any] = {}
+        for raw_id, answer in answers.items():
+            try:
+                question_id = int(raw_id)
+            except (TypeError, ValueError):
+                question_id = None
+            if question_id not in key.answers:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"问题 {raw_id} 不属于该测验"
+                )
+            if isinstance(answer, (int, list)) and not isinstance(answer, bool):
+                selected = answer if isinstance(answer, list) else [answer]
+                if not all(
+                    isinstance(option_id, int) and option_id in key.options.get(question_id, ())
+                    for option_id in selected
+                ):
+                    raise HTTPException(
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        detail=f"问题 {question_id} 的选项无效"
+                    )
+            elif answer is not None and not isinstance(answer, str):
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"问题 {question_id} 的答案应为选项ID、选项ID列表或文本"
+                )
+            parsed[question_id] = answer
+        return parsed
+
+    @staticmethod
+    async def submit(
+        db: AsyncSession,
+        quiz_id: int,
+        answers: Dict[str, Any],
+        current_user: User
+    ) -> QuizSubmissionResult:
+        """
+        提交测验答案并在服务端判分
+
+        标准答案来自缓存（未命中时一条查询加载），判分在内存中一次完成；
+        事务中只插入提交记录，题目统计交给 stat_accumulator 合并后定期写回
+        """
+        key = await answer_key_cache.get(db, quiz_id)
+        if key is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="测验不存在"
+            )
+
+        parsed = GradingService._parse_answers(key, answers)
+        results = key.grade(parsed)
+        correct_count = sum(results.values())
+        total = len(key.question_ids)
+        score = round(correct_count * 100 / total, 2) if total else 0.0
+
+        submission = (await db.execute(
+            insert(QuizSubmission).returning(QuizSubmission.id, QuizSubmission.submission_time),
+            {
+                "quiz_id": quiz_id,
+                "user_id": current_user.id,
+                "score": score,
+                "correct_count": correct_count,
+                "answers": {str(question_id): answer for question_id, answer in parsed.items()},
+            }
+        )).one()
+        await db.commit()
+        stat_accumulator.record(results)
+
+        return QuizSubmissionResult(
+            id=submission.id,
+            quiz_id=quiz_id,
+            user_id=current_user.id,
+            submission_time=submission.submission_time,
+            score=score,
+            correct_count=correct_count,
+            total=total,
+            results={str(question_id): ok for question_id, ok in results.items()},
+        )
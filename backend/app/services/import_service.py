@@ -0,0 +1,308 @@
+# app/services/import_service.py
+import codecs
+import csv
+import json
+import os
+import time
+import uuid
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple, Union
+
+from fastapi import HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.db.models.user import User
+from app.db.models.quiz import QuestionBank, Question, QuestionOption, QuestionStat
+from app.db.models.search import QuestionSearch
+from app.llm.retrieval import question_text, retrieval_index
+from app.schemas.quiz import QuestionCreate, QuestionImportResult
+from app.services.bank_version import bump_bank_version
+from app.services.duplicate_index import duplicate_index
+from app.services.file_service import FileService
+from app.services.question_sampler import question_sampler
+from app.services.search_service import search_document, search_row
+
+IMPORT_FORMATS = ("jsonl", "csv")
+
+# 解析出的一行：(起始行号, 原始字段 或 解析错误信息)
+ParsedRow = Tuple[int, Union[Dict[str, Any], str]]
+
+
+class QuestionImportParser:
+    """
+    增量解析 JSON Lines / CSV 请求体
+
+    每次 feed 一段字节，返回其中已经完整的行，不需要把整个请求体读入内存。
+
+    CSV 需要表头，列为 prompt, answer, explanation, difficulty, options；
+    options 列用 `|` 分隔各选项，正确选项以 `*` 开头，例如 `*巴黎|伦敦|柏林`。
+    """
+
+    def __init__(self, fmt: str):
+        if fmt not in IMPORT_FORMATS:
+            raise ValueError(f"Unsupported import format: {fmt}")
+        self.fmt = fmt
+        self._decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+        self._buffer = ""
+        self._line_no = 0
+        # CSV 中被引号包住的字段可能跨行，未闭合时先暂存
+        self._pending: List[str] = []
+        self._pending_start = 0
+        self._header: Optional[List[str]] = None
+
+    def feed(self, chunk: bytes) -> Iterator[ParsedRow]:
+        self._buffer += self._decoder.decode(chunk)
+        *lines, self._buffer = self._buffer.split("\n")
+        for line in lines:
+            yield from self._parse_line(line)
+
+    def close(self) -> Iterator[ParsedRow]:
+        self._buffer += self._decoder.decode(b"", final=True)
+        if self._buffer:
+            line, self._buffer = self._buffer, ""
+            yield from self._parse_line(line)
+        if self._pending:
+            yield self._pending_start, "CSV 记录的引号未闭合"
+            self._pending = []
+
+    def _parse_line(self, line: str) -> Iterator[ParsedRow]:
+        self._line_no += 1
+        line = line.rstrip("\r")
+        if self.fmt == "jsonl":
+            yield from self._parse_json_line(line)
+        else:
+            yield from self._parse_csv_line(line)
+
+    def _parse_json_line(self, line: str) -> Iterator[ParsedRow]:
+        if not line.strip():
+            return
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield self._line_no, f"JSON 解析失败: {e.msg}"
+            return
+        if not isinstance(row, dict):
+            yield self._line_no, "每行必须是一个 JSON 对象"
+            return
+        yield self._line_no, row
+
+    def _parse_csv_line(self, line: str) -> Iterator[ParsedRow]:
+        if not self._pending:
+            if not line.strip():
+                return
+            self._pending_start = self._line_no
+        self._pending.append(line)
+        record = "\n".join(self._pending)
+        # 引号个数为奇数说明字段尚未闭合（转义的 "" 不影响奇偶）
+        if record.count('"') % 2:
+            return
+        self._pending = []
+        try:
+            values = next(csv.reader([record]))
+        except csv.Error as e:
+            yield self._pending_start, f"CSV 解析失败: {e}"
+            return
+        if self._header is None:
+            self._header = [name.strip().lower() for name in values]
+            if "prompt" not in self._header or "answer" not in self._header:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="CSV 表头至少需要包含 prompt 和 answer 列"
+                )
+            return
+        yield self._pending_start, self._csv_row(values)
+
+    def _csv_row(self, values: List[str]) -> Dict[str, Any]:
+        row = {
+            name: value for name, value in zip(self._header, values)
+            if value != ""
+        }
+        options = row.pop("options", None)
+        if options:
+            row["options"] = [
+                {"content": item[1:].strip(), "is_correct": True}
+                if item.startswith("*")
+                else {"content": item.strip(), "is_correct": False}
+                for item in options.split("|")
+            ]
+        return row
+
+
+class ImportService:
+    @staticmethod
+    async def import_questions(
+        db: AsyncSession,
+        bank_id: int,
+        body: AsyncIterator[bytes],
+        fmt: str,
+        current_user: User,
+        batch_size: Optional[int] = None,
+    ) -> QuestionImportResult:
+        """
+        流式批量导入问题
+
+        边读请求体边校验，每攒够 batch_size 行就批量插入问题、统计和选项，
+        每批只提交一次。校验失败的行记录行号和原因，不影响其它行。
+        """
+        if fmt not in IMPORT_FORMATS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"不支持的导入格式，可选: {', '.join(IMPORT_FORMATS)}"
+            )
+        await ImportService.check_bank(db, bank_id, current_user)
+
+        batch_size = batch_size or settings.IMPORT_BATCH_SIZE
+        parser = QuestionImportParser(fmt)
+        started = time.perf_counter()
+        total = imported = 0
+        errors: List[Dict[str, Any]] = []
+        batch: List[Tuple[int, QuestionCreate]] = []
+
+        def record_error(line: int, error: str):
+            if len(errors) < settings.IMPORT_MAX_ERRORS:
+                errors.append({"line": line, "error": error})
+
+        async def flush():
+            nonlocal imported
+            if not batch:
+                return
+            rows = list(batch)
+            batch.clear()
+            try:
+                await ImportService.insert_batch(db, bank_id, [q for _, q in rows], current_user.id)
+                imported += len(rows)
+            except Exception as e:
+                await db.rollback()
+                for line, _ in rows:
+                    record_error(line, f"写入数据库失败: {e.__class__.__name__}")
+
+        def collect(parsed: Iterator[ParsedRow]):
+            nonlocal total
+            for line, row in parsed:
+                total += 1
+                if isinstance(row, str):
+                    record_error(line, row)
+                    continue
+                try:
+                    batch.append((line, QuestionCreate(**{**row, "bank_id": bank_id})))
+                except ValidationError as e:
+                    record_error(line, ImportService._format_validation_error(e))
+
+        async for chunk in body:
+            collect(parser.feed(chunk))
+            if len(batch) >= batch_size:
+                await flush()
+        collect(parser.close())
+        await flush()
+        question_sampler.invalidate(bank_id)
+
+        elapsed = time.perf_counter() - started
+        return QuestionImportResult(
+            total=total,
+            imported=imported,
+            failed=total - imported,
+            errors=errors,
+            elapsed_seconds=round(elapsed, 4),
+            rows_per_second=round(imported / elapsed, 1) if elapsed > 0 else 0.0,
+        )
+
+    @staticmethod
+    async def spool_body(body: AsyncIterator[bytes]) -> str:
+        """
+        把请求体写入暂存文件，供后台导入任务读取，返回文件路径
+
+        超过 IMPORT_MAX_SIZE 立即中止并删除暂存文件，返回 413
+        """
+        directory = os.path.join(settings.UPLOAD_DIRECTORY, "imports")
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{uuid.uuid4()}.part")
+        size = 0
+        f = await run_in_threadpool(open, path, "wb")
+        try:
+            async for chunk in body:
+                size += len(chunk)
+                if size > settings.IMPORT_MAX_SIZE:
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail=f"导入内容超过 {settings.IMPORT_MAX_SIZE} 字节上限"
+                    )
+                await run_in_threadpool(f.write, chunk)
+            await run_in_threadpool(f.close)
+        except BaseException:
+            await run_in_threadpool(f.close)
+            await run_in_threadpool(FileService.remove_quietly, path)
+            raise
+        return path
+
+    @staticmethod
+    async def check_bank(db: AsyncSession, bank_id: int, current_user: User):
+        """检查题库是否存在且属于当前用户"""
+        bank = await db.scalar(select(QuestionBank.id).where(
+            QuestionBank.id == bank_id,
+            QuestionBank.user_id == current_user.id
+        ))
+
+        if not bank:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="题库不存在或无权访问"
+            )
+
+    @staticmethod
+    async def insert_batch(db: AsyncSession, bank_id: int, questions: List[QuestionCreate], user_id: int):
+        """一次事务内批量插入一批问题及其统计、选项和检索文档（user_id 为题库所有者）"""
+        question_ids = (await db.scalars(
+            insert(Question).returning(Question.id, sort_by_parameter_order=True),
+            [
+                {
+                    "bank_id": bank_id,
+                    "prompt": q.prompt,
+                    "answer": q.answer,
+                    "explanation": q.explanation,
+                    "difficulty": q.difficulty.value,
+                }
+                for q in questions
+            ],
+        )).all()
+
+        await db.execute(
+            insert(QuestionStat),
+            [{"question_id": question_id} for question_id in question_ids],
+        )
+
+        options = [
+            {
+                "question_id": question_id,
+                "content": option.content,
+                "is_correct": option.is_correct,
+            }
+            for question_id, q in zip(question_ids, questions)
+            for option in q.options
+        ]
+        if options:
+            await db.execute(insert(QuestionOption), options)
+
+        await db.execute(insert(QuestionSearch), [
+            search_row(question_id, bank_id, user_id, q.difficulty, search_document(
+                q.prompt, q.answer, q.explanation, [option.content for option in q.options]
+            ))
+            for question_id, q in zip(question_ids, questions)
+        ])
+        await db.execute(bump_bank_version(bank_id))
+        await db.commit()
+        # 配置了向量模型时会编码文本，放到线程池中执行
+        await run_in_threadpool(retrieval_index.add_questions, bank_id, [
+            (question_id, question_text(q.prompt, q.answer, q.explanation))
+            for question_id, q in zip(question_ids, questions)
+        ])
+        duplicate_index.add(bank_id, zip(question_ids, [q.prompt for q in questions]))
+
+    @staticmethod
+    def _format_validation_error(e: ValidationError) -> str:
+        return "; ".join(
+            f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}"
+            for err in e.errors()
+        )
@@ -0,0 +1,490 @@
+# app/services/job_service.py
+import asyncio
+import contextlib
+import logging
+import os
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple, Type
+
+from fastapi import HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import and_, select, update, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from app.config import settings
+from app.db.base import AsyncSessionLocal
+from app.db.models.job import Job
+from app.db.models.user import User
+from app.schemas.job import (
+    Job as JobSchema,
+    GenerateQuestionsPayload, ParseFilePayload, ImportQuestionsPayload, DedupBankPayload
+)
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+TERMINAL_STATUSES = (SUCCEEDED, FAILED, CANCELLED)
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class JobCancelled(Exception):
+    """任务被用户取消"""
+
+
+class JobContext:
+    """传给任务处理函数的上下文：汇报进度，并在任务被取消时抛出 JobCancelled"""
+
+    def __init__(self, job_id: str, attempt: int):
+        self.job_id = job_id
+        self.attempt = attempt  # 领取时的 attempts，作为本次领取的凭据
+        self.cancel_requested = False
+
+    def owned(self):
+        """本次领取仍然有效：任务仍在运行，且没有被回收后由其它工作进程重新领取"""
+        return and_(Job.id == self.job_id, Job.status == RUNNING, Job.attempts == self.attempt)
+
+    async def report(self, progress: float, message: Optional[str] = None):
+        """更新进度（0 ~ 1）和说明；任务已被请求取消或领取已失效时抛出 JobCancelled"""
+        async with AsyncSessionLocal() as db:
+            updated = await db.execute(update(Job).where(self.owned()).values(
+                progress=max(0.0, min(progress, 1.0)),
+                message=message,
+                heartbeat_at=_now()
+            ))
+            await db.commit()
+            if updated.rowcount == 0:
+                logger.warning("Job %s attempt %s lost its claim", self.job_id, self.attempt)
+                raise JobCancelled()
+            if await db.scalar(select(Job.cancel_requested).where(Job.id == self.job_id)):
+                self.cancel_requested = True
+        if self.cancel_requested:
+            raise JobCancelled()
+
+
+# 处理函数：(数据库会话, 提交任务的用户, 已校验的参数, 上下文) -> 结果
+JobHandler = Callable[[AsyncSession, User, Any, JobContext], Awaitable[Optional[Dict[str, Any]]]]
+
+
+@dataclass
+class JobKind:
+    handler: JobHandler
+    payload_model: Type[BaseModel]
+    public: bool = True  # 是否允许通过 POST /jobs 直接提交
+    max_attempts: int = 1  # 非幂等的任务进程崩溃后不重跑，直接标记失败
+
+
+JOB_KINDS: Dict[str, JobKind] = {}
+
+
+def register_job_kind(kind: str, handler: JobHandler, payload_model: Type[BaseModel],
+                      public: bool = True, max_attempts: int = 1):
+    JOB_KINDS[kind] = JobKind(handler, payload_model, public, max_attempts)
+
+
+class JobService:
+    @staticmethod
+    async def submit(db: AsyncSession, current_user: User, kind: str, payload: Dict[str, Any],
+                     priority: int = 0, internal: bool = False) -> Job:
+        """提交任务，返回排队中的任务记录"""
+        job_kind = JOB_KINDS.get(kind)
+        if job_kind is None or not (job_kind.public or internal):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"不支持的任务类型: {kind}"
+            )
+        try:
+            payload = job_kind.payload_model(**payload).model_dump(mode="json")
+        except ValidationError as e:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=e.errors(include_url=False, include_context=False)
+            )
+
+        job = Job(
+            id=str(uuid.uuid4()),
+            user_id=current_user.id,
+            kind=kind,
+            status=QUEUED,
+            priority=priority,
+            payload=payload,
+            progress=0.0,
+            cancel_requested=False,
+            attempts=0
+        )
+        db.add(job)
+        await db.commit()
+        await db.refresh(job)
+        job_queue.notify()
+        return job
+
+    @staticmethod
+    async def get_job(db: AsyncSession, job_id: str, current_user: User) -> Job:
+        """获取任务"""
+        job = await db.scalar(select(Job).where(
+            Job.id == job_id,
+            Job.user_id == current_user.id
+        ))
+
+        if not job:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="任务不存在或无权访问"
+            )
+
+        return job
+
+    @staticmethod
+    async def list_jobs(db: AsyncSession, current_user: User, job_status: Optional[str] = None,
+                        limit: int = 50) -> List[Job]:
+        """获取当前用户最近的任务"""
+        query = select(Job).where(Job.user_id == current_user.id)
+        if job_status is not None:
+            query = query.where(Job.status == job_status)
+        return (await db.scalars(
+            query.order_by(Job.created_at.desc(), Job.id).limit(limit)
+        )).all()
+
+    @staticmethod
+    async def cancel(db: AsyncSession, job_id: str, current_user: User) -> Job:
+        """
+        取消任务
+
+        排队中的任务直接标记为已取消；运行中的任务设置取消标记，
+        由执行它的工作协程（可能在另一个进程）在下一次心跳或汇报进度时中止。
+        """
+        job = await JobService.get_job(db, job_id, current_user)
+        if job.status == QUEUED:
+            job.status = CANCELLED
+            job.finished_at = _now()
+        elif job.status == RUNNING:
+            job.cancel_requested = True
+        await db.commit()
+        await db.refresh(job)
+        job_queue.cancel_local(job.id)
+        return job
+
+    @staticmethod
+    async def events(job_id: str, current_user: User) -> AsyncIterator[str]:
+        """
+        以 Server-Sent Events 推送任务状态变化，任务结束后关闭
+
+        每次轮询使用新的短会话，推送期间不占用数据库连接。
+        """
+        last = None
+        while True:
+            async with AsyncSessionLocal() as db:
+                job = await JobService.get_job(db, job_id, current_user)
+                data = JobSchema.model_validate(job).model_dump_json()
+            if data != last:
+                last = data
+                yield f"data: {data}\n\n"
+            if job.status in TERMINAL_STATUSES:
+                return
+            await asyncio.sleep(settings.JOB_EVENTS_POLL_SECONDS)
+
+
+class JobQueue:
+    """
+    基于 jobs 表的任务队列与工作协程池
+
+    工作协程运行在应用的事件循环上，不需要外部消息中间件。领取任务用条件 UPDATE
+    （status 仍为 queued 才成功），多个进程同时运行也不会重复执行；按优先级、提交时间
+    领取，并跳过已达到并发上限的用户。运行中的任务定期写心跳，心跳超时的任务
+    （进程崩溃）会被重新排队或标记失败。
+    """
+
+    def __init__(self):
+        self._workers: List[asyncio.Task] = []
+        self._running: Dict[str, Tuple[asyncio.Task, JobContext]] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._claim_lock: Optional[asyncio.Lock] = None
+        self._stopping = False
+
+    async def start(self, workers: Optional[int] = None):
+        workers = settings.JOB_WORKERS if workers is None else workers
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._claim_lock = asyncio.Lock()
+        for i in range(workers):
+            self._workers.append(asyncio.create_task(self._worker(i)))
+
+    async def stop(self):
+        """停止工作协程；被中断的任务重新排队，下次启动后继续执行"""
+        self._stopping = True
+        for task in [*(task for task, _ in self._running.values()), *self._workers]:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._wakeup = None
+        self._claim_lock = None
+
+    def notify(self):
+        """有新任务时唤醒空闲的工作协程"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def cancel_local(self, job_id: str):
+        """任务在本进程运行时立即中止，不必等下一次心跳"""
+        running = self._running.get(job_id)
+        if running is not None:
+            task, ctx = running
+            # 先标记为用户取消，处理函数据此区分取消与应用关闭（例如是否保留暂存文件）
+            ctx.cancel_requested = True
+            task.cancel()
+
+    async def _worker(self, index: int):
+        while not self._stopping:
+            try:
+                job = await self.claim()
+            except Exception:
+                logger.exception("Job worker %s failed to claim a job", index)
+                job = None
+            if job is None:
+                self._wakeup.clear()
+                with contextlib.suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(self._wakeup.wait(), settings.JOB_POLL_INTERVAL_SECONDS)
+                continue
+            await self.run(job)
+
+    async def claim(self) -> Optional[Job]:
+        """领取下一个可执行的任务，没有时返回 None"""
+        lock = self._claim_lock or contextlib.nullcontext()
+        async with lock:
+            async with AsyncSessionLocal() as db:
+                await self._recover_stale(db)
+                busy_users = select(Job.user_id).where(
+                    Job.status == RUNNING
+                ).group_by(Job.user_id).having(func.count() >= settings.JOB_MAX_PER_USER)
+                candidates = (await db.execute(select(Job.id, Job.user_id).where(
+                    Job.status == QUEUED,
+                    Job.user_id.not_in(busy_users)
+                ).order_by(
+                    Job.priority.desc(), Job.created_at, Job.id
+                ).limit(settings.JOB_WORKERS + 1))).all()
+
+                for job_id, user_id in candidates:
+                    # 候选查询之后其它进程可能已为该用户领取了任务：上限在 UPDATE 的条件中再检查一次。
+                    # 锁住用户行使同一用户的领取串行化（PostgreSQL；SQLite 的写入本身是串行的）
+                    await db.execute(select(User.id).where(User.id == user_id).with_for_update())
+                    running = aliased(Job)
+                    running_count = select(func.count()).select_from(running).where(
+                        running.user_id == user_id,
+                        running.status == RUNNING
+                    ).scalar_subquery()
+                    now = _now()
+                    claimed = await db.execute(update(Job).where(
+                        Job.id == job_id,
+                        Job.status == QUEUED,
+                        running_count < settings.JOB_MAX_PER_USER
+                    ).values(
+                        status=RUNNING,
+                        attempts=Job.attempts + 1,
+                        started_at=now,
+                        heartbeat_at=now
+                    ))
+                    await db.commit()
+                    if claimed.rowcount == 1:
+                        return await db.get(Job, job_id)
+        return None
+
+    @staticmethod
+    async def _recover_stale(db: AsyncSession):
+        """心跳超时的运行中任务：还能重试的重新排队，否则标记失败"""
+        deadline = _now() - timedelta(seconds=settings.JOB_STALE_SECONDS)
+        stale = (await db.scalars(select(Job).where(
+            Job.status == RUNNING,
+            Job.heartbeat_at < deadline
+        ))).all()
+        for job in stale:
+            job_kind = JOB_KINDS.get(job.kind)
+            if job.cancel_requested:
+                job.status = CANCELLED
+                job.finished_at = _now()
+            elif job_kind is not None and job.attempts < job_kind.max_attempts:
+                job.status = QUEUED
+            else:
+                job.status = FAILED
+                job.error = "任务执行中断（工作进程退出）"
+                job.finished_at = _now()
+        if stale:
+            await db.commit()
+
+    async def run(self, job: Job):
+        """执行一个已领取的任务并记录结果"""
+        ctx = JobContext(job.id, job.attempts)
+        task = asyncio.create_task(self._execute(job, ctx))
+        self._running[job.id] = (task, ctx)
+        heartbeat = asyncio.create_task(self._heartbeat(ctx, task))
+        values: Dict[str, Any]
+        try:
+            result = await task
+            values = {"status": SUCCEEDED, "result": result, "progress": 1.0}
+        except (asyncio.CancelledError, JobCancelled):
+            if self._stopping and not ctx.cancel_requested:
+                # 应用关闭：放回队列，下次启动后继续
+                values = {"status": QUEUED, "attempts": Job.attempts - 1}
+            else:
+                values = {"status": CANCELLED}
+        except HTTPException as e:
+            values = {"status": FAILED, "error": str(e.detail)}
+        except Exception as e:
+            logger.exception("Job %s failed", job.id)
+            values = {"status": FAILED, "error": f"{e.__class__.__name__}: {e}"[:1000]}
+        finally:
+            heartbeat.cancel()
+            self._running.pop(job.id, None)
+
+        if values["status"] != QUEUED:
+            values["finished_at"] = _now()
+        # 关闭时当前协程本身也可能已被取消，状态写入不能被再次打断
+        await asyncio.shield(self._finish(ctx, values))
+
+    @staticmethod
+    async def _finish(ctx: JobContext, values: Dict[str, Any]) -> bool:
+        """
+        写入执行结果
+
+        只在本次领取仍然有效时写入：任务心跳超时后可能已被回收、重新排队或由其它
+        工作进程重新领取，此时结果以新的领取为准，返回 False。
+        """
+        async with AsyncSessionLocal() as db:
+            finished = await db.execute(update(Job).where(ctx.owned()).values(**values))
+            await db.commit()
+        if finished.rowcount == 0:
+            logger.warning("Job %s attempt %s lost its claim, dropping its result", ctx.job_id, ctx.attempt)
+            return False
+        return True
+
+    @staticmethod
+    async def _execute(job: Job, ctx: JobContext):
+        job_kind = JOB_KINDS[job.kind]
+        payload = job_kind.payload_model(**job.payload)
+        async with AsyncSessionLocal() as db:
+            user = await db.get(User, job.user_id)
+            if user is None or not user.is_active:
+                raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="用户不存在或已停用")
+            return await job_kind.handler(db, user, payload, ctx)
+
+    @staticmethod
+    async def _heartbeat(ctx: JobContext, task: asyncio.Task):
+        """定期写心跳并检查取消标记（取消请求可能来自其它进程）；领取失效时停止执行"""
+        while not task.done():
+            await asyncio.sleep(settings.JOB_HEARTBEAT_SECONDS)
+            async with AsyncSessionLocal() as db:
+                beat = await db.execute(update(Job).where(ctx.owned()).values(heartbeat_at=_now()))
+                await db.commit()
+                if beat.rowcount == 0:
+                    logger.warning("Job %s attempt %s lost its claim", ctx.job_id, ctx.attempt)
+                    task.cancel()
+                    return
+                if await db.scalar(select(Job.cancel_requested).where(Job.id == ctx.job_id)):
+                    ctx.cancel_requested = True
+                    task.cancel()
+                    return
+
+
+job_queue = JobQueue()
+
+
+# ==================== 任务类型 ====================
+
+async def _generate_questions(db: AsyncSession, user: User, payload: GenerateQuestionsPayload, ctx: JobContext):
+    from app.services.generation_service import GenerationService
+
+    async def on_progress(done: int, total: int, inserted: int):
+        await ctx.report(done / total if total else 1.0, f"{done}/{total} 块，已写入 {inserted} 道题")
+
+    result = await GenerationService.generate_from_file(
+        db, payload.bank_id, payload.file_id, payload.num_questions, user,
+        question_type=payload.question_type,
+        bypass_cache=payload.bypass_cache,
+        on_progress=on_progress
+    )
+    return result.model_dump()
+
+
+async def _parse_file(db: AsyncSession, user: User, payload: ParseFilePayload, ctx: JobContext):
+    from app.services.file_service import FileService
+    from app.services.parse_service import ParseService, PENDING, FAILED
+
+    file = await FileService.get_file(db, payload.file_id, user)
+    if file.parse_status == FAILED:
+        file.parse_status = PENDING
+        file.parse_error = None
+        await db.commit()
+    await ParseService.parse_file(file.id)
+    db.expire_all()
+    return await ParseService.get_status(db, await FileService.get_file(db, payload.file_id, user))
+
+
+async def _import_questions(db: AsyncSession, user: User, payload: ImportQuestionsPayload, ctx: JobContext):
+    from app.services.file_service import FileService
+    from app.services.import_service import ImportService
+
+    total_size = max(os.path.getsize(payload.path), 1)
+
+    async def body():
+        read = 0
+        with open(payload.path, "rb") as f:
+            while True:
+                chunk = await run_in_threadpool(f.read, settings.UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    return
+                read += len(chunk)
+                yield chunk
+                await ctx.report(read / total_size, f"已读取 {read} / {total_size} 字节")
+
+    try:
+        result = await ImportService.import_questions(db, payload.bank_id, body(), payload.format, user)
+    except asyncio.CancelledError:
+        # 关闭应用导致的中断保留暂存文件，任务会重新执行
+        if ctx.cancel_requested:
+            await run_in_threadpool(FileService.remove_quietly, payload.path)
+        raise
+    except BaseException:
+        await run_in_threadpool(FileService.remove_quietly, payload.path)
+        raise
+    await run_in_threadpool(FileService.remove_quietly, payload.path)
+    return result.model_dump()
+
+
+async def _dedup_bank(db: AsyncSession, user: User, payload: DedupBankPayload, ctx: JobContext):
+    from app.services.duplicate_index import build_index
+    from app.db.models.quiz import Question, QuestionBank
+
+    bank = await db.scalar(select(QuestionBank.id).where(
+        QuestionBank.id == payload.bank_id,
+        QuestionBank.user_id == user.id
+    ))
+    if not bank:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="题库不存在或无权访问")
+
+    questions = (await db.execute(
+        select(Question.id, Question.prompt).where(Question.bank_id == payload.bank_id)
+    )).all()
+    await ctx.report(0.1, f"正在计算 {len(questions)} 道题的签名")
+    index = await asyncio.to_thread(build_index, questions, payload.threshold or settings.DUPLICATE_THRESHOLD)
+    await ctx.report(0.8, "正在聚类")
+    clusters = await asyncio.to_thread(index.clusters)
+    return {
+        "questions": len(questions),
+        "duplicates": sum(len(cluster) - 1 for cluster in clusters),
+        "cluster_count": len(clusters),
+        "clusters": clusters[:settings.DUPLICATE_MAX_CLUSTERS],
+    }
+
+register_job_kind("generate_questions", _generate_questions, GenerateQuestionsPayload)
+register_job_kind("parse_file", _parse_file, ParseFilePayload, max_attempts=settings.JOB_MAX_ATTEMPTS)
+register_job_kind("import_questions", _import_questions, ImportQuestionsPayload, public=False)
+register_job_kind("dedup_bank", _dedup_bank, DedupBankPayload, max_attempts=settings.JOB_MAX_ATTEMPTS)
@@ -0,0 +1,168 @@
+# app/services/parse_service.py
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Set
+
+from sqlalchemy import select, delete, func, or_, update
+from sqlalchemy.orm import selectinload
+
+from app.config import settings
+from app.db.base import AsyncSessionLocal
+from app.db.models.file import File, FileChunk
+from app.llm.retrieval import retrieval_index
+from app.services.document_parser import detect_type, parse_document
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+PROCESSING = "processing"
+DONE = "done"
+FAILED = "failed"
+SKIPPED = "skipped"  # 不支持的文件类型
+
+
+class ParseService:
+    """
+    上传后的文档解析流水线
+
+    解析在有界进程池中执行，不占用请求工作线程；状态保存在 File.parse_status 上，
+    文件由 pending 到 processing 的条件 UPDATE 领取，多个进程同时排队同一文件时只有一个会解析；
+    进程崩溃后重启时 recover 把超时未完成的 processing 放回 pending 并重新排队，已完成的不会重复解析。
+    相同内容（content_hash 相同）的文件直接复用已有的解析结果。
+    """
+
+    _executor: Optional[ProcessPoolExecutor] = None
+    _tasks: Set[asyncio.Task] = set()
+
+    @classmethod
+    def executor(cls) -> ProcessPoolExecutor:
+        if cls._executor is None:
+            # 应用进程里有数据库驱动和事件循环的线程，fork 出的子进程可能继承被占用的锁而卡死
+            cls._executor = ProcessPoolExecutor(
+                max_workers=settings.PARSE_MAX_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return cls._executor
+
+    @classmethod
+    def shutdown(cls):
+        if cls._executor is not None:
+            cls._executor.shutdown(wait=False, cancel_futures=True)
+            cls._executor = None
+
+    @classmethod
+    def schedule(cls, file_id: str):
+        """在当前事件循环上排队解析，不等待结果"""
+        task = asyncio.get_running_loop().create_task(cls.parse_file(file_id))
+        cls._tasks.add(task)
+        task.add_done_callback(cls._tasks.discard)
+
+    @classmethod
+    async def recover(cls) -> int:
+        """
+        启动时重新排队未完成的解析任务，返回排队数量
+
+        其它进程正在解析的文件（processing 且未超过 PARSE_STALE_SECONDS）保持不动
+        """
+        deadline = datetime.now(timezone.utc) - timedelta(seconds=settings.PARSE_STALE_SECONDS)
+        async with AsyncSessionLocal() as db:
+            await db.execute(update(File).where(
+                File.parse_status == PROCESSING,
+                or_(File.parse_started_at.is_(None), File.parse_started_at < deadline)
+            ).values(parse_status=PENDING))
+            await db.commit()
+            file_ids = (await db.scalars(select(File.id).where(File.parse_status == PENDING))).all()
+        for file_id in file_ids:
+            cls.schedule(file_id)
+        return len(file_ids)
+
+    @classmethod
+    async def parse_file(cls, file_id: str):
+        """解析单个文件并保存全文和分块"""
+        async with AsyncSessionLocal() as db:
+            if not await cls._claim(db, file_id):
+                return
+            file = await db.get(File, file_id)
+
+            if await cls._reuse_existing(db, file):
+                return
+
+            doc_type = detect_type(file.filename, file.filetype)
+            if doc_type is None:
+                file.parse_status = SKIPPED
+                await db.commit()
+                return
+
+            try:
+                text, chunks = await asyncio.get_running_loop().run_in_executor(
+                    cls.executor(), parse_document,
+                    file.filepath, doc_type, settings.PARSE_CHUNK_TOKENS
+                )
+            except Exception as e:
+                logger.warning("Parsing file %s failed: %s", file_id, e)
+                file.parse_status = FAILED
+                file.parse_error = str(e)[:1000] or e.__class__.__name__
+                await db.commit()
+                return
+
+            await cls._save(db, file, text, chunks)
+
+    @staticmethod
+    async def _claim(db, file_id: str) -> bool:
+        """把 pending 的文件原子地标记为 processing；已被领取、已完成或不存在时返回 False"""
+        claimed = await db.execute(update(File).where(
+            File.id == file_id,
+            File.parse_status == PENDING
+        ).values(parse_status=PROCESSING, parse_started_at=datetime.now(timezone.utc)))
+        await db.commit()
+        return claimed.rowcount == 1
+
+    @staticmethod
+    async def _reuse_existing(db, file: File) -> bool:
+        """相同内容已有解析结果时直接复制"""
+        if not file.content_hash:
+            return False
+        source = await db.scalar(select(File).options(selectinload(File.chunks)).where(
+            File.content_hash == file.content_hash,
+            File.id != file.id,
+            File.parse_status == DONE
+        ).limit(1))
+        if source is None:
+            return False
+        await ParseService._save(
+            db, file, source.parsed_text,
+            [(chunk.content, chunk.token_count) for chunk in source.chunks]
+        )
+        return True
+
+    @staticmethod
+    async def _save(db, file: File, text: str, chunks):
+        # 先清掉上次中断时可能残留的分块，保证重跑是幂等的
+        await db.execute(delete(FileChunk).where(FileChunk.file_id == file.id))
+        db.add_all([
+            FileChunk(file_id=file.id, chunk_index=i, content=content, token_count=tokens)
+            for i, (content, tokens) in enumerate(chunks)
+        ])
+        file.parsed_text = text
+        file.parse_status = DONE
+        file.parse_error = None
+        await db.commit()
+        # 配置了向量模型时会编码文本块，放到线程池中执行
+        await asyncio.to_thread(
+            retrieval_index.update_file, file.bank_id, file.id, [content for content, _ in chunks]
+        )
+
+    @staticmethod
+    async def get_status(db, file: File) -> dict:
+        chunk_count = await db.scalar(
+            select(func.count()).select_from(FileChunk).where(FileChunk.file_id == file.id)
+        )
+        return {
+            "file_id": file.id,
+            "status": file.parse_status,
+            "error": file.parse_error,
+            "chunk_count": chunk_count,
+        }
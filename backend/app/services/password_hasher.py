@@ -0,0 +1,111 @@
+# app/services/password_hasher.py
+import asyncio
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, Tuple, TypeVar
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+from app.config import settings
+
+T = TypeVar("T")
+
+# 密码哈希上下文：成本因子与配置不一致的哈希在登录时被重新计算（提高或降低成本都生效）
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__max_rounds=settings.BCRYPT_ROUNDS,
+)
+
+
+class PasswordHasher:
+    """
+    在专用的有界线程池中计算 bcrypt
+
+    bcrypt 计算时释放 GIL，放到独立线程池后既不阻塞事件循环，也不占用 FastAPI 处理同步
+    端点的工作线程。执行中和排队中的任务达到 max_pending 时直接返回 503 并带 Retry-After，
+    考试开始时的登录高峰不会让请求无限堆积、最终全部超时
+    """
+
+    def __init__(self, workers: Optional[int] = None, max_pending: Optional[int] = None):
+        self._workers = workers
+        self._max_pending = max_pending
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending = 0
+        self._seconds = 0.0  # 单次哈希耗时的指数移动平均，用于估算 Retry-After
+        self._lock = threading.Lock()
+
+    @property
+    def workers(self) -> int:
+        return self._workers or settings.PASSWORD_HASH_WORKERS
+
+    @property
+    def max_pending(self) -> int:
+        return self._max_pending or settings.PASSWORD_HASH_MAX_PENDING
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hash")
+            return self._executor
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def retry_after(self) -> int:
+        """按当前积压估算排空所需的秒数"""
+        return max(1, math.ceil(self._pending / self.workers * self._seconds))
+
+    def _timed(self, fn: Callable[..., T], *args) -> T:
+        started = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self._seconds = elapsed if not self._seconds else 0.8 * self._seconds + 0.2 * elapsed
+
+    def _release(self, _future):
+        with self._lock:
+            self._pending -= 1
+
+    async def run(self, fn: Callable[..., T], *args) -> T:
+        """在线程池中执行 fn；积压已满时返回 503"""
+        executor = self.executor()
+        with self._lock:
+            admitted = self._pending < self.max_pending
+            if admitted:
+                self._pending += 1
+        if not admitted:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="登录人数过多，请稍后重试",
+                headers={"Retry-After": str(self.retry_after())},
+            )
+
+        # 计数在任务真正结束时释放：等待的请求被取消后，线程池中的计算仍然占着位置
+        future = executor.submit(self._timed, fn, *args)
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    async def hash(self, password: str) -> str:
+        return await self.run(pwd_context.hash, password)
+
+    async def verify_and_update(self, password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """校验密码；成本因子与配置不一致时同时返回新的哈希"""
+        return await self.run(pwd_context.verify_and_update, password, hashed_password)
+
+
+password_hasher = PasswordHasher()
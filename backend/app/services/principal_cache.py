@@ -0,0 +1,85 @@
+# app/services/principal_cache.py
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from app.config import settings
+
+
+class PrincipalCache:
+    """
+    进程内的认证主体缓存（LRU + TTL）
+
+    以 (token sub, token exp) 为键缓存用户的列快照，
+    命中时无需再执行 `SELECT ... FROM users WHERE email = ?`。
+    条目的存活时间不超过 TTL，也不超过令牌本身的过期时间。
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[Tuple[str, Hashable], Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, sub: str, exp: Hashable) -> Optional[Dict[str, Any]]:
+        """读取缓存的用户快照，未命中或已过期时返回 None"""
+        key = (sub, exp)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, sub: str, exp: Hashable, snapshot: Dict[str, Any], expires_in: Optional[float] = None):
+        """写入用户快照；expires_in 为令牌剩余有效秒数"""
+        if self.maxsize <= 0:
+            return
+        ttl = self.ttl if expires_in is None else min(self.ttl, expires_in)
+        if ttl <= 0:
+            return
+        key = (sub, exp)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, snapshot)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, sub: str):
+        """删除某个主体的所有缓存条目（不同令牌 exp 各有一条）"""
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == sub]:
+                del self._entries[key]
+
+    def clear(self):
+        """清空缓存并重置计数器"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """命中/未命中计数，用于确认用户查询已离开热路径"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+
+principal_cache = PrincipalCache(
+    maxsize=settings.PRINCIPAL_CACHE_SIZE,
+    ttl=settings.PRINCIPAL_CACHE_TTL_SECONDS,
+)
@@ -0,0 +1,133 @@
+# app/services/question_sampler.py
+import random
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy import select, or_
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.db.models.quiz import Question, DifficultyEnum
+
+ALL = "all"
+
+
+class QuestionSampler:
+    """
+    题库抽题引擎
+
+    每个题库缓存一份按难度分组的问题ID数组（紧凑的 array），
+    抽题时只在数组下标上做无放回抽样，耗时与抽取数量 k 相关，与题库大小无关，
+    不再需要 `ORDER BY random()` 的全表扫描和排序。
+
+    缓存按 TTL 过期，本进程内的写操作通过 invalidate 立即失效；
+    其它进程删除的问题会在抽样后的存在性校验中被发现并触发重新加载。
+    """
+
+    def __init__(self, maxsize: int = 256, ttl: float = 300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._pools: "OrderedDict[int, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def invalidate(self, bank_id: int):
+        """题库中的问题增删或难度变化后调用"""
+        with self._lock:
+            self._pools.pop(bank_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._pools.clear()
+
+    def sample(
+        self,
+        db: Session,
+        bank_id: int,
+        count: Optional[int] = None,
+        difficulty_counts: Optional[Dict[str, int]] = None,
+        rng: Optional[random.Random] = None,
+    ) -> List[int]:
+        """
+        从题库中无放回地抽取问题ID
+
+        - count: 不区分难度抽取的数量，超过题库大小时返回全部问题
+        - difficulty_counts: 按难度分层抽样，如 {"easy": 5, "hard": 2}
+        """
+        rng = rng or random
+        ids = self._draw(self._pool(db, bank_id), count, difficulty_counts, rng)
+        if ids and not self._all_exist(db, bank_id, ids):
+            # 缓存已过时（例如问题在其它进程中被删除），重新加载后再抽一次
+            ids = self._draw(self._pool(db, bank_id, reload=True), count, difficulty_counts, rng)
+        return ids
+
+    def _draw(self, pool: Dict[str, array], count, difficulty_counts, rng) -> List[int]:
+        if difficulty_counts:
+            ids: List[int] = []
+            for difficulty, k in difficulty_counts.items():
+                key = getattr(difficulty, "value", difficulty)
+                stratum = pool.get(key, array("q"))
+                if k < 0:
+                    raise HTTPException(
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        detail=f"难度 {key} 的抽取数量不能为负数"
+                    )
+                if k > len(stratum):
+                    raise HTTPException(
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        detail=f"难度 {key} 的问题不足 {k} 道（现有 {len(stratum)} 道）"
+                    )
+                ids.extend(stratum[i] for i in rng.sample(range(len(stratum)), k))
+            rng.shuffle(ids)
+            return ids
+
+        stratum = pool[ALL]
+        k = min(count or 0, len(stratum))
+        return [stratum[i] for i in rng.sample(range(len(stratum)), k)]
+
+    def _pool(self, db: Session, bank_id: int, reload: bool = False) -> Dict[str, array]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._pools.get(bank_id)
+            if entry is not None and not reload and entry[0] > now:
+                self._pools.move_to_end(bank_id)
+                return entry[1]
+
+        # 每个难度只取主键列，走 (bank_id, difficulty) 索引；
+        # 用 Core 连接执行，跳过 ORM 的逐行加载开销
+        connection = db.connection()
+        pool = {ALL: array("q")}
+        for d in DifficultyEnum:
+            condition = Question.difficulty == d
+            if d is DifficultyEnum.medium:
+                condition = or_(condition, Question.difficulty.is_(None))
+            stratum = array("q", connection.execute(
+                select(Question.id).where(Question.bank_id == bank_id, condition)
+            ).scalars())
+            pool[d.value] = stratum
+            pool[ALL].extend(stratum)
+
+        with self._lock:
+            self._pools[bank_id] = (now + self.ttl, pool)
+            self._pools.move_to_end(bank_id)
+            while len(self._pools) > self.maxsize:
+                self._pools.popitem(last=False)
+        return pool
+
+    @staticmethod
+    def _all_exist(db: Session, bank_id: int, ids: List[int]) -> bool:
+        """按主键校验抽中的问题仍然存在，代价与 k 成正比"""
+        # 只按主键过滤，避免优化器改走 bank_id 索引扫描整个题库
+        banks = db.connection().execute(
+            select(Question.bank_id).where(Question.id.in_(ids))
+        ).scalars().all()
+        return len(banks) == len(ids) and all(b == bank_id for b in banks)
+
+
+question_sampler = QuestionSampler(
+    maxsize=settings.SAMPLER_CACHE_SIZE,
+    ttl=settings.SAMPLER_CACHE_TTL_SECONDS,
+)
@@ -0,0 +1,149 @@
+# app/services/quiz_paper.py
+import random
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Iterable, Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from app.config import settings
+from app.db.models.quiz import Question, QuestionBank, Quiz, QuizQuestion
+from app.schemas.quiz import QuizPaper, QuizPaperQuestion
+
+
+@dataclass(frozen=True)
+class PaperSnapshot:
+    """
+    预先序列化好的试卷（不含答案）
+
+    试卷头和每道题各自是一段 JSON 字节，按考生打乱题目顺序时只需重排片段再拼接，
+    不需要重新加载或序列化
+    """
+    quiz_id: int
+    bank_id: int
+    question_ids: Tuple[int, ...]
+    random_order: bool
+    version: int  # 构建时题库的版本号
+    updated_at: datetime
+    head: bytes  # 以 `"questions":[` 结尾
+    questions: Tuple[bytes, ...]
+
+    def render(self, taker_id: int) -> bytes:
+        """同一考生多次打开得到相同的顺序，不同考生顺序不同"""
+        questions = self.questions
+        if self.random_order and len(questions) > 1:
+            order = list(range(len(questions)))
+            random.Random(f"{self.quiz_id}:{taker_id}").shuffle(order)
+            questions = [questions[i] for i in order]
+        return self.head + b",".join(questions) + b"]}"
+
+    def etag(self, taker_id: int) -> str:
+        """试卷内容只随题库版本和考生（题目顺序）变化"""
+        return f'"quiz-{self.quiz_id}-v{self.version}-{taker_id}"'
+
+
+def build_snapshot(quiz: Quiz, version: int, updated_at: datetime) -> PaperSnapshot:
+    quiz_questions = sorted(quiz.quiz_questions, key=lambda qq: (qq.sequence_index or 0, qq.id))
+    head = QuizPaper.model_validate(quiz, from_attributes=True).model_dump_json(exclude={"questions"})
+    return PaperSnapshot(
+        quiz_id=quiz.id,
+        bank_id=quiz.bank_id,
+        question_ids=tuple(qq.question_id for qq in quiz_questions),
+        random_order=bool(quiz.random_order),
+        version=version,
+        updated_at=updated_at,
+        head=head[:-1].encode("utf-8") + b',"questions":[',
+        questions=tuple(
+            QuizPaperQuestion.model_validate(qq.question, from_attributes=True).model_dump_json().encode("utf-8")
+            for qq in quiz_questions
+        ),
+    )
+
+
+class QuizPaperCache:
+    """
+    按测验缓存试卷快照（LRU + TTL）
+
+    同一测验的所有考生共享一份快照；题目被修改或删除时通过 invalidate_questions
+    立即失效，其它进程的修改在 TTL 后生效
+    """
+
+    def __init__(self, maxsize: int = 256, ttl: float = 300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._papers: "OrderedDict[int, Tuple[float, PaperSnapshot]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def invalidate(self, quiz_id: int):
+        with self._lock:
+            self._papers.pop(quiz_id, None)
+
+    def invalidate_questions(self, question_ids: Iterable[int]):
+        question_ids = set(question_ids)
+        with self._lock:
+            for quiz_id in [
+                quiz_id for quiz_id, (_, paper) in self._papers.items()
+                if not question_ids.isdisjoint(paper.question_ids)
+            ]:
+                del self._papers[quiz_id]
+
+    def invalidate_bank(self, bank_id: int):
+        with self._lock:
+            for quiz_id in [quiz_id for quiz_id, (_, paper) in self._papers.items() if paper.bank_id == bank_id]:
+                del self._papers[quiz_id]
+
+    def clear(self):
+        with self._lock:
+            self._papers.clear()
+
+    async def get(self, db: AsyncSession, quiz_id: int) -> Optional[PaperSnapshot]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._papers.get(quiz_id)
+            if entry is not None and entry[0] > now:
+                self._papers.move_to_end(quiz_id)
+                return entry[1]
+
+        row = (await db.execute(
+            select(Quiz, QuestionBank.version, QuestionBank.updated_at)
+            .join(QuestionBank, QuestionBank.id == Quiz.bank_id)
+            .options(
+                selectinload(Quiz.quiz_questions)
+                .selectinload(QuizQuestion.question)
+                .selectinload(Question.options)
+            ).where(Quiz.id == quiz_id)
+        )).first()
+        if row is None:
+            return None
+        paper = build_snapshot(*row)
+        with self._lock:
+            self._papers[quiz_id] = (now + self.ttl, paper)
+            self._papers.move_to_end(quiz_id)
+            while len(self._papers) > self.maxsize:
+                self._papers.popitem(last=False)
+        return paper
+
+
+quiz_paper_cache = QuizPaperCache(
+    maxsize=settings.QUIZ_PAPER_CACHE_SIZE,
+    ttl=settings.QUIZ_PAPER_CACHE_TTL_SECONDS,
+)
+
+
+class QuizPaperService:
+    @staticmethod
+    async def get_paper(db: AsyncSession, quiz_id: int) -> PaperSnapshot:
+        """返回测验的试卷快照（按考生渲染见 PaperSnapshot.render）；缓存命中时不访问数据库"""
+        paper = await quiz_paper_cache.get(db, quiz_id)
+        if paper is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="测验不存在"
+            )
+        return paper
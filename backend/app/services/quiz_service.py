@@ -1,20 +1,59 @@
 # app/services/quiz_service.py
-from sqlalchemy.orm import Session
+from sqlalchemy import delete, insert, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
 from fastapi import HTTPException, status
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 from datetime import datetime
 
+from app.db.models.file import File
 from app.db.models.user import User
 from app.db.models.quiz import (
     QuestionBank, Question, QuestionOption, QuestionStat,
     Quiz, QuizQuestion, QuizSubmission, DifficultyEnum
 )
+from app.db.models.search import QuestionSearch
+from app.llm.retrieval import question_text, retrieval_index
+from app.services.bank_version import bump_bank_version
+from app.services.duplicate_index import duplicate_index
+from app.services.file_service import FileService
+from app.services.grading_service import answer_key_cache
+from app.services.quiz_paper import quiz_paper_cache
+from app.services.question_sampler import question_sampler
+from app.services.search_service import search_document, search_row
 from app.schemas.quiz import (
     QuestionBankCreate, QuestionBankUpdate,
     QuestionCreate, QuestionUpdate,
     QuizCreate
 )
 
+# 各接口响应结构对应的加载策略：序列化时需要的关系一次性批量加载，
+# 避免逐个问题、逐个选项列表懒加载（N+1 查询）
+QUESTION_LOAD_OPTIONS = (
+    selectinload(Question.options),
+)
+BANK_DETAIL_LOAD_OPTIONS = (
+    selectinload(QuestionBank.questions).selectinload(Question.options),
+)
+QUIZ_LOAD_OPTIONS = (
+    selectinload(Quiz.quiz_questions)
+    .selectinload(QuizQuestion.question)
+    .selectinload(Question.options),
+)
+
+# 列表接口直接取列（Row）而不构造 ORM 对象，再由预编译的 TypeAdapter 校验序列化
+QUESTION_COLUMNS = (
+    Question.id, Question.bank_id, Question.prompt, Question.answer,
+    Question.explanation, Question.difficulty, Question.created_at,
+)
+OPTION_COLUMNS = (
+    QuestionOption.id, QuestionOption.question_id, QuestionOption.content, QuestionOption.is_correct,
+)
+BANK_COLUMNS = (
+    QuestionBank.id, QuestionBank.user_id, QuestionBank.name, QuestionBank.description,
+    QuestionBank.created_at, QuestionBank.updated_at,
+)
+
 
 class QuizService:
     @staticmethod
@@ -32,21 +71,91 @@ class QuizService:
         return db_bank
     
     @staticmethod
-    def list_question_banks(db: Session, current_user: User, skip: int = 0, limit: int = 100):
-        """获取题库列表"""
-        banks = db.query(QuestionBank).filter(
+    def list_question_banks(db: Session, current_user: User, after_id: Optional[int] = None, limit: int = 100):
+        """获取题库列表（含全部问题，按ID做键集分页）"""
+        query = db.query(QuestionBank).options(
+            *BANK_DETAIL_LOAD_OPTIONS
+        ).filter(
             QuestionBank.user_id == current_user.id
-        ).offset(skip).limit(limit).all()
+        )
+        if after_id is not None:
+            query = query.filter(QuestionBank.id > after_id)
         
-        return banks
+        return query.order_by(QuestionBank.id).limit(limit).all()
     
     @staticmethod
-    def get_question_bank(db: Session, bank_id: int, current_user: User):
-        """获取题库详情"""
-        bank = db.query(QuestionBank).filter(
+    def list_question_bank_summaries(db: Session, current_user: User, after_id: Optional[int] = None, limit: int = 100):
+        """获取题库摘要列表：问题数量、难度分布和最后更新时间由聚合查询得出，不加载问题"""
+        query = db.query(
+            QuestionBank.id, QuestionBank.user_id, QuestionBank.name, QuestionBank.description,
+            QuestionBank.created_at, QuestionBank.updated_at
+        ).filter(
+            QuestionBank.user_id == current_user.id
+        )
+        if after_id is not None:
+            query = query.filter(QuestionBank.id > after_id)
+        banks = query.order_by(QuestionBank.id).limit(limit).all()
+        if not banks:
+            return []
+        
+        summaries = {
+            bank.id: {
+                **bank._asdict(),
+                "question_count": 0,
+                "difficulty_counts": {d.value: 0 for d in DifficultyEnum},
+            }
+            for bank in banks
+        }
+        
+        # 一条按 (bank_id, difficulty) 分组的聚合查询覆盖整页题库
+        rows = db.query(
+            Question.bank_id, Question.difficulty,
+            func.count(Question.id), func.max(Question.created_at)
+        ).filter(
+            Question.bank_id.in_(summaries.keys())
+        ).group_by(Question.bank_id, Question.difficulty)
+        for bank_id, difficulty, count, last_created in rows:
+            summary = summaries[bank_id]
+            summary["question_count"] += count
+            key = (difficulty or DifficultyEnum.medium).value
+            summary["difficulty_counts"][key] += count
+            if last_created and (summary["updated_at"] is None or last_created > summary["updated_at"]):
+                summary["updated_at"] = last_created
+        
+        return list(summaries.values())
+    
+    @staticmethod
+    def _question_rows(db: Session, bank_id: int, skip: int = 0, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        按ID顺序取回题库中的问题及选项，均为字典；共两条查询
+
+        pydantic 以 from_attributes 读取 Row 的属性比读取字典慢一倍以上，因此先转成字典
+        """
+        query = select(*QUESTION_COLUMNS).where(Question.bank_id == bank_id).order_by(Question.id).offset(skip)
+        if limit is not None:
+            query = query.limit(limit)
+        questions = db.execute(query).all()
+        if not questions:
+            return []
+        
+        # 同一题库中按ID排序的一页问题ID连续，选项按ID区间取回
+        options: Dict[int, list] = {}
+        for option in db.execute(
+            select(*OPTION_COLUMNS).join(Question, Question.id == QuestionOption.question_id).where(
+                Question.bank_id == bank_id,
+                Question.id.between(questions[0].id, questions[-1].id)
+            ).order_by(QuestionOption.id)
+        ):
+            options.setdefault(option.question_id, []).append(option._asdict())
+        return [{**question._asdict(), "options": options.get(question.id, [])} for question in questions]
+    
+    @staticmethod
+    def get_question_bank(db: Session, bank_id: int, current_user: User) -> Dict[str, Any]:
+        """获取题库详情（含全部问题和选项，以字典返回）"""
+        bank = db.execute(select(*BANK_COLUMNS).where(
             QuestionBank.id == bank_id,
             QuestionBank.user_id == current_user.id
-        ).first()
+        )).first()
         
         if not bank:
             raise HTTPException(
@@ -54,7 +163,23 @@ class QuizService:
                 detail="题库不存在或无权访问"
             )
         
-        return bank
+        return {**bank._asdict(), "questions": QuizService._question_rows(db, bank_id)}
+    
+    @staticmethod
+    def get_bank_version(db: Session, bank_id: int, current_user: User) -> Tuple[int, datetime]:
+        """按主键取回题库的 (版本号, 最后修改时间)，供条件 GET 使用，不加载问题"""
+        row = db.query(QuestionBank.version, QuestionBank.updated_at).filter(
+            QuestionBank.id == bank_id,
+            QuestionBank.user_id == current_user.id
+        ).first()
+        
+        if not row:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="题库不存在或无权访问"
+            )
+        
+        return row.version, row.updated_at
     
     @staticmethod
     def update_question_bank(db: Session, bank_id: int, bank_in: QuestionBankUpdate, current_user: User):
@@ -77,6 +202,7 @@ class QuizService:
         if bank_in.description is not None:
             bank.description = bank_in.description
         
+        bank.version = QuestionBank.version + 1
         db.add(bank)
         db.commit()
         db.refresh(bank)
@@ -84,9 +210,45 @@ class QuizService:
         return bank
     
     @staticmethod
-    def delete_question_bank(db: Session, bank_id: int, current_user: User):
-        """删除题库"""
-        bank = db.query(QuestionBank).filter(
+    async def delete_question_bank(db: AsyncSession, bank_id: int, current_user: User):
+        """删除题库，连同题库中的文件；不再被引用的 blob 随之删除"""
+        bank = await db.scalar(select(QuestionBank).where(
+            QuestionBank.id == bank_id,
+            QuestionBank.user_id == current_user.id
+        ))
+        
+        if not bank:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="题库不存在或无权访问"
+            )
+        
+        # 删除前记下文件的存储位置，提交后再按引用计数清理
+        files = (await db.scalars(select(File).where(File.bank_id == bank_id))).all()
+        stored = [(file.filepath, file.content_hash) for file in files]
+        for file in files:
+            await db.delete(file)
+        await db.execute(delete(QuestionSearch).where(QuestionSearch.bank_id == bank_id))
+        await db.delete(bank)
+        await db.commit()
+        question_sampler.invalidate(bank_id)
+        retrieval_index.invalidate(bank_id)
+        duplicate_index.invalidate(bank_id)
+        answer_key_cache.invalidate_bank(bank_id)
+        quiz_paper_cache.invalidate_bank(bank_id)
+        await FileService.release_storage(db, stored)
+    
+    @staticmethod
+    def check_duplicates(
+        db: Session,
+        bank_id: int,
+        prompt: str,
+        current_user: User,
+        reject: bool = False,
+        exclude_id: Optional[int] = None
+    ) -> List[Tuple[int, float]]:
+        """返回题库中与题干近似重复的 (问题ID, 相似度)；reject 为真且存在重复时返回 409"""
+        bank = db.query(QuestionBank.id).filter(
             QuestionBank.id == bank_id,
             QuestionBank.user_id == current_user.id
         ).first()
@@ -97,8 +259,18 @@ class QuizService:
                 detail="题库不存在或无权访问"
             )
         
-        db.delete(bank)
-        db.commit()
+        duplicates = duplicate_index.find(db, bank_id, prompt, exclude=exclude_id)
+        if duplicates and reject:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail={
+                    "message": "题库中已有近似重复的问题",
+                    "duplicates": [
+                        {"question_id": question_id, "similarity": score} for question_id, score in duplicates
+                    ]
+                }
+            )
+        return duplicates
     
     @staticmethod
     def create_question(db: Session, bank_id: int, question_in: QuestionCreate, current_user: User):
@@ -124,13 +296,11 @@ class QuizService:
             difficulty=question_in.difficulty
         )
         db.add(db_question)
-        db.commit()
-        db.refresh(db_question)
+        db.flush()  # 取得问题ID；问题、统计、选项和检索文档在同一事务内提交
         
         # 创建问题统计
         db_stat = QuestionStat(question_id=db_question.id)
         db.add(db_stat)
-        db.commit()
         
         # 如果有选项，创建选项
         if question_in.options:
@@ -141,14 +311,28 @@ class QuizService:
                     is_correct=option_in.is_correct
                 )
                 db.add(db_option)
-            
-            db.commit()
+        
+        db.execute(insert(QuestionSearch), [search_row(
+            db_question.id, bank_id, current_user.id, db_question.difficulty, search_document(
+                db_question.prompt, db_question.answer, db_question.explanation,
+                [option.content for option in question_in.options or []]
+            )
+        )])
+        db.execute(bump_bank_version(bank_id))
+        db.commit()
+        db.refresh(db_question)
+        question_sampler.invalidate(bank_id)
+        retrieval_index.add_questions(bank_id, [(
+            db_question.id,
+            question_text(db_question.prompt, db_question.answer, db_question.explanation)
+        )])
+        duplicate_index.add(bank_id, [(db_question.id, db_question.prompt)])
         
         return db_question
     
     @staticmethod
-    def list_questions(db: Session, bank_id: int, current_user: User, skip: int = 0, limit: int = 100):
-        """获取问题列表"""
+    def list_questions(db: Session, bank_id: int, current_user: User, skip: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
+        """获取问题列表（以字典返回）"""
         # 检查题库是否存在且属于当前用户
         bank = db.query(QuestionBank).filter(
             QuestionBank.id == bank_id,
@@ -161,16 +345,14 @@ class QuizService:
                 detail="题库不存在或无权访问"
             )
         
-        questions = db.query(Question).filter(
-            Question.bank_id == bank_id
-        ).offset(skip).limit(limit).all()
-        
-        return questions
+        return QuizService._question_rows(db, bank_id, skip, limit)
     
     @staticmethod
     def get_question(db: Session, question_id: int, current_user: User):
         """获取问题详情"""
-        question = db.query(Question).join(
+        question = db.query(Question).options(
+            *QUESTION_LOAD_OPTIONS
+        ).join(
             QuestionBank, Question.bank_id == QuestionBank.id
         ).filter(
             Question.id == question_id,
@@ -215,9 +397,28 @@ class QuizService:
             question.difficulty = question_in.difficulty
         
         db.add(question)
+        db.execute(delete(QuestionSearch).where(QuestionSearch.question_id == question.id))
+        db.execute(insert(QuestionSearch), [search_row(
+            question.id, question.bank_id, current_user.id, question.difficulty, search_document(
+                question.prompt, question.answer, question.explanation,
+                [option.content for option in question.options]
+            )
+        )])
+        db.execute(bump_bank_version(question.bank_id))
         db.commit()
         db.refresh(question)
         
+        if question_in.difficulty is not None:
+            question_sampler.invalidate(question.bank_id)
+        retrieval_index.add_questions(question.bank_id, [(
+            question.id, question_text(question.prompt, question.answer, question.explanation)
+        )])
+        if question_in.prompt is not None:
+            duplicate_index.add(question.bank_id, [(question.id, question.prompt)])
+        if question_in.answer is not None:
+            answer_key_cache.invalidate_questions([question.id])
+        quiz_paper_cache.invalidate_questions([question.id])
+        
         return question
     
     @staticmethod
@@ -236,8 +437,16 @@ class QuizService:
                 detail="问题不存在或无权访问"
             )
         
+        bank_id = question.bank_id
+        db.execute(delete(QuestionSearch).where(QuestionSearch.question_id == question_id))
         db.delete(question)
+        db.execute(bump_bank_version(bank_id))
         db.commit()
+        question_sampler.invalidate(bank_id)
+        retrieval_index.remove_questions(bank_id, [question_id])
+        duplicate_index.remove(bank_id, [question_id])
+        answer_key_cache.invalidate_questions([question_id])
+        quiz_paper_cache.invalidate_questions([question_id])
     
     @staticmethod
     def create_quiz(db: Session, quiz_in: QuizCreate, current_user: User):
@@ -254,39 +463,38 @@ class QuizService:
                 detail="题库不存在或无权访问"
             )
         
+        # 随机抽取问题（按难度分层或按总数）
+        question_ids = []
+        if quiz_in.difficulty_counts or quiz_in.question_count:
+            question_ids = question_sampler.sample(
+                db, quiz_in.bank_id,
+                count=quiz_in.question_count,
+                difficulty_counts=quiz_in.difficulty_counts
+            )
+        
         # 创建测验
         db_quiz = Quiz(
             user_id=current_user.id,
             bank_id=quiz_in.bank_id,
-            name=quiz_in.name,
-            description=quiz_in.description,
-            time_limit=quiz_in.time_limit,
-            question_count=quiz_in.question_count,
+            title=quiz_in.title,
+            duration_seconds=quiz_in.duration_seconds,
+            random_order=quiz_in.random_order,
+            allow_backtrack=quiz_in.allow_backtrack,
             start_time=datetime.now()
         )
         db.add(db_quiz)
+        db.flush()
+        
+        # 添加问题到测验（一条批量 INSERT）
+        if question_ids:
+            db.execute(insert(QuizQuestion), [
+                {
+                    "quiz_id": db_quiz.id,
+                    "question_id": question_id,
+                    "sequence_index": i + 1
+                }
+                for i, question_id in enumerate(question_ids)
+            ])
         db.commit()
-        db.refresh(db_quiz)
-        
-        # 如果指定了问题数量，随机选择问题
-        if quiz_in.question_count:
-            # 获取题库中的问题
-            questions = db.query(Question).filter(
-                Question.bank_id == quiz_in.bank_id
-            ).order_by(
-                # 随机排序
-                db.func.random()
-            ).limit(quiz_in.question_count).all()
-            
-            # 添加问题到测验
-            for i, question in enumerate(questions):
-                db_quiz_question = QuizQuestion(
-                    quiz_id=db_quiz.id,
-                    question_id=question.id,
-                    order=i + 1
-                )
-                db.add(db_quiz_question)
-            
-            db.commit()
         
-        return db_quiz
\ No newline at end of file
+        return db.query(Quiz).options(*QUIZ_LOAD_OPTIONS).filter(Quiz.id == db_quiz.id).one()
\ No newline at end of file
@@ -0,0 +1,239 @@
+# app/services/stat_accumulator.py
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import threading
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import IO, Dict, List, Optional
+
+from sqlalchemy import case, delete, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.db.base import AsyncSessionLocal
+from app.db.models.quiz import QuestionStat, QuestionStatFlush
+
+try:  # 日志段加文件锁，防止其它进程重放仍在写入的段（仅 POSIX）
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# 问题ID -> [作答次数增量, 答对次数增量]
+Deltas = Dict[int, List[int]]
+
+
+def _merge(target: Deltas, source: Deltas):
+    for question_id, (attempts, correct) in source.items():
+        entry = target.setdefault(question_id, [0, 0])
+        entry[0] += attempts
+        entry[1] += correct
+
+
+@dataclass
+class _Segment:
+    """一段增量日志：内存中的合计与磁盘上逐条追加的记录一一对应"""
+    id: str
+    path: Path
+    file: IO[str]
+    deltas: Deltas = field(default_factory=dict)
+
+    def close(self, remove: bool):
+        if remove:
+            with contextlib.suppress(OSError):
+                os.remove(self.path)
+        self.file.close()
+
+
+class StatAccumulator:
+    """
+    QuestionStat 计数器的写回缓冲
+
+    判分只在内存中累加每道题的增量，并把增量追加到当前日志段；后台协程定期把
+    所有增量合并成按问题的 `UPDATE ... SET attempts = attempts + CASE ...` 写回，
+    热门测验的并发提交不再争抢同一批统计行的行锁。
+
+    每次写回切换到新的日志段，写回事务同时记录段ID（question_stat_flushes），
+    提交后删除段文件。进程崩溃后，启动时重放目录中未被其它进程锁定的段，
+    已记录过的段直接删除，因此每条增量只生效一次。
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self._directory = directory
+        self._segment: Optional[_Segment] = None
+        self._failed: List[_Segment] = []
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def directory(self) -> Path:
+        return Path(self._directory or settings.STAT_LOG_DIRECTORY)
+
+    def _open_segment(self) -> _Segment:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        segment_id = str(uuid.uuid4())
+        path = self.directory / f"{segment_id}.log"
+        # 先以临时名创建并加锁，再改名为 recover 扫描的 .log；否则其它进程的 recover 可能在
+        # 加锁前锁住这个空段并删除，之后的增量写进已被删除的文件
+        tmp_path = path.with_suffix(".tmp")
+        file = open(tmp_path, "a", encoding="utf-8")
+        if fcntl is not None:
+            fcntl.flock(file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        os.replace(tmp_path, path)
+        return _Segment(segment_id, path, file)
+
+    def record(self, results: Dict[int, bool]):
+        """记录一次提交中每道题是否答对"""
+        if not results:
+            return
+        line = json.dumps({question_id: int(ok) for question_id, ok in results.items()}, separators=(",", ":"))
+        with self._lock:
+            if self._segment is None:
+                self._segment = self._open_segment()
+            segment = self._segment
+            # 写入操作系统缓冲即可在进程崩溃后保留
+            segment.file.write(line + "\n")
+            segment.file.flush()
+            for question_id, ok in results.items():
+                entry = segment.deltas.setdefault(question_id, [0, 0])
+                entry[0] += 1
+                entry[1] += ok
+
+    def pending(self) -> Deltas:
+        """尚未写回的增量"""
+        deltas: Deltas = {}
+        with self._lock:
+            for segment in [*self._failed, *([self._segment] if self._segment else [])]:
+                _merge(deltas, segment.deltas)
+        return deltas
+
+    async def flush(self, db: AsyncSession) -> int:
+        """把当前累计的增量写回数据库，返回涉及的问题数；失败的段保留到下次重试"""
+        with self._lock:
+            segments = self._failed + ([self._segment] if self._segment else [])
+            self._failed, self._segment = [], None
+        if not segments:
+            return 0
+
+        deltas: Deltas = {}
+        for segment in segments:
+            _merge(deltas, segment.deltas)
+        try:
+            await self._apply(db, deltas, [segment.id for segment in segments])
+        except BaseException:
+            await db.rollback()
+            with self._lock:
+                self._failed = segments + self._failed
+            raise
+
+        for segment in segments:
+            segment.close(remove=True)
+        await self._forget(db, [segment.id for segment in segments])
+        return len(deltas)
+
+    @staticmethod
+    async def _apply(db: AsyncSession, deltas: Deltas, segment_ids: List[str]):
+        """一个事务内按批执行集合式 UPDATE，并记录已生效的段"""
+        question_ids = sorted(deltas)
+        for start in range(0, len(question_ids), settings.STAT_FLUSH_BATCH_SIZE):
+            batch = question_ids[start:start + settings.STAT_FLUSH_BATCH_SIZE]
+            await db.execute(
+                update(QuestionStat)
+                .where(QuestionStat.question_id.in_(batch))
+                .values(
+                    attempts=QuestionStat.attempts + case(
+                        {question_id: deltas[question_id][0] for question_id in batch},
+                        value=QuestionStat.question_id
+                    ),
+                    correct_attempts=QuestionStat.correct_attempts + case(
+                        {question_id: deltas[question_id][1] for question_id in batch},
+                        value=QuestionStat.question_id
+                    ),
+                )
+                .execution_options(synchronize_session=False)
+            )
+        await db.execute(insert(QuestionStatFlush), [{"segment": segment_id} for segment_id in segment_ids])
+        await db.commit()
+
+    @staticmethod
+    async def _forget(db: AsyncSession, segment_ids: List[str]):
+        """段文件删除后，其写回记录不再需要"""
+        try:
+            await db.execute(delete(QuestionStatFlush).where(QuestionStatFlush.segment.in_(segment_ids)))
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            logger.warning("Failed to prune question stat flush records", exc_info=True)
+
+    async def recover(self, db: AsyncSession) -> int:
+        """重放上次进程退出时未写回的日志段，返回重放的段数"""
+        if not self.directory.is_dir():
+            return 0
+        with self._lock:
+            own = {segment.path for segment in [*self._failed, *([self._segment] if self._segment else [])]}
+
+        replayed = 0
+        for path in sorted(self.directory.glob("*.log")):
+            if path in own:
+                continue
+            try:
+                file = open(path, "r+", encoding="utf-8")
+            except FileNotFoundError:
+                continue
+            if fcntl is not None:
+                try:
+                    fcntl.flock(file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    file.close()  # 其它进程正在写入
+                    continue
+
+            segment = _Segment(path.stem, path, file)
+            if await db.scalar(select(QuestionStatFlush.segment).where(QuestionStatFlush.segment == segment.id)):
+                segment.close(remove=True)
+                await self._forget(db, [segment.id])
+                continue
+            for line in file:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    results = json.loads(line)
+                except ValueError:
+                    break  # 崩溃时写了一半的最后一行
+                _merge(segment.deltas, {int(question_id): [1, ok] for question_id, ok in results.items()})
+            if segment.deltas:
+                await self._apply(db, segment.deltas, [segment.id])
+            segment.close(remove=True)
+            await self._forget(db, [segment.id])
+            replayed += 1
+        return replayed
+
+    async def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """停止定期写回，并把剩余的增量写回"""
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        async with AsyncSessionLocal() as db:
+            await self.flush(db)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(settings.STAT_FLUSH_INTERVAL_SECONDS)
+            try:
+                async with AsyncSessionLocal() as db:
+                    await self.flush(db)
+            except Exception:
+                logger.exception("Failed to flush question stats")
+
+
+stat_accumulator = StatAccumulator()
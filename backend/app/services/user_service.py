@@ -4,6 +4,7 @@ from fastapi import HTTPException, status
 
 from app.db.models.user import User
 from app.schemas.user import UserUpdate
+from app.services.principal_cache import principal_cache
 
 class UserService:
     @staticmethod
@@ -27,6 +28,8 @@ class UserService:
                 detail="用户不存在"
             )
         
+        old_email = user.email
+        
         # 更新用户信息
         if user_in.name is not None:
             user.name = user_in.name
@@ -44,8 +47,17 @@ class UserService:
                 )
             user.email = user_in.email
         
+        if user_in.is_active is not None:
+            user.is_active = user_in.is_active
+        
         db.add(user)
         db.commit()
         db.refresh(user)
         
+        # 邮箱变更或启用状态变化时，使缓存的认证主体失效；
+        # 其它字段的修改也会让快照过时，一并清除
+        principal_cache.invalidate(old_email)
+        if user.email != old_email:
+            principal_cache.invalidate(user.email)
+        
         return user
\ No newline at end of file
@@ -0,0 +1,134 @@
+# backend/benchmarks/bench_login.py
+"""
+登录高峰：bcrypt 在请求工作线程中计算（旧行为） vs 专用有界线程池 + 准入控制
+
+并发登录的同时探测同步端点 /health 的延迟，衡量登录风暴对其它请求的影响；
+收到 503 的客户端按 Retry-After 退避后重试，延迟按完成登录计算
+
+用法（在 backend 目录下）:
+    python -m benchmarks.bench_login --logins 400 --concurrency 100 --rounds 10
+    python -m benchmarks.bench_login --workers 4 --max-pending 32
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] if values else 0.0
+
+
+async def storm(app, emails, logins: int, concurrency: int):
+    import httpx
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        queue = [emails[i % len(emails)] for i in range(logins)]
+        latencies, statuses, probes = [], {}, []
+        done = asyncio.Event()
+
+        async def login_worker():
+            while queue:
+                email = queue.pop()
+                started = time.perf_counter()
+                while True:
+                    response = await client.post("/api/v1/auth/login", data={"username": email, "password": "123456"})
+                    statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+                    if response.status_code != 503:
+                        break
+                    # 客户端按 Retry-After 退避后重试
+                    await asyncio.sleep(float(response.headers["Retry-After"]))
+                latencies.append(time.perf_counter() - started)
+
+        async def probe():
+            while not done.is_set():
+                started = time.perf_counter()
+                await client.get("/health")
+                probes.append(time.perf_counter() - started)
+                await asyncio.sleep(0.01)
+
+        prober = asyncio.create_task(probe())
+        started = time.perf_counter()
+        await asyncio.gather(*(login_worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+        done.set()
+        await prober
+
+    from app.db.base import async_engine
+    await async_engine.dispose()  # 连接池绑定在本次运行的事件循环上
+    return {
+        "ok_per_s": statuses.get(200, 0) / elapsed,
+        "p50": percentile(latencies, 0.5),
+        "p99": percentile(latencies, 0.99),
+        "statuses": statuses,
+        "health_p50": statistics.median(probes) if probes else 0.0,
+        "health_max": max(probes) if probes else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--logins", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=10, help="bcrypt 成本因子")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2, help="哈希线程数")
+    parser.add_argument("--max-pending", type=int, default=64, help="哈希执行中加排队中的上限")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # 配置在导入应用时读取
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        os.environ["UPLOAD_DIRECTORY"] = os.path.join(tmp, "uploads")
+        os.environ["BCRYPT_ROUNDS"] = str(args.rounds)
+        os.environ["PASSWORD_HASH_WORKERS"] = str(args.workers)
+        os.environ["PASSWORD_HASH_MAX_PENDING"] = str(args.max_pending)
+
+        from fastapi.concurrency import run_in_threadpool
+
+        from app.db.base import SessionLocal
+        from app.db.models.user import User
+        from app.main import app
+        from app.services.password_hasher import password_hasher, pwd_context
+
+        hashed = pwd_context.hash("123456")
+        emails = [f"bench_login_{i}@example.com" for i in range(args.users)]
+        db = SessionLocal()
+        try:
+            db.add_all(User(email=email, hashed_password=hashed) for email in emails)
+            db.commit()
+        finally:
+            db.close()
+
+        async def in_request_threads(fn, *args):
+            """旧行为：同步端点在 FastAPI 的工作线程中直接计算，没有上限"""
+            return await run_in_threadpool(fn, *args)
+
+        results = {}
+        original = password_hasher.run
+        password_hasher.run = in_request_threads
+        try:
+            results["request threads"] = asyncio.run(storm(app, emails, args.logins, args.concurrency))
+        finally:
+            password_hasher.run = original
+        results["hash executor"] = asyncio.run(storm(app, emails, args.logins, args.concurrency))
+        password_hasher.shutdown()
+
+    print(
+        f"{args.logins} logins, concurrency {args.concurrency}, rounds {args.rounds}, "
+        f"workers {args.workers}, max pending {args.max_pending}"
+    )
+    print(f"{'path':>16} {'ok/s':>7} {'p50 ms':>8} {'p99 ms':>8} {'health p50':>11} {'health max':>11}  statuses")
+    for name, r in results.items():
+        print(
+            f"{name:>16} {r['ok_per_s']:>7.1f} {r['p50'] * 1000:>8.0f} {r['p99'] * 1000:>8.0f} "
+            f"{r['health_p50'] * 1000:>10.1f}ms {r['health_max'] * 1000:>10.1f}ms  {r['statuses']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
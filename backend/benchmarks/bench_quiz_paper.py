@@ -0,0 +1,94 @@
+# backend/benchmarks/bench_quiz_paper.py
+"""
+试卷获取：每次加载并序列化 vs 缓存的预序列化快照（按考生打乱）
+
+用法（在 backend 目录下）:
+    python -m benchmarks.bench_quiz_paper --questions 50 --requests 2000
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.db.base import Base, async_database_url
+from app.db.models import User, QuestionBank, Question, QuestionOption, Quiz, QuizQuestion
+from app.services.quiz_paper import QuizPaperCache
+
+
+def build(url: str, questions: int) -> int:
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        user_id = connection.execute(insert(User).returning(User.id), {
+            "email": f"bench_paper_{random.random()}@example.com", "hashed_password": "x"
+        }).scalar_one()
+        bank_id = connection.execute(insert(QuestionBank).returning(QuestionBank.id), {
+            "name": "bench", "user_id": user_id
+        }).scalar_one()
+        question_ids = connection.execute(
+            insert(Question).returning(Question.id, sort_by_parameter_order=True),
+            [{"bank_id": bank_id, "prompt": f"question {i} " + "x" * 80, "answer": "A"} for i in range(questions)]
+        ).scalars().all()
+        connection.execute(insert(QuestionOption), [
+            {"question_id": qid, "content": f"option {label}", "is_correct": label == "A"}
+            for qid in question_ids for label in "ABCD"
+        ])
+        quiz_id = connection.execute(insert(Quiz).returning(Quiz.id), {
+            "user_id": user_id, "bank_id": bank_id, "title": "bench", "duration_seconds": 600, "random_order": True
+        }).scalar_one()
+        connection.execute(insert(QuizQuestion), [
+            {"quiz_id": quiz_id, "question_id": qid, "sequence_index": i + 1} for i, qid in enumerate(question_ids)
+        ])
+    engine.dispose()
+    return quiz_id
+
+
+async def measure(url: str, quiz_id: int, requests: int):
+    engine = create_async_engine(async_database_url(url))
+    sessions = async_sessionmaker(engine, expire_on_commit=False)
+    try:
+        # 对照组：每次请求都加载并序列化（缓存容量为 0）
+        uncached = QuizPaperCache(maxsize=0)
+        started = time.perf_counter()
+        async with sessions() as db:
+            for taker_id in range(requests):
+                (await uncached.get(db, quiz_id)).render(taker_id)
+                db.expunge_all()
+        naive = requests / (time.perf_counter() - started)
+
+        cache = QuizPaperCache()
+        async with sessions() as db:
+            await cache.get(db, quiz_id)
+            started = time.perf_counter()
+            for taker_id in range(requests):
+                (await cache.get(db, quiz_id)).render(taker_id)
+        cached = requests / (time.perf_counter() - started)
+        size = len((await cache.get(db, quiz_id)).render(0))
+        return naive, cached, size
+    finally:
+        await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--questions", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--url", default=None, help="数据库URL，默认在临时目录创建 SQLite 文件")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = args.url or f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        quiz_id = build(url, args.questions)
+        naive, cached, size = asyncio.run(measure(url, quiz_id, args.requests))
+    print(f"{args.questions} questions, {args.requests} requests, paper {size} bytes")
+    print(f"{'load+dump':>10} {naive:>10.0f} papers/s")
+    print(f"{'snapshot':>10} {cached:>10.0f} papers/s")
+
+
+if __name__ == "__main__":
+    main()
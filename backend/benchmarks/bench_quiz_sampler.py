@@ -0,0 +1,87 @@
+# backend/benchmarks/bench_quiz_sampler.py
+"""
+抽题性能对比：`ORDER BY random() LIMIT k` vs QuestionSampler
+
+用法（在 backend 目录下）:
+    python -m benchmarks.bench_quiz_sampler --sizes 1000 100000 1000000 --k 20
+"""
+import argparse
+import random
+import time
+
+from sqlalchemy import create_engine, func, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.db.base import Base
+from app.db.models import User, QuestionBank, Question
+from app.services.question_sampler import QuestionSampler
+
+DIFFICULTIES = ["easy", "medium", "hard"]
+
+
+def build_bank(db, size: int) -> int:
+    user = User(email=f"bench_{size}@example.com", hashed_password="x")
+    db.add(user)
+    db.flush()
+    bank = QuestionBank(name=f"bench {size}", user_id=user.id)
+    db.add(bank)
+    db.flush()
+    batch = 50_000
+    for start in range(0, size, batch):
+        db.execute(insert(Question), [
+            {
+                "bank_id": bank.id,
+                "prompt": f"question {i}",
+                "answer": str(i),
+                "difficulty": DIFFICULTIES[i % 3],
+            }
+            for i in range(start, min(start + batch, size))
+        ])
+    db.commit()
+    return bank.id
+
+
+def timed(fn, repeat: int) -> float:
+    """返回单次调用的平均耗时（毫秒）"""
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--url", default="sqlite://", help="数据库URL，默认内存SQLite")
+    args = parser.parse_args()
+
+    engine = create_engine(args.url)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+
+    print(f"{'size':>10} {'order_by_random':>16} {'sampler_cold':>13} {'sampler_warm':>13} {'stratified':>11}  (ms, k={args.k})")
+    for size in args.sizes:
+        with Session() as db:
+            bank_id = build_bank(db, size)
+
+            def order_by_random():
+                db.query(Question.id).filter(
+                    Question.bank_id == bank_id
+                ).order_by(func.random()).limit(args.k).all()
+
+            sampler = QuestionSampler()
+            cold = timed(lambda: (sampler.invalidate(bank_id), sampler.sample(db, bank_id, count=args.k)), 3)
+            warm = timed(lambda: sampler.sample(db, bank_id, count=args.k, rng=random), args.repeat)
+            per = max(args.k // 3, 1)
+            stratified = timed(lambda: sampler.sample(
+                db, bank_id, difficulty_counts={d: per for d in DIFFICULTIES}
+            ), args.repeat)
+            baseline = timed(order_by_random, max(args.repeat // 4, 1))
+
+            print(f"{size:>10} {baseline:>16.2f} {cold:>13.2f} {warm:>13.2f} {stratified:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
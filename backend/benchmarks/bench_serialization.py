@@ -0,0 +1,129 @@
+# backend/benchmarks/bench_serialization.py
+"""
+大列表响应的序列化：FastAPI 通用路径 vs 预编译 TypeAdapter（ORM 对象 / Row）
+
+分别统计加载、序列化耗时和序列化期间的峰值内存（tracemalloc）
+
+用法（在 backend 目录下）:
+    python -m benchmarks.bench_serialization --questions 10000 --repeat 5
+"""
+import argparse
+import asyncio
+import gc
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from typing import List
+
+from fastapi.routing import serialize_response
+from fastapi.responses import JSONResponse
+from fastapi.utils import create_model_field
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.api.responses import JSONSerializer, orjson
+from app.db.base import Base
+from app.db.models import User, QuestionBank, Question, QuestionOption
+from app.schemas.quiz import Question as QuestionSchema
+from app.services.quiz_service import QuizService, QUESTION_LOAD_OPTIONS
+
+
+def build(url: str, questions: int) -> int:
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        user_id = connection.execute(insert(User).returning(User.id), {
+            "email": f"bench_serialization_{random.random()}@example.com", "hashed_password": "x"
+        }).scalar_one()
+        bank_id = connection.execute(insert(QuestionBank).returning(QuestionBank.id), {
+            "name": "bench", "user_id": user_id
+        }).scalar_one()
+        question_ids = connection.execute(
+            insert(Question).returning(Question.id, sort_by_parameter_order=True),
+            [
+                {"bank_id": bank_id, "prompt": f"question {i} " + "x" * 80, "answer": "A", "explanation": "because " * 5}
+                for i in range(questions)
+            ]
+        ).scalars().all()
+        connection.execute(insert(QuestionOption), [
+            {"question_id": qid, "content": f"option {label}", "is_correct": label == "A"}
+            for qid in question_ids for label in "ABCD"
+        ])
+    engine.dispose()
+    return bank_id
+
+
+QUESTION_LIST_FIELD = create_model_field(name="Response", type_=List[QuestionSchema], mode="serialization")
+QUESTION_LIST_JSON = JSONSerializer(List[QuestionSchema])
+
+
+def fastapi_dump(questions) -> bytes:
+    """FastAPI 对 response_model 的默认处理：逐字段校验、编码，再由 JSONResponse 调用 json.dumps"""
+    content = asyncio.run(serialize_response(
+        field=QUESTION_LIST_FIELD, response_content=questions, is_coroutine=False
+    ))
+    return JSONResponse(content).body
+
+
+def load_orm(db, bank_id):
+    return db.query(Question).options(*QUESTION_LOAD_OPTIONS).filter(
+        Question.bank_id == bank_id
+    ).order_by(Question.id).all()
+
+
+def load_rows(db, bank_id):
+    return QuizService._question_rows(db, bank_id)
+
+
+def measure(sessions, bank_id, load, dump, repeat: int):
+    load_times, dump_times, peak, size = [], [], 0, 0
+    for _ in range(repeat):
+        with sessions() as db:
+            gc.collect()
+            started = time.perf_counter()
+            questions = load(db, bank_id)
+            load_times.append(time.perf_counter() - started)
+
+            gc.collect()
+            started = time.perf_counter()
+            body = dump(questions)
+            dump_times.append(time.perf_counter() - started)
+            size = len(body)
+            del body
+
+            tracemalloc.start()
+            dump(questions)
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+    return min(load_times), min(dump_times), peak, size
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--questions", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--url", default=None, help="数据库URL，默认在临时目录创建 SQLite 文件")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = args.url or f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        bank_id = build(url, args.questions)
+        engine = create_engine(url)
+        sessions = sessionmaker(bind=engine)
+        results = {
+            "orm+fastapi": measure(sessions, bank_id, load_orm, fastapi_dump, args.repeat),
+            "orm+adapter": measure(sessions, bank_id, load_orm, QUESTION_LIST_JSON.dump, args.repeat),
+            "rows+adapter": measure(sessions, bank_id, load_rows, QUESTION_LIST_JSON.dump, args.repeat),
+        }
+        engine.dispose()
+
+    print(f"{args.questions} questions x 4 options, best of {args.repeat}, orjson {'on' if orjson else 'off'}")
+    print(f"{'path':>14} {'load ms':>9} {'dump ms':>9} {'peak MiB':>9} {'bytes':>10}")
+    for name, (load, dump, peak, size) in results.items():
+        print(f"{name:>14} {load * 1000:>9.1f} {dump * 1000:>9.1f} {peak / 2 ** 20:>9.1f} {size:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# backend/tests/conftest.py
+import asyncio
+import json
+import uuid
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.config import settings
+from app.db.base import SessionLocal, async_engine
+from app.schemas.user import UserCreate
+from app.services.auth_service import AuthService
+
+prefix = settings.API_V1_STR
+
+
+@pytest.fixture
+def client():
+    return TestClient(app)
+
+
+@pytest.fixture
+def auth_headers(client):
+    """创建一个新用户并返回其 Bearer 认证头"""
+    email = f"user_{uuid.uuid4().hex[:12]}@example.com"
+    db = SessionLocal()
+    try:
+        AuthService.create_user(db, UserCreate(email=email, password="123456"))
+    finally:
+        db.close()
+    response = client.post(f"{prefix}/auth/login", data={
+        "username": email,
+        "password": "123456"
+    })
+    assert response.status_code == 200
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+@pytest.fixture
+def run():
+    """在新的事件循环中执行协程，结束前关闭该循环上建立的数据库连接"""
+    def run(coro):
+        async def main():
+            try:
+                return await coro
+            finally:
+                await async_engine.dispose()
+
+        return asyncio.run(main())
+
+    return run
+
+
+@pytest.fixture(autouse=True)
+def isolated_generation_cache(tmp_path, monkeypatch):
+    """每个测试使用独立的 LLM 生成缓存文件"""
+    from app.llm import generation_cache
+
+    generation_cache.close()
+    monkeypatch.setattr(settings, "LLM_CACHE_PATH", str(tmp_path / "llm_cache.sqlite3"))
+    generation_cache.hits = generation_cache.misses = 0
+    yield generation_cache
+    generation_cache.close()
+
+
+@pytest.fixture(autouse=True)
+def isolated_stat_log(tmp_path, monkeypatch):
+    """每个测试使用独立的答题统计日志目录"""
+    monkeypatch.setattr(settings, "STAT_LOG_DIRECTORY", str(tmp_path / "question_stats"))
+
+
+@pytest.fixture
+def llm_reply():
+    """构造 chat/completions 的模拟响应：请求 stream 时按 SSE 分段返回"""
+    def reply(request, content: str, piece: int = 7):
+        if json.loads(request.content).get("stream"):
+            events = "".join(
+                f"data: {json.dumps({'choices': [{'delta': {'content': content[i:i + piece]}}]})}\n\n"
+                for i in range(0, len(content), piece)
+            )
+            return httpx.Response(
+                200, text=events + "data: [DONE]\n\n",
+                headers={"content-type": "text/event-stream"}
+            )
+        return httpx.Response(200, json={"choices": [{"message": {"content": content}}]})
+
+    return reply
@@ -0,0 +1,39 @@
+# backend/tests/test_bank_listing.py
+import json
+
+from app.config import settings
+
+prefix = settings.API_V1_STR
+
+
+def _bank(client, headers, name, difficulties):
+    bank_id = client.post(f"{prefix}/quizzes/banks", headers=headers, json={"name": name}).json()["id"]
+    body = "\n".join(json.dumps({"prompt": "q", "answer": "a", "difficulty": d}) for d in difficulties)
+    if body:
+        client.post(f"{prefix}/quizzes/banks/{bank_id}/questions/import", headers=headers, content=body.encode())
+    return bank_id
+
+
+def test_summary_listing_with_keyset_pagination(client, auth_headers):
+    first = _bank(client, auth_headers, "b1", ["easy", "easy", "hard"])
+    _bank(client, auth_headers, "b2", [])
+    third = _bank(client, auth_headers, "b3", ["medium"])
+
+    response = client.get(f"{prefix}/quizzes/banks", headers=auth_headers, params={"limit": 2})
+    assert response.status_code == 200
+    page = response.json()
+    assert [b["name"] for b in page] == ["b1", "b2"]
+    assert "questions" not in page[0]
+    assert page[0]["question_count"] == 3
+    assert page[0]["difficulty_counts"] == {"easy": 2, "medium": 0, "hard": 1}
+    assert page[1]["question_count"] == 0
+
+    cursor = response.headers["X-Next-Cursor"]
+    response = client.get(f"{prefix}/quizzes/banks", headers=auth_headers, params={"limit": 2, "after_id": cursor})
+    assert [b["id"] for b in response.json()] == [third]
+    assert "X-Next-Cursor" not in response.headers
+
+    response = client.get(f"{prefix}/quizzes/banks", headers=auth_headers, params={"view": "full", "limit": 1})
+    full = response.json()
+    assert full[0]["id"] == first
+    assert len(full[0]["questions"]) == 3
@@ -0,0 +1,243 @@
+# backend/tests/test_chat.py
+
+import asyncio
+import json
+from datetime import datetime, timezone
+
+import httpx
+from sqlalchemy import select
+
+from app.config import settings
+from app.db.base import AsyncSessionLocal, async_engine
+from app.db.models.chat import Conversation, Message
+from app.llm import LLMClient
+from app.services.chat_service import MESSAGE_OVERHEAD_TOKENS, ChatService, ChatTurn
+from app.services.document_parser import estimate_tokens
+
+prefix = settings.API_V1_STR
+
+
+def parse_events(text):
+    events = []
+    for block in text.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.split("\n"))
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def test_chat_persists_conversation(client, auth_headers, monkeypatch, llm_reply):
+    requests = []
+
+    def handler(request):
+        messages = json.loads(request.content)["messages"]
+        requests.append(messages)
+        return llm_reply(request, f"第{len(requests)}次回答")
+
+    monkeypatch.setattr(
+        "app.services.chat_service.LLMClient",
+        lambda: LLMClient(api_key="k", transport=httpx.MockTransport(handler)),
+    )
+    bank_id = client.post(f"{prefix}/quizzes/banks", headers=auth_headers, json={"name": "chat"}).json()["id"]
+
+    # 占位对话ID会创建新对话
+    first = client.post(f"{prefix}/chat/{bank_id}/0", headers=auth_headers, json={"message": "你好"})
+    assert first.status_code == 200
+    conversation_id = first.json()["conversation_id"]
+    assert conversation_id != "0"
+    assert first.json()["content"] == "第1次回答"
+
+    response = client.post(
+        f"{prefix}/chat/{bank_id}/{conversation_id}/stream", headers=auth_headers, json={"message": "继续"}
+    )
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = parse_events(response.text)
+    assert events[0] == ("start", {"conversation_id": conversation_id, "message_id": events[-1][1]["message_id"]})
+    assert "".join(data["content"] for name, data in events if name == "delta") == "第2次回答"
+    assert events[-1][0] == "done" and events[-1][1]["content"] == "第2次回答"
+    assert [(m["role"], m["content"]) for m in requests[1][1:]] == [
+        ("user", "你好"), ("assistant", "第1次回答"), ("user", "继续")
+    ]
+
+    client.post(f"{prefix}/chat/{bank_id}/{conversation_id}", headers=auth_headers, json={"message": "再问"})
+    assert [m["content"] for m in requests[2][-3:]] == ["继续", "第2次回答", "再问"]
+
+    other_bank = client.post(f"{prefix}/quizzes/banks", headers=auth_headers, json={"name": "other"}).json()["id"]
+    assert client.post(
+        f"{prefix}/chat/{other_bank}/{conversation_id}", headers=auth_headers, json={"message": "x"}
+    ).status_code == 404
+
+
+def test_stream_disconnect_closes_upstream(client, auth_headers, monkeypatch, llm_reply, run):
+    class Upstream(httpx.AsyncByteStream):
+        closed = False
+
+        async def __aiter__(self):
+            yield b'data: {"choices": [{"delta": {"content": "partial"}}]}\n\n'
+            await asyncio.Event().wait()
+
+        async def aclose(self):
+            self.closed = True
+
+    monkeypatch.setattr(
+        "app.services.chat_service.LLMClient",
+        lambda: LLMClient(api_key="k", transport=httpx.MockTransport(lambda request: llm_reply(request, "ok"))),
+    )
+    bank_id = client.post(f"{prefix}/quizzes/banks", headers=auth_headers, json={"name": "chat"}).json()["id"]
+    conversation_id = client.post(
+        f"{prefix}/chat/{bank_id}/0", headers=auth_headers, json={"message": "你好"}
+    ).json()["conversation_id"]
+
+    upstream = Upstream()
+    llm = LLMClient(api_key="k", transport=httpx.MockTransport(
+        lambda request: httpx.Response(200, stream=upstream, headers={"content-type": "text/event-stream"})
+    ))
+
+    async def scenario():
+        stream = ChatService.stream_reply(ChatTurn(conversation_id, [{"role": "user", "content": "继续"}]), llm)
+        assert (await stream.__anext__()).startswith("event: start")
+        assert "partial" in await stream.__anext__()
+        # 客户端断开：StreamingResponse 停止迭代并关闭生成器
+        await stream.aclose()
+        async with AsyncSessionLocal() as db:
+            return (await db.scalars(select(Message.content).where(
+                Message.conversation_id == conversation_id
+            ).order_by(Message.created_at))).all()
+
+    assert run(scenario()) == ["你好", "ok"]
+    assert upstream.closed
+
+
+def test_conversation_history_pages(client, auth_headers, monkeypatch, llm_reply):
+    monkeypatch.setattr(
+        "app.services.chat_service.LLMClient",
+        lambda: LLMClient(api_key="k", transport=httpx.MockTransport(lambda request: llm_reply(request, "答"))),
+    )
+    bank_id = client.post(f"{prefix}/quizzes/banks", headers=auth_headers, json={"name": "chat"}).json()["id"]
+    conversation = client.post(
+        f"{prefix}/chat/conversations", headers=auth_headers, json={"bank_id": bank_id, "title": "分页"}
+    ).json()
+    for i in range(4):
+        client.post(f"{prefix}/chat/{bank_id}/{conversation['id']}", headers=auth_headers, json={"message": f"问{i}"})
+
+    contents, before = [], None
+    while True:
+        page = client.get(
+            f"{prefix}/chat/conversations/{conversation['id']}/messages", headers=auth_headers,
+            params={"limit": 3, **({"before": before} if before else {})},
+        ).json()
+        contents = [m["content"] for m in page["items"]] + contents
+        before = page["next_before"]
+        if not before:
+            break
+    assert contents == [text for i in range(4) for text in (f"问{i}", "答")]
+
+    detail = client.get(f"{prefix}/chat/conversations/{conversation['id']}", headers=auth_headers).json()
+    assert detail["messages"][-1]["role"] == "assistant"
+    listed = client.get(f"{prefix}/chat/conversations", headers=auth_headers, params={"bank_id": bank_id}).json()
+    assert [c["id"] for c in listed] == [conversation["id"]]
+
+    assert client.delete(f"{prefix}/chat/conversations/{conversation['id']}", headers=auth_headers).status_code == 204
+    assert client.get(f"{prefix}/chat/conversations/{conversation['id']}", headers=auth_headers).status_code == 404
+
+
+def test_context_window_with_rolling_summary(client, auth_headers, monkeypatch, llm_reply):
+    monkeypatch.setattr(settings, "CHAT_CONTEXT_TOKENS", 40)
+    chats, summaries = [], []
+
+    def handler(request):
+        messages = json.loads(request.content)["messages"]
+        if "并入已有摘要" in messages[0]["content"]:
+            summaries.append(messages[0]["content"])
+            return llm_reply(request, f"摘要{len(summaries)}")
+        chats.append(messages)
+        return llm_reply(request, "这是一个比较长的回答内容")
+
+    monkeypatch.setattr(
+        "app.services.chat_service.LLMClient",
+        lambda: LLMClient(api_key="k", transport=httpx.MockTransport(handler)),
+    )
+    bank_id = client.post(f"{prefix}/quizzes/banks", headers=auth_headers, json={"name": "chat"}).json()["id"]
+    conversation_id = "0"
+    for i in range(8):
+        conversation_id = client.post(
+            f"{prefix}/chat/{bank_id}/{conversation_id}", headers=auth_headers, json={"message": f"第{i}个问题"}
+        ).json()["conversation_id"]
+
+    # 历史超出预算后，每轮发送的消息数保持不变，更早的内容以摘要形式出现
+    assert summaries and "第0个问题" in summaries[0]
+    assert len(chats[-1]) == len(chats[-2]) < 2 * 8
+    # 最后一轮回复之后的摘要留给下一轮使用
+    assert chats[-1][1]["content"] == f"此前对话的摘要：摘要{len(summaries) - 1}"
+    assert "第0个问题" not in json.dumps(chats[-1], ensure_ascii=False)
+    assert chats[-1][-1]["content"] == "第7个问题"
+
+
+def test_stream_compacts_in_background_without_holding_a_connection(
+    client, auth_headers, monkeypatch, llm_reply, run
+):
+    monkeypatch.setattr(settings, "CHAT_CONTEXT_TOKENS", 40)
+    checked_out = []
+
+    def handler(request):
+        messages = json.loads(request.content)["messages"]
+        if "并入已有摘要" in messages[0]["content"]:
+            checked_out.append(async_engine.sync_engine.pool.checkedout())
+            return llm_reply(request, "摘要")
+        return llm_reply(request, "这是一个比较长的回答内容")
+
+    monkeypatch.setattr(
+        "app.services.chat_service.LLMClient",
+        lambda: LLMClient(api_key="k", transport=httpx.MockTransport(handler)),
+    )
+    bank_id = client.post(f"{prefix}/quizzes/banks", headers=auth_headers, json={"name": "chat"}).json()["id"]
+    conversation_id = "0"
+    for i in range(6):
+        response = client.post(
+            f"{prefix}/chat/{bank_id}/{conversation_id}/stream", headers=auth_headers, json={"message": f"第{i}个问题"}
+        )
+        events = parse_events(response.text)
+        assert events[-1][0] == "done"
+        conversation_id = events[-1][1]["conversation_id"]
+
+    # 流结束后的后台任务完成了摘要，调用模型时没有占用数据库连接
+    assert checked_out and set(checked_out) == {0}
+
+    async def summary():
+        async with AsyncSessionLocal() as db:
+            return (await db.get(Conversation, conversation_id)).summary
+
+    assert run(summary()) == "摘要"
+
+
+def test_compaction_cursor_keeps_messages_sharing_a_timestamp(client, auth_headers, monkeypatch, llm_reply, run):
+    monkeypatch.setattr(settings, "CHAT_CONTEXT_TOKENS", 2 * (estimate_tokens("消息0") + MESSAGE_OVERHEAD_TOKENS))
+    monkeypatch.setattr(settings, "CHAT_HISTORY_PAGE_SIZE", 2)
+    bank_id = client.post(f"{prefix}/quizzes/banks", headers=auth_headers, json={"name": "chat"}).json()["id"]
+    conversation_id = client.post(
+        f"{prefix}/chat/conversations", headers=auth_headers, json={"bank_id": bank_id, "title": "同一时刻"}
+    ).json()["id"]
+    prompts = []
+
+    def handler(request):
+        prompts.append(json.loads(request.content)["messages"][0]["content"])
+        return llm_reply(request, f"摘要{len(prompts)}")
+
+    llm = LLMClient(api_key="k", transport=httpx.MockTransport(handler))
+    now = datetime.now(timezone.utc)
+
+    async def scenario():
+        async with AsyncSessionLocal() as db:
+            db.add_all(Message(id=f"m{i}", conversation_id=conversation_id, content=f"消息{i}", created_at=now)
+                       for i in range(6))
+            await db.commit()
+        for _ in range(3):
+            await ChatService.compact(conversation_id, llm)
+        async with AsyncSessionLocal() as db:
+            window, overflow = await ChatService._load_window(db, await db.get(Conversation, conversation_id))
+            return [message.content for message in window], overflow
+
+    # 六条消息时间相同：游标带上 id，与已并入消息同一时刻的消息在下一次压缩中并入，而不是被跳过
+    assert run(scenario()) == (["消息4", "消息5"], False)
+    assert len(prompts) == 2
+    assert "消息0" in prompts[0] and "消息1" in prompts[0]
+    assert "消息2" in prompts[1] and "消息3" in prompts[1] and "摘要1" in prompts[1]
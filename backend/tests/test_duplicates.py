@@ -0,0 +1,108 @@
+# backend/tests/test_duplicates.py
+
+from array import array
+
+import app.services.duplicate_index as duplicate_module
+from app.config import settings
+from app.services.duplicate_index import (
+    BANDS, NUM_PERM, ROWS, SignatureIndex, build_index, signatures, similarity
+)
+from app.services.job_service import job_queue
+
+prefix = settings.API_V1_STR
+
+PROMPTS = [
+    "光合作用发生在植物细胞的哪个细胞器中？",
+    "光合作用发生在植物细胞的哪一个细胞器中？",
+    "细胞呼吸的主要场所是哪里？",
+    "牛顿第一定律指出物体在不受外力时保持静止或匀速直线运动状态，它又称为什么定律？",
+    "牛顿第一定律指出物体在不受外力时保持静止或匀速直线运动状态，它又被称为什么定律？",
+    "地球绕太阳公转一周约需多少天？",
+]
+
+
+def test_signature_index_query_and_clusters(monkeypatch):
+    index = build_index(list(enumerate(PROMPTS)), 0.6)
+    assert [question_id for question_id, _ in index.query(signatures([PROMPTS[0]])[0], exclude=0)] == [1]
+    assert index.query(signatures(["欧姆定律描述了什么关系？"])[0]) == []
+    assert index.clusters() == [[0, 1], [3, 4]]
+
+    index.remove(1)
+    assert index.clusters() == [[3, 4]]
+
+    # 桶中第一个问题与其余都不相似时，其余问题之间仍要比较
+    base = array("I", range(NUM_PERM))
+    close = array("I", base)
+    for band in range(1, BANDS):
+        close[band * ROWS] += 1000
+    unrelated = array("I", base[:ROWS]) + array("I", (x + 2000 for x in base[ROWS:]))
+    index = SignatureIndex(0.7)
+    for question_id, sig in ((1, unrelated), (2, base), (3, close)):
+        index.add(question_id, sig)
+    assert similarity(base, close) >= 0.7
+    assert index.clusters() == [[2, 3]]
+
+    # 没有 numpy 时逐个计算，结果相同
+    expected = signatures(PROMPTS)
+    monkeypatch.setattr(duplicate_module, "np", None)
+    assert signatures(PROMPTS) == expected
+
+
+def test_duplicate_checks_and_dedup_job(client, auth_headers, monkeypatch, run):
+    monkeypatch.setattr(duplicate_module.duplicate_index, "threshold", 0.6)
+    bank_id = client.post(f"{prefix}/quizzes/banks", headers=auth_headers, json={"name": "dedup"}).json()["id"]
+
+    def create(prompt, **params):
+        return client.post(f"{prefix}/quizzes/banks/{bank_id}/questions", headers=auth_headers, params=params, json={
+            "bank_id": bank_id, "prompt": prompt, "answer": "答案"
+        })
+
+    first = create(PROMPTS[0])
+    assert "X-Duplicate-Of" not in first.headers
+    first_id = first.json()["id"]
+
+    # 默认照常创建，在响应头中标出重复的问题
+    flagged = create(PROMPTS[1])
+    assert flagged.status_code == 201
+    assert flagged.headers["X-Duplicate-Of"] == str(first_id)
+
+    rejected = create(PROMPTS[0] + "。", reject_duplicates=True)
+    assert rejected.status_code == 409
+    assert {d["question_id"] for d in rejected.json()["detail"]["duplicates"]} == {first_id, flagged.json()["id"]}
+
+    def duplicates(prompt):
+        response = client.get(
+            f"{prefix}/quizzes/banks/{bank_id}/questions/duplicates", headers=auth_headers, params={"prompt": prompt}
+        )
+        assert response.status_code == 200
+        return [d["question_id"] for d in response.json()]
+
+    assert duplicates(PROMPTS[3]) == []
+    # 修改题干、删除问题后，已加载的索引同步更新
+    client.put(f"{prefix}/quizzes/questions/{first_id}", headers=auth_headers, json={"prompt": PROMPTS[3]})
+    assert duplicates(PROMPTS[3]) == [first_id]
+    client.delete(f"{prefix}/quizzes/questions/{first_id}", headers=auth_headers)
+    assert duplicates(PROMPTS[3]) == []
+
+    for prompt in PROMPTS[2:]:
+        create(prompt)
+    response = client.post(
+        f"{prefix}/quizzes/banks/{bank_id}/questions/dedup/jobs", headers=auth_headers, params={"threshold": 0.6}
+    )
+    assert response.status_code == 202
+    job_id = response.json()["id"]
+    while True:
+        job = run(job_queue.claim())
+        assert job is not None
+        run(job_queue.run(job))
+        if job.id == job_id:
+            break
+
+    result = client.get(f"{prefix}/jobs/{job_id}", headers=auth_headers).json()["result"]
+    questions = {q["prompt"]: q["id"] for q in client.get(
+        f"{prefix}/quizzes/banks/{bank_id}/questions", headers=auth_headers
+    ).json()}
+    assert result["questions"] == 5
+    assert result["duplicates"] == 1
+    assert result["clusters"] == [[questions[PROMPTS[3]], questions[PROMPTS[4]]]]
+
@@ -0,0 +1,101 @@
+# backend/tests/test_etags.py
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+from app.config import settings
+from app.db.base import async_engine, engine
+
+prefix = settings.API_V1_STR
+
+
+@contextmanager
+def count_queries(bind):
+    """统计代码块内发出的 SQL 语句数"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(bind, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(bind, "before_cursor_execute", before_cursor_execute)
+
+
+def test_bank_conditional_get(client, auth_headers):
+    bank_id = client.post(f"{prefix}/quizzes/banks", headers=auth_headers, json={"name": "etag"}).json()["id"]
+    client.post(f"{prefix}/quizzes/banks/{bank_id}/questions", headers=auth_headers, json={
+        "bank_id": bank_id, "prompt": "1 + 1 = ?", "answer": "2", "options": [{"content": "2", "is_correct": True}]
+    })
+
+    for url in (f"{prefix}/quizzes/banks/{bank_id}", f"{prefix}/quizzes/banks/{bank_id}/questions"):
+        response = client.get(url, headers=auth_headers)
+        etag = response.headers["etag"]
+        assert response.status_code == 200 and etag.startswith('"') and response.headers["last-modified"]
+
+        # 未变化时只按主键查一次版本号，不加载问题
+        with count_queries(engine) as statements:
+            response = client.get(url, headers={**auth_headers, "If-None-Match": etag})
+        assert response.status_code == 304 and response.content == b""
+        assert response.headers["etag"] == etag
+        assert len(statements) == 1
+        assert client.get(url, headers={**auth_headers, "If-None-Match": f'"x", W/{etag}'}).status_code == 304
+
+    # 同一版本下题库详情和问题列表的各页是不同的表示，ETag 各不相同
+    pages = [f"{prefix}/quizzes/banks/{bank_id}", *(
+        f"{prefix}/quizzes/banks/{bank_id}/questions?skip={skip}&limit={limit}"
+        for skip, limit in ((0, 100), (0, 1), (1, 1))
+    )]
+    tags = [client.get(url, headers=auth_headers).headers["etag"] for url in pages]
+    assert len(set(tags)) == len(tags)
+    assert client.get(pages[2], headers={**auth_headers, "If-None-Match": tags[3]}).status_code == 200
+
+    def etag():
+        return client.get(f"{prefix}/quizzes/banks/{bank_id}/questions", headers=auth_headers).headers["etag"]
+
+    # 题库、问题和导入的写入都会让 ETag 变化
+    seen = [etag()]
+    question_id = client.post(f"{prefix}/quizzes/banks/{bank_id}/questions", headers=auth_headers, json={
+        "bank_id": bank_id, "prompt": "2 + 2 = ?", "answer": "4"
+    }).json()["id"]
+    seen.append(etag())
+    client.put(f"{prefix}/quizzes/questions/{question_id}", headers=auth_headers, json={"answer": "四"})
+    seen.append(etag())
+    client.delete(f"{prefix}/quizzes/questions/{question_id}", headers=auth_headers)
+    seen.append(etag())
+    client.post(
+        f"{prefix}/quizzes/banks/{bank_id}/questions/import", headers=auth_headers,
+        content='{"prompt": "3 + 3 = ?", "answer": "6"}'.encode()
+    )
+    seen.append(etag())
+    client.put(f"{prefix}/quizzes/banks/{bank_id}", headers=auth_headers, json={"name": "renamed"})
+    seen.append(etag())
+    assert len(set(seen)) == len(seen)
+
+    response = client.get(f"{prefix}/quizzes/banks/{bank_id}", headers={**auth_headers, "If-None-Match": seen[0]})
+    assert response.status_code == 200 and response.json()["name"] == "renamed"
+    assert client.get(f"{prefix}/quizzes/banks/0", headers={**auth_headers, "If-None-Match": "*"}).status_code == 404
+
+
+def test_quiz_paper_conditional_get(client, auth_headers):
+    bank_id = client.post(f"{prefix}/quizzes/banks", headers=auth_headers, json={"name": "paper etag"}).json()["id"]
+    question_id = client.post(f"{prefix}/quizzes/banks/{bank_id}/questions", headers=auth_headers, json={
+        "bank_id": bank_id, "prompt": "1 + 1 = ?", "answer": "2"
+    }).json()["id"]
+    quiz = client.post(f"{prefix}/quizzes/quizzes", headers=auth_headers, json={
+        "bank_id": bank_id, "title": "etag", "duration_seconds": 60, "question_count": 1
+    }).json()
+    url = f"{prefix}/quizzes/quizzes/{quiz['id']}/paper"
+
+    etag = client.get(url, headers=auth_headers).headers["etag"]
+    client.get(f"{prefix}/users/me", headers=auth_headers)
+    with count_queries(async_engine.sync_engine) as statements:
+        response = client.get(url, headers={**auth_headers, "If-None-Match": etag})
+    assert response.status_code == 304 and statements == []
+
+    client.put(f"{prefix}/quizzes/questions/{question_id}", headers=auth_headers, json={"prompt": "1 + 2 = ?"})
+    response = client.get(url, headers={**auth_headers, "If-None-Match": etag})
+    assert response.status_code == 200 and response.headers["etag"] != etag
+    assert response.json()["questions"][0]["prompt"] == "1 + 2 = ?"
@@ -0,0 +1,148 @@
+# backend/tests/test_files.py
+
+import asyncio
+import hashlib
+import subprocess
+import sys
+
+from app.config import settings
+from app.services.blob_store import BlobStore
+
+prefix = settings.API_V1_STR
+
+
+def test_upload_list_delete_file(client, auth_headers):
+    bank_id = client.post(f"{prefix}/quizzes/banks", headers=auth_headers, json={"name": "files"}).json()["id"]
+
+    response = client.post(
+        f"{prefix}/files/upload/{bank_id}", headers=auth_headers,
+        files={"file": ("notes.txt", b"hello world", "text/plain")},
+    )
+    assert response.status_code == 200
+    file_id = response.json()["id"]
+    assert response.json()["name"] == "notes.txt"
+
+    files = client.get(f"{prefix}/files/bank/{bank_id}", headers=auth_headers).json()
+    assert [f["id"] for f in files] == [file_id]
+
+    assert client.delete(f"{prefix}/files/{file_id}", headers=auth_headers).status_code == 204
+    assert client.get(f"{prefix}/files/bank/{bank_id}", headers=auth_headers).json() == []
+
+
+def test_upload_to_foreign_bank_is_rejected(client, auth_headers):
+    response = client.post(
+        f"{prefix}/files/upload/999999", headers=auth_headers,
+        files={"file": ("notes.txt", b"hello", "text/plain")},
+    )
+    assert response.status_code == 404
+
+
+def test_upload_over_size_limit_is_aborted(client, auth_headers, monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "BLOB_DIRECTORY", str(tmp_path / "blobs"))
+    monkeypatch.setattr(settings, "MAX_UPLOAD_SIZE", 16)
+    monkeypatch.setattr(settings, "UPLOAD_CHUNK_SIZE", 4)
+    bank_id = client.post(f"{prefix}/quizzes/banks", headers=auth_headers, json={"name": "big"}).json()["id"]
+
+    response = client.post(
+        f"{prefix}/files/upload/{bank_id}", headers=auth_headers,
+        files={"file": ("big.txt", b"x" * 32, "text/plain")},
+    )
+    assert response.status_code == 413
+    # 不留下临时文件或不完整的文件
+    assert [p for p in tmp_path.rglob("*") if p.is_file()] == []
+    assert (tmp_path / "blobs" / "tmp").is_dir()
+    assert client.get(f"{prefix}/files/bank/{bank_id}", headers=auth_headers).json() == []
+
+
+def test_identical_uploads_share_one_blob(client, auth_headers, monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "BLOB_DIRECTORY", str(tmp_path / "blobs"))
+    banks = [
+        client.post(f"{prefix}/quizzes/banks", headers=auth_headers, json={"name": f"dedup{i}"}).json()["id"]
+        for i in range(2)
+    ]
+    file_ids = [
+        client.post(
+            f"{prefix}/files/upload/{bank_id}", headers=auth_headers,
+            files={"file": ("same.pdf", b"%PDF same content", "application/pdf")},
+        ).json()["id"]
+        for bank_id in banks
+    ]
+    blobs = lambda: [p for p in (tmp_path / "blobs").rglob("*") if p.is_file() and p.suffix != ".lock"]
+    assert len(blobs()) == 1
+
+    # 还有其它引用时保留物理文件，最后一个引用删除后才删除
+    assert client.delete(f"{prefix}/files/{file_ids[0]}", headers=auth_headers).status_code == 204
+    assert len(blobs()) == 1
+    assert client.delete(f"{prefix}/files/{file_ids[1]}", headers=auth_headers).status_code == 204
+    assert blobs() == []
+
+
+def test_deleting_bank_releases_its_blobs(client, auth_headers, monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "BLOB_DIRECTORY", str(tmp_path / "blobs"))
+    banks = [
+        client.post(f"{prefix}/quizzes/banks", headers=auth_headers, json={"name": f"drop{i}"}).json()["id"]
+        for i in range(2)
+    ]
+    for bank_id in banks:
+        client.post(
+            f"{prefix}/files/upload/{bank_id}", headers=auth_headers,
+            files={"file": ("shared.txt", b"shared content", "text/plain")},
+        )
+    client.post(
+        f"{prefix}/files/upload/{banks[0]}", headers=auth_headers,
+        files={"file": ("own.txt", b"only in the first bank", "text/plain")},
+    )
+    blobs = lambda: [p for p in (tmp_path / "blobs").rglob("*") if p.is_file() and p.suffix != ".lock"]
+    assert len(blobs()) == 2
+
+    # 另一个题库仍引用的 blob 保留
+    assert client.delete(f"{prefix}/quizzes/banks/{banks[0]}", headers=auth_headers).status_code == 204
+    assert len(blobs()) == 1
+    assert len(client.get(f"{prefix}/files/bank/{banks[1]}", headers=auth_headers).json()) == 1
+    assert client.delete(f"{prefix}/quizzes/banks/{banks[1]}", headers=auth_headers).status_code == 204
+    assert blobs() == []
+
+
+def test_blob_lock_excludes_other_processes(tmp_path, run):
+    store = BlobStore(tmp_path)
+    content_hash = "ab" * 32
+    store.lock_path(content_hash).parent.mkdir(parents=True)
+    holder = subprocess.Popen([sys.executable, "-c", (
+        "import fcntl, sys\n"
+        f"f = open({str(store.lock_path(content_hash))!r}, 'ab')\n"
+        "fcntl.flock(f, fcntl.LOCK_EX)\n"
+        "print('locked', flush=True)\n"
+        "sys.stdin.readline()\n"
+    )], stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+    try:
+        assert holder.stdout.readline().strip() == "locked"
+
+        async def acquire():
+            async with store.lock(content_hash):
+                return True
+
+        async def scenario():
+            # 另一个进程持有锁时等待，释放后才能进入
+            waiting = asyncio.create_task(acquire())
+            await asyncio.sleep(0.2)
+            assert not waiting.done()
+            holder.stdin.write("\n")
+            holder.stdin.flush()
+            return await asyncio.wait_for(waiting, 5)
+
+        assert run(scenario())
+    finally:
+        holder.kill()
+        holder.wait()
+
+
+def test_blobs_are_not_served_publicly(client, auth_headers):
+    bank_id = client.post(f"{prefix}/quizzes/banks", headers=auth_headers, json={"name": "private"}).json()["id"]
+    content = b"private notes"
+    client.post(
+        f"{prefix}/files/upload/{bank_id}", headers=auth_headers,
+        files={"file": ("notes.txt", content, "text/plain")},
+    )
+    # 知道内容哈希也无法通过公开的 /uploads 确认文档是否被上传过
+    content_hash = hashlib.sha256(content).hexdigest()
+    assert client.get(f"/uploads/blobs/{content_hash[:2]}/{content_hash[2:4]}/{content_hash}").status_code == 404
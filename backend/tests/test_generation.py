@@ -0,0 +1,77 @@
+# backend/tests/test_generation.py
+
+import json
+import re
+
+import httpx
+
+from app.config import settings
+from app.llm import LLMClient
+from app.services.generation_service import QuestionDeduplicator, allocate_questions
+
+prefix = settings.API_V1_STR
+
+
+def test_allocation_and_dedup():
+    assert allocate_questions([100, 100, 200], 8) == [2, 2, 4]
+    assert allocate_questions([10, 30, 60], 3) == [0, 1, 2]
+    assert sum(allocate_questions([7, 13, 29, 1], 10)) == 10
+    assert allocate_questions([], 5) == []
+
+    dedup = QuestionDeduplicator(0.8)
+    assert dedup.add("光合作用发生在细胞的哪个部位？")
+    assert not dedup.add("光合作用发生在细胞的哪个部位?")
+    assert dedup.add("细胞呼吸的主要场所是哪里？")
+
+
+def test_generate_questions_from_file(client, auth_headers, monkeypatch, llm_reply):
+    monkeypatch.setattr(settings, "GENERATION_CHUNK_TOKENS", 20)
+    requests = []
+
+    def handler(request):
+        prompt = json.loads(request.content)["messages"][0]["content"]
+        requests.append(prompt)
+        count = int(re.search(r"生成(\d+)道", prompt).group(1))
+        topic = re.search(r"主题(\w+)", prompt).group(1)
+        questions = [
+            {
+                "question": f"关于主题{topic}的第{i}个问题是什么？",
+                "options": ["甲", "乙"],
+                "answer": "A",
+            }
+            for i in range(count)
+        ]
+        # 每块都会返回一道相同的题，应被去重
+        questions.append({"prompt": "所有块都会生成的重复问题", "answer": "是"})
+        questions.append({"answer": "缺少题干"})
+        return llm_reply(request, json.dumps(questions, ensure_ascii=False))
+
+    monkeypatch.setattr(
+        "app.services.generation_service.LLMClient",
+        lambda: LLMClient(api_key="k", transport=httpx.MockTransport(handler)),
+    )
+
+    bank_id = client.post(f"{prefix}/quizzes/banks", headers=auth_headers, json={"name": "gen"}).json()["id"]
+    paragraphs = [f"主题{name} " + "内容" * 8 for name in ("一", "二", "三")]
+    file_id = client.post(
+        f"{prefix}/files/upload/{bank_id}", headers=auth_headers,
+        files={"file": ("notes.txt", "\n\n".join(paragraphs).encode("utf-8"), "text/plain")},
+    ).json()["id"]
+
+    response = client.post(
+        f"{prefix}/quizzes/banks/{bank_id}/questions/generate", headers=auth_headers,
+        json={"file_id": file_id, "num_questions": 6},
+    )
+    assert response.status_code == 200
+    result = response.json()
+    assert len(requests) == result["chunks"] == 3
+    assert result["failed_chunks"] == 0
+    assert result["duplicates"] == 2
+    assert result["invalid"] == 3
+    assert result["inserted"] == 7
+
+    questions = client.get(f"{prefix}/quizzes/banks/{bank_id}/questions", headers=auth_headers).json()
+    assert len(questions) == 7
+    first = next(q for q in questions if q["options"])
+    assert first["answer"] == "甲"
+    assert [o["is_correct"] for o in first["options"]] == [True, False]
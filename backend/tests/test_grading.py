@@ -0,0 +1,83 @@
+# backend/tests/test_grading.py
+
+from app.config import settings
+from app.db.base import AsyncSessionLocal, SessionLocal
+from app.db.models.quiz import QuestionStat
+from app.services.stat_accumulator import stat_accumulator
+
+prefix = settings.API_V1_STR
+
+
+async def flush_stats():
+    async with AsyncSessionLocal() as db:
+        await stat_accumulator.flush(db)
+
+
+def test_submit_quiz_is_graded_on_the_server(client, auth_headers, run):
+    bank_id = client.post(f"{prefix}/quizzes/banks", headers=auth_headers, json={"name": "grading"}).json()["id"]
+    client.post(f"{prefix}/quizzes/banks/{bank_id}/questions", headers=auth_headers, json={
+        "bank_id": bank_id, "prompt": "1 + 1 = ?", "answer": "2",
+        "options": [{"content": "1"}, {"content": "2", "is_correct": True}, {"content": "3"}]
+    })
+    client.post(f"{prefix}/quizzes/banks/{bank_id}/questions", headers=auth_headers, json={
+        "bank_id": bank_id, "prompt": "哪些是质数？", "answer": "2, 3",
+        "options": [{"content": "2", "is_correct": True}, {"content": "3", "is_correct": True}, {"content": "4"}]
+    })
+    client.post(f"{prefix}/quizzes/banks/{bank_id}/questions", headers=auth_headers, json={
+        "bank_id": bank_id, "prompt": "水的化学式", "answer": "H2O"
+    })
+    quiz = client.post(f"{prefix}/quizzes/quizzes", headers=auth_headers, json={
+        "bank_id": bank_id, "title": "期中", "duration_seconds": 600, "question_count": 3
+    }).json()
+    questions = {qq["question"]["prompt"]: qq["question"] for qq in quiz["quiz_questions"]}
+    single, multiple, text = questions["1 + 1 = ?"], questions["哪些是质数？"], questions["水的化学式"]
+
+    def option_ids(question, correct=True):
+        return [o["id"] for o in question["options"] if o["is_correct"] == correct]
+
+    def submit(answers):
+        return client.post(
+            f"{prefix}/quizzes/quizzes/{quiz['id']}/submissions", headers=auth_headers, json={"answers": answers}
+        )
+
+    response = submit({
+        str(single["id"]): option_ids(single)[0],
+        str(multiple["id"]): option_ids(multiple),
+        str(text["id"]): " ｈ2o ",
+    })
+    assert response.status_code == 201
+    result = response.json()
+    assert (result["score"], result["correct_count"], result["total"]) == (100.0, 3, 3)
+
+    # 多选题少选判错，未作答判错；客户端无法自报分数
+    result = submit({
+        str(single["id"]): option_ids(single, correct=False)[0],
+        str(multiple["id"]): option_ids(multiple)[:1],
+        "score": 100,
+    })
+    assert result.status_code == 400
+    result = submit({
+        str(single["id"]): option_ids(single, correct=False)[0],
+        str(multiple["id"]): option_ids(multiple)[:1],
+    }).json()
+    assert result["correct_count"] == 0
+    assert result["results"] == {str(single["id"]): False, str(multiple["id"]): False, str(text["id"]): False}
+
+    assert submit({str(single["id"]): option_ids(multiple)[0]}).status_code == 400
+    assert client.post(
+        f"{prefix}/quizzes/quizzes/0/submissions", headers=auth_headers, json={"answers": {}}
+    ).status_code == 404
+
+    run(flush_stats())
+    db = SessionLocal()
+    try:
+        stats = {s.question_id: (s.attempts, s.correct_attempts) for s in db.query(QuestionStat).filter(
+            QuestionStat.question_id.in_([single["id"], multiple["id"], text["id"]])
+        )}
+    finally:
+        db.close()
+    assert stats == {single["id"]: (2, 1), multiple["id"]: (2, 1), text["id"]: (2, 1)}
+
+    # 修改答案后缓存的标准答案失效
+    client.put(f"{prefix}/quizzes/questions/{text['id']}", headers=auth_headers, json={"answer": "水"})
+    assert submit({str(text["id"]): "水"}).json()["correct_count"] == 1
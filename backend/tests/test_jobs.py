@@ -0,0 +1,221 @@
+# backend/tests/test_jobs.py
+
+import asyncio
+import json
+import os
+import time
+
+import httpx
+from fastapi.testclient import TestClient
+from pydantic import BaseModel
+from sqlalchemy import update
+
+from app.main import app
+from app.config import settings
+from app.db.base import AsyncSessionLocal
+from app.db.models.job import Job
+from app.llm import LLMClient
+from app.services.job_service import job_queue, register_job_kind
+
+prefix = settings.API_V1_STR
+
+
+class StepsPayload(BaseModel):
+    steps: int
+
+
+async def _steps(db, user, payload, ctx):
+    for i in range(payload.steps):
+        await ctx.report((i + 1) / payload.steps)
+    return {"steps": payload.steps}
+
+
+register_job_kind("test_steps", _steps, StepsPayload)
+
+
+def wait_for(client, headers, job_id, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = client.get(f"{prefix}/jobs/{job_id}", headers=headers).json()
+        if job["status"] in ("succeeded", "failed", "cancelled"):
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"job {job_id} did not finish: {job}")
+
+
+def test_priority_per_user_limit_and_cancel(client, auth_headers, monkeypatch, run):
+    monkeypatch.setattr(settings, "JOB_MAX_PER_USER", 1)
+
+    def submit(priority):
+        response = client.post(f"{prefix}/jobs", headers=auth_headers, json={
+            "kind": "test_steps", "payload": {"steps": 3}, "priority": priority
+        })
+        assert response.status_code == 202
+        return response.json()["id"]
+
+    low, high, normal = submit(-1), submit(5), submit(0)
+    assert client.post(f"{prefix}/jobs", headers=auth_headers, json={
+        "kind": "import_questions", "payload": {}
+    }).status_code == 400
+    assert client.post(f"{prefix}/jobs", headers=auth_headers, json={
+        "kind": "test_steps", "payload": {"steps": "many"}
+    }).status_code == 422
+
+    cancelled = client.post(f"{prefix}/jobs/{low}/cancel", headers=auth_headers).json()
+    assert cancelled["status"] == "cancelled"
+
+    first = run(job_queue.claim())
+    assert first.id == high
+    # 该用户已有一个运行中的任务，达到上限
+    assert run(job_queue.claim()) is None
+
+    # 运行中的任务被请求取消后，下一次汇报进度时中止
+    assert client.post(f"{prefix}/jobs/{high}/cancel", headers=auth_headers).json()["status"] == "running"
+    run(job_queue.run(first))
+    assert client.get(f"{prefix}/jobs/{high}", headers=auth_headers).json()["status"] == "cancelled"
+
+    second = run(job_queue.claim())
+    assert second.id == normal
+    run(job_queue.run(second))
+    job = client.get(f"{prefix}/jobs/{normal}", headers=auth_headers).json()
+    assert job["status"] == "succeeded"
+    assert job["progress"] == 1.0
+    assert job["result"] == {"steps": 3}
+
+
+def test_background_generation_and_import(auth_headers, monkeypatch, llm_reply):
+    monkeypatch.setattr(settings, "JOB_POLL_INTERVAL_SECONDS", 0.05)
+
+    def handler(request):
+        questions = [{"prompt": "后台生成的问题", "answer": "是"}]
+        return llm_reply(request, json.dumps(questions, ensure_ascii=False))
+
+    monkeypatch.setattr(
+        "app.services.generation_service.LLMClient",
+        lambda: LLMClient(api_key="k", transport=httpx.MockTransport(handler)),
+    )
+
+    with TestClient(app) as client:
+        bank_id = client.post(f"{prefix}/quizzes/banks", headers=auth_headers, json={"name": "jobs"}).json()["id"]
+        file_id = client.post(
+            f"{prefix}/files/upload/{bank_id}", headers=auth_headers,
+            files={"file": ("notes.txt", "后台任务的内容".encode("utf-8"), "text/plain")},
+        ).json()["id"]
+
+        job_id = client.post(f"{prefix}/jobs", headers=auth_headers, json={
+            "kind": "generate_questions",
+            "payload": {"bank_id": bank_id, "file_id": file_id, "num_questions": 1}
+        }).json()["id"]
+        job = wait_for(client, auth_headers, job_id)
+        assert job["status"] == "succeeded"
+        assert job["result"]["inserted"] == 1
+
+        events = client.get(f"{prefix}/jobs/{job_id}/events", headers=auth_headers)
+        assert events.headers["content-type"].startswith("text/event-stream")
+        last = json.loads(events.text.strip().split("\n\n")[-1][len("data: "):])
+        assert last["status"] == "succeeded"
+
+        body = "\n".join(json.dumps({"prompt": f"导入{i}", "answer": "a"}) for i in range(5))
+        response = client.post(
+            f"{prefix}/quizzes/banks/{bank_id}/questions/import/jobs", headers=auth_headers,
+            content=body.encode("utf-8"),
+        )
+        assert response.status_code == 202
+        job = wait_for(client, auth_headers, response.json()["id"])
+        assert job["status"] == "succeeded"
+        assert job["result"]["imported"] == 5
+
+        listed = client.get(f"{prefix}/jobs", headers=auth_headers).json()
+        assert {j["id"] for j in listed} >= {job_id, job["id"]}
+
+
+def test_cancel_local_removes_import_spool(client, auth_headers, monkeypatch, run):
+    from app.services.import_service import ImportService
+
+    async def never_finishes(db, bank_id, body, format, user):
+        async for _ in body:
+            await asyncio.Event().wait()
+
+    monkeypatch.setattr(ImportService, "import_questions", never_finishes)
+    bank_id = client.post(f"{prefix}/quizzes/banks", headers=auth_headers, json={"name": "cancel"}).json()["id"]
+    job_id = client.post(
+        f"{prefix}/quizzes/banks/{bank_id}/questions/import/jobs", headers=auth_headers,
+        content=json.dumps({"prompt": "q", "answer": "a"}).encode("utf-8"),
+    ).json()["id"]
+
+    async def scenario():
+        job = await job_queue.claim()
+        assert job.id == job_id
+        running = asyncio.create_task(job_queue.run(job))
+        while job_id not in job_queue._running:
+            await asyncio.sleep(0)
+        await asyncio.sleep(0.05)
+        job_queue.cancel_local(job_id)
+        await running
+        return job.payload["path"]
+
+    path = run(scenario())
+    assert client.get(f"{prefix}/jobs/{job_id}", headers=auth_headers).json()["status"] == "cancelled"
+    assert not os.path.exists(path)
+
+
+def test_import_job_body_over_limit_is_rejected(client, auth_headers, monkeypatch):
+    monkeypatch.setattr(settings, "IMPORT_MAX_SIZE", 16)
+    bank_id = client.post(f"{prefix}/quizzes/banks", headers=auth_headers, json={"name": "too large"}).json()["id"]
+    spool = os.path.join(settings.UPLOAD_DIRECTORY, "imports")
+    before = set(os.listdir(spool)) if os.path.isdir(spool) else set()
+
+    response = client.post(
+        f"{prefix}/quizzes/banks/{bank_id}/questions/import/jobs", headers=auth_headers,
+        content=json.dumps({"prompt": "x" * 32, "answer": "a"}).encode("utf-8"),
+    )
+    assert response.status_code == 413
+    assert set(os.listdir(spool)) == before
+
+
+def test_concurrent_claims_respect_per_user_limit(client, auth_headers, monkeypatch, run):
+    monkeypatch.setattr(settings, "JOB_MAX_PER_USER", 1)
+    submitted = {
+        client.post(f"{prefix}/jobs", headers=auth_headers, json={
+            "kind": "test_steps", "payload": {"steps": 1}, "priority": 50
+        }).json()["id"]
+        for _ in range(3)
+    }
+
+    async def scenario():
+        # 未启动的队列没有进程内的领取锁，几个领取并发交错执行，相当于多个进程
+        claimed = await asyncio.gather(*(job_queue.claim() for _ in range(3)))
+        claimed = [job for job in claimed if job is not None]
+        for job in claimed:
+            await job_queue.run(job)
+        while (job := await job_queue.claim()) is not None:
+            await job_queue.run(job)
+        return claimed
+
+    claimed = run(scenario())
+    assert len(claimed) == 1 and claimed[0].id in submitted
+    for job_id in submitted:
+        assert client.get(f"{prefix}/jobs/{job_id}", headers=auth_headers).json()["status"] == "succeeded"
+
+
+def test_result_of_a_lost_claim_is_dropped(client, auth_headers, run):
+    job_id = client.post(f"{prefix}/jobs", headers=auth_headers, json={
+        "kind": "test_steps", "payload": {"steps": 0}, "priority": 100
+    }).json()["id"]
+
+    async def scenario():
+        stale = await job_queue.claim()
+        # 心跳超时后任务被回收并由另一个工作进程重新领取，原来的执行随后才结束
+        async with AsyncSessionLocal() as db:
+            await db.execute(update(Job).where(Job.id == job_id).values(status="queued"))
+            await db.commit()
+        current = await job_queue.claim()
+        assert stale.id == current.id == job_id and current.attempts == stale.attempts + 1
+        await job_queue.run(stale)
+        async with AsyncSessionLocal() as db:
+            after_stale = (await db.get(Job, job_id)).status
+        await job_queue.run(current)
+        return after_stale
+
+    assert run(scenario()) == "running"
+    assert client.get(f"{prefix}/jobs/{job_id}", headers=auth_headers).json()["status"] == "succeeded"
@@ -0,0 +1,190 @@
+# backend/tests/test_llm_client.py
+
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from app.config import settings
+from app.llm import GenerationCache, LLMClient, LLMError
+from app.llm.stream_parser import QuestionStreamParser, extract_json_items
+
+
+def completion(content):
+    return {"choices": [{"message": {"content": content}}]}
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_BACKOFF_BASE_SECONDS", 0)
+
+
+def test_retries_rate_limit_and_server_errors():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        if len(calls) == 1:
+            return httpx.Response(429, headers={"Retry-After": "0"})
+        if len(calls) == 2:
+            return httpx.Response(503)
+        return httpx.Response(200, json=completion('[{"prompt": "1+1?", "answer": "2"}]'))
+
+    client = LLMClient(api_key="k", base_url="http://mock/v1", transport=httpx.MockTransport(handler))
+    questions = asyncio.run(client.generate_questions("算术", num_questions=1))
+
+    assert questions == [{"prompt": "1+1?", "answer": "2"}]
+    assert len(calls) == 3
+    assert str(calls[0].url) == "http://mock/v1/chat/completions"
+    assert json.loads(calls[0].content)["model"] == client.model
+
+
+def test_client_errors_are_not_retried():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(400, text="bad request")
+
+    client = LLMClient(api_key="k", transport=httpx.MockTransport(handler))
+    with pytest.raises(LLMError) as exc:
+        asyncio.run(client.chat_completion([{"role": "user", "content": "hi"}]))
+    assert exc.value.status_code == 400
+    assert len(calls) == 1
+
+
+def test_gives_up_after_max_retries():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        raise httpx.ConnectError("refused", request=request)
+
+    client = LLMClient(api_key="k", max_retries=2, transport=httpx.MockTransport(handler))
+    with pytest.raises(LLMError):
+        asyncio.run(client.chat_completion([{"role": "user", "content": "hi"}]))
+    assert len(calls) == 3
+
+
+def test_concurrency_is_bounded(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_MAX_CONCURRENCY", 2)
+    active = peak = 0
+
+    async def handler(request):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+        return httpx.Response(200, json=completion("```json\n[]\n```"))
+
+    client = LLMClient(api_key="k", transport=httpx.MockTransport(handler))
+
+    async def run():
+        return await asyncio.gather(*(client.generate_questions("x") for _ in range(6)))
+
+    assert asyncio.run(run()) == [[]] * 6
+    assert peak == 2
+
+
+def test_generation_cache_hits_and_bypass(isolated_generation_cache):
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(200, json=completion(f'[{{"prompt": "q{len(calls)}", "answer": "a"}}]'))
+
+    client = LLMClient(api_key="k", transport=httpx.MockTransport(handler))
+
+    async def run():
+        first = await client.generate_questions("光合作用  发生在叶绿体", num_questions=2)
+        # 仅空白不同的内容命中同一条缓存
+        second = await client.generate_questions("光合作用 发生在叶绿体\n", num_questions=2)
+        other = await client.generate_questions("光合作用 发生在叶绿体", num_questions=3)
+        fresh = await client.generate_questions("光合作用 发生在叶绿体", num_questions=2, bypass_cache=True)
+        return first, second, other, fresh
+
+    first, second, other, fresh = asyncio.run(run())
+    assert first == second == [{"prompt": "q1", "answer": "a"}]
+    assert other[0]["prompt"] == "q2"
+    assert fresh[0]["prompt"] == "q3"
+    assert len(calls) == 3
+    stats = isolated_generation_cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 2
+
+
+def test_generation_cache_lru_ttl_and_persistence(tmp_path, monkeypatch):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = GenerationCache(path=path, maxsize=2, ttl=60)
+    cache.set("a", [1])
+    cache.set("b", [2])
+    assert cache.get("a") == [1]
+    cache.set("c", [3])
+    # b 最久未访问，被淘汰
+    assert cache.get("b") is None
+    cache.close()
+
+    # 重新打开后条目仍在
+    reopened = GenerationCache(path=path, maxsize=2, ttl=60)
+    assert reopened.get("a") == [1]
+    assert reopened.get("c") == [3]
+
+    monkeypatch.setattr("app.llm.cache.time.time", lambda: 10 ** 12)
+    assert reopened.get("a") is None
+    assert reopened.stats()["size"] == 1
+    reopened.close()
+
+
+def test_stream_parser_extracts_and_repairs_items():
+    content = (
+        '好的，以下是题目：\n```json\n{"questions": [\n'
+        '  {"prompt": "水的化学式？", "options": [{"content": "H2O", "is_correct": true}], "answer": "H2O"},\n'
+        '  {"prompt": "含有 } 和 \\" 的题干", "answer": "是",},\n'
+        '  {"prompt": "缺少逗号" "answer": "x"},\n'
+        '  {"prompt": "Python 字面量", "answer": "对", "options": [{"content": "对", "is_correct": True}]},\n'
+        '  {"answer": "没有题干"},\n'
+        '  {"prompt": "被截断的'
+    )
+    parser = QuestionStreamParser(bank_id=1)
+    prompts = []
+    # 逐字符喂入，模拟 token 流
+    for ch in content:
+        prompts.extend(q.prompt for q in parser.feed(ch))
+    parser.close()
+
+    assert prompts == ["水的化学式？", '含有 } 和 " 的题干', "Python 字面量"]
+    assert len(parser.errors) == 3
+    assert extract_json_items('[{"a": 1}, {"b": [2, {"c": 3}]}]') == [{"a": 1}, {"b": [2, {"c": 3}]}]
+    assert extract_json_items('{"prompt": "p", "options": [{"content": "o"}]}\n{"prompt": "q"}') == [
+        {"prompt": "p", "options": [{"content": "o"}]}, {"prompt": "q"}
+    ]
+
+
+def test_stream_questions_yields_before_completion_finishes():
+    produced = []
+
+    async def body():
+        yield b'data: {"choices": [{"delta": {"content": "[{\\"prompt\\": \\"first\\", \\"answer\\": \\"1\\"},"}}]}\n\n'
+        # 第一题应在后续输出到达之前就已产出
+        assert produced == ["first"]
+        yield b'data: {"choices": [{"delta": {"content": " {\\"prompt\\": \\"second\\", \\"answer\\": \\"2\\"}]"}}]}\n\n'
+        yield b"data: [DONE]\n\n"
+
+    def handler(request):
+        assert json.loads(request.content)["stream"] is True
+        return httpx.Response(200, content=body(), headers={"content-type": "text/event-stream"})
+
+    client = LLMClient(api_key="k", transport=httpx.MockTransport(handler))
+
+    async def run():
+        async for question in client.stream_questions("内容", bank_id=7, num_questions=2):
+            assert question.bank_id == 7
+            produced.append(question.prompt)
+        # 完整输出结束后写入缓存，非流式调用直接命中
+        return await client.generate_questions("内容", num_questions=2)
+
+    cached = asyncio.run(run())
+    assert produced == ["first", "second"]
+    assert [q["prompt"] for q in cached] == ["first", "second"]
@@ -0,0 +1,80 @@
+# backend/tests/test_parsing.py
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import update
+
+from app.config import settings
+from app.db.base import SessionLocal
+from app.db.models.file import File
+from app.services.parse_service import ParseService
+from app.services.document_parser import chunk_text, detect_type, estimate_tokens, normalize_text
+
+prefix = settings.API_V1_STR
+
+
+def test_normalize_and_chunk():
+    assert detect_type("a.MD", None) == "markdown"
+    assert detect_type("blob", "text/html; charset=utf-8") == "html"
+    assert detect_type("a.docx", None) is None
+    assert normalize_text("Ｈｅｌｌｏ   world\r\n\n\n\nnext\x00") == "Hello world\n\nnext"
+
+    text = "\n\n".join(["第一段内容。" * 5, "second paragraph " * 20, "短"])
+    chunks = chunk_text(text, 30)
+    assert all(tokens <= 30 for _, tokens in chunks)
+    assert sum(tokens for _, tokens in chunks) == estimate_tokens(text)
+
+
+def test_upload_is_parsed_in_background(client, auth_headers):
+    bank_id = client.post(f"{prefix}/quizzes/banks", headers=auth_headers, json={"name": "parse"}).json()["id"]
+    content = "# 标题\n\n这是**第一段**。\n\n<b>second</b> [link](http://example.com)\n".encode("utf-8")
+    file_id = client.post(
+        f"{prefix}/files/upload/{bank_id}", headers=auth_headers,
+        files={"file": ("notes.md", content, "text/markdown")},
+    ).json()["id"]
+
+    status = client.get(f"{prefix}/files/{file_id}/parse", headers=auth_headers).json()
+    assert status["status"] == "done"
+    assert status["chunk_count"] == 1
+
+    # 相同内容复用解析结果
+    other_id = client.post(
+        f"{prefix}/files/upload/{bank_id}", headers=auth_headers,
+        files={"file": ("copy.md", content, "text/markdown")},
+    ).json()["id"]
+    assert client.get(f"{prefix}/files/{other_id}/parse", headers=auth_headers).json()["status"] == "done"
+
+    unsupported = client.post(
+        f"{prefix}/files/upload/{bank_id}", headers=auth_headers,
+        files={"file": ("image.png", b"\x89PNG", "image/png")},
+    ).json()["id"]
+    assert client.get(f"{prefix}/files/{unsupported}/parse", headers=auth_headers).json()["status"] == "skipped"
+
+
+def test_recover_leaves_files_other_processes_are_parsing(client, auth_headers, run):
+    bank_id = client.post(f"{prefix}/quizzes/banks", headers=auth_headers, json={"name": "recover"}).json()["id"]
+    active, stale = [
+        client.post(
+            f"{prefix}/files/upload/{bank_id}", headers=auth_headers,
+            files={"file": (f"{name}.txt", f"{name} recover content".encode("utf-8"), "text/plain")},
+        ).json()["id"]
+        for name in ("active", "stale")
+    ]
+    now = datetime.now(timezone.utc)
+    db = SessionLocal()
+    try:
+        for file_id, started_at in ((active, now), (stale, now - timedelta(seconds=settings.PARSE_STALE_SECONDS + 1))):
+            db.execute(update(File).where(File.id == file_id).values(parse_status="processing", parse_started_at=started_at))
+        db.commit()
+    finally:
+        db.close()
+
+    async def scenario():
+        await ParseService.recover()
+        await asyncio.gather(*ParseService._tasks)
+
+    run(scenario())
+    status = lambda file_id: client.get(f"{prefix}/files/{file_id}/parse", headers=auth_headers).json()["status"]
+    # 仍在其它进程中解析的文件不被重复排队；超时的重新解析
+    assert status(active) == "processing"
+    assert status(stale) == "done"
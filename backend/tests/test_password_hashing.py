@@ -0,0 +1,98 @@
+# backend/tests/test_password_hashing.py
+import asyncio
+import threading
+import uuid
+
+import pytest
+from fastapi import HTTPException
+from passlib.context import CryptContext
+
+from app.config import settings
+from app.db.base import SessionLocal
+from app.db.models.user import User
+from app.services.password_hasher import PasswordHasher, password_hasher
+
+prefix = settings.API_V1_STR
+
+
+def test_login_rehashes_password_with_configured_cost(client):
+    email = f"rehash_{uuid.uuid4().hex[:12]}@example.com"
+    weak = CryptContext(schemes=["bcrypt"], bcrypt__rounds=4)
+    db = SessionLocal()
+    try:
+        db.add(User(email=email, hashed_password=weak.hash("123456")))
+        db.commit()
+    finally:
+        db.close()
+
+    def stored_hash():
+        db = SessionLocal()
+        try:
+            return db.query(User.hashed_password).filter(User.email == email).scalar()
+        finally:
+            db.close()
+
+    login = lambda password: client.post(f"{prefix}/auth/login", data={"username": email, "password": password})
+    assert login("wrong").status_code == 401
+    assert stored_hash().startswith("$2b$04$")
+
+    assert login("123456").status_code == 200
+    rehashed = stored_hash()
+    assert rehashed.startswith(f"$2b${settings.BCRYPT_ROUNDS:02d}$")
+    assert login("123456").status_code == 200
+    assert stored_hash() == rehashed
+
+
+def test_login_returns_503_when_hash_queue_is_full(client, monkeypatch):
+    monkeypatch.setattr(password_hasher, "_pending", password_hasher.max_pending)
+    response = client.post(f"{prefix}/auth/login", data={"username": "nobody@example.com", "password": "x"})
+    # 不存在的用户不需要计算哈希
+    assert response.status_code == 401
+
+    response = client.post(f"{prefix}/auth/register", json={
+        "email": f"busy_{uuid.uuid4().hex[:12]}@example.com", "password": "123456"
+    })
+    assert response.status_code == 503
+    assert int(response.headers["Retry-After"]) >= 1
+
+
+def test_hasher_admission_is_bounded():
+    hasher = PasswordHasher(workers=1, max_pending=2)
+    release = threading.Event()
+
+    async def scenario():
+        running = [asyncio.ensure_future(hasher.run(release.wait)) for _ in range(2)]
+        await asyncio.sleep(0)
+        with pytest.raises(HTTPException) as rejected:
+            await hasher.run(lambda: None)
+        assert rejected.value.status_code == 503 and "Retry-After" in rejected.value.headers
+        release.set()
+        assert await asyncio.gather(*running) == [True, True]
+        assert hasher.pending == 0
+        assert await hasher.run(lambda: "ok") == "ok"
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        release.set()
+        hasher.shutdown()
+
+
+def test_concurrent_registration_of_same_email_returns_400(client, monkeypatch):
+    email = f"race_{uuid.uuid4().hex[:12]}@example.com"
+    original = password_hasher.hash
+
+    async def hash_while_other_request_registers(password):
+        # 哈希计算期间另一个请求已注册了同一邮箱
+        db = SessionLocal()
+        try:
+            db.add(User(email=email, hashed_password="x"))
+            db.commit()
+        finally:
+            db.close()
+        return await original(password)
+
+    monkeypatch.setattr(password_hasher, "hash", hash_while_other_request_registers)
+    response = client.post(f"{prefix}/auth/register", json={"email": email, "password": "123456"})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "邮箱已被注册"
@@ -0,0 +1,42 @@
+# backend/tests/test_principal_cache.py
+
+from app.config import settings
+from app.services.principal_cache import PrincipalCache, principal_cache
+
+prefix = settings.API_V1_STR
+
+
+def test_cache_ttl_and_lru():
+    cache = PrincipalCache(maxsize=2, ttl=60)
+    cache.set("a@example.com", 1, {"id": 1})
+    cache.set("b@example.com", 1, {"id": 2})
+    assert cache.get("a@example.com", 1) == {"id": 1}
+    cache.set("c@example.com", 1, {"id": 3})
+    # b 最久未使用，被淘汰
+    assert cache.get("b@example.com", 1) is None
+    # 令牌已过期时不缓存
+    cache.set("d@example.com", 1, {"id": 4}, expires_in=-1)
+    assert cache.get("d@example.com", 1) is None
+    cache.invalidate("a@example.com")
+    assert cache.get("a@example.com", 1) is None
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 3
+
+
+def test_current_user_served_from_cache(client, auth_headers):
+    principal_cache.clear()
+    assert client.get(f"{prefix}/users/me", headers=auth_headers).status_code == 200
+    response = client.get(f"{prefix}/users/me", headers=auth_headers)
+    assert response.status_code == 200
+    assert principal_cache.stats()["hits"] == 1
+    assert principal_cache.stats()["misses"] == 1
+
+
+def test_update_user_invalidates_cache(client, auth_headers):
+    client.get(f"{prefix}/users/me", headers=auth_headers)
+    response = client.put(f"{prefix}/users/me", headers=auth_headers, json={"is_active": False})
+    assert response.status_code == 200
+    # 缓存失效后重新查库，禁用状态立即生效
+    response = client.get(f"{prefix}/users/me", headers=auth_headers)
+    assert response.status_code == 400
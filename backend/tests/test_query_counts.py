@@ -0,0 +1,65 @@
+# backend/tests/test_query_counts.py
+import json
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+from app.config import settings
+from app.db.base import engine
+
+prefix = settings.API_V1_STR
+
+
+@contextmanager
+def count_queries():
+    """统计代码块内发出的 SQL 语句数"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def _bank_with_questions(client, headers, n):
+    bank_id = client.post(f"{prefix}/quizzes/banks", headers=headers, json={"name": f"n{n}"}).json()["id"]
+    body = "\n".join(
+        json.dumps({"prompt": f"q{i}", "answer": "a", "options": [
+            {"content": "a", "is_correct": True}, {"content": "b"}
+        ]})
+        for i in range(n)
+    )
+    client.post(f"{prefix}/quizzes/banks/{bank_id}/questions/import", headers=headers, content=body.encode())
+    return bank_id
+
+
+def _query_count(client, headers, url):
+    with count_queries() as statements:
+        response = client.get(url, headers=headers)
+    assert response.status_code == 200
+    return len(statements)
+
+
+def test_query_count_does_not_grow_with_rows(client, auth_headers):
+    small = _bank_with_questions(client, auth_headers, 2)
+    large = _bank_with_questions(client, auth_headers, 20)
+    quiz = lambda bank_id, n: client.post(f"{prefix}/quizzes/quizzes", headers=auth_headers, json={
+        "bank_id": bank_id, "title": "q", "duration_seconds": 60, "question_count": n
+    })
+    # 预热认证缓存
+    client.get(f"{prefix}/users/me", headers=auth_headers)
+
+    for path in ("/quizzes/banks/{}", "/quizzes/banks/{}/questions"):
+        assert _query_count(client, auth_headers, prefix + path.format(small)) == \
+            _query_count(client, auth_headers, prefix + path.format(large))
+
+    with count_queries() as small_quiz:
+        assert quiz(small, 2).status_code == 201
+    with count_queries() as large_quiz:
+        assert quiz(large, 20).status_code == 201
+    # 两次抽题都需要加载题库ID池，语句数只取决于加载策略
+    assert len(small_quiz) == len(large_quiz)
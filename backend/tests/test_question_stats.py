@@ -0,0 +1,111 @@
+# backend/tests/test_question_stats.py
+
+import pytest
+from sqlalchemy import func, select
+
+from app.config import settings
+from app.db.base import AsyncSessionLocal
+from app.db.models.quiz import QuestionStat, QuestionStatFlush
+import app.services.stat_accumulator as stat_module
+from app.services.stat_accumulator import StatAccumulator
+
+prefix = settings.API_V1_STR
+
+
+def _question_ids(client, auth_headers, count):
+    bank_id = client.post(f"{prefix}/quizzes/banks", headers=auth_headers, json={"name": "stats"}).json()["id"]
+    return [
+        client.post(f"{prefix}/quizzes/banks/{bank_id}/questions", headers=auth_headers, json={
+            "bank_id": bank_id, "prompt": f"统计 {i}", "answer": "是"
+        }).json()["id"]
+        for i in range(count)
+    ]
+
+
+async def _stats(question_ids):
+    async with AsyncSessionLocal() as db:
+        return {
+            stat.question_id: (stat.attempts, stat.correct_attempts)
+            for stat in await db.scalars(select(QuestionStat).where(QuestionStat.question_id.in_(question_ids)))
+        }
+
+
+def test_increments_are_batched_and_flushed(client, auth_headers, tmp_path, run):
+    a, b = _question_ids(client, auth_headers, 2)
+    accumulator = StatAccumulator(str(tmp_path / "log"))
+    for _ in range(50):
+        accumulator.record({a: True, b: False})
+    accumulator.record({a: False})
+    assert accumulator.pending() == {a: [51, 50], b: [50, 0]}
+    assert run(_stats([a, b])) == {a: (0, 0), b: (0, 0)}
+
+    async def flush():
+        async with AsyncSessionLocal() as db:
+            flushed = await accumulator.flush(db)
+            remaining = await db.scalar(select(func.count()).select_from(QuestionStatFlush))
+            return flushed, remaining
+
+    assert run(flush()) == (2, 0)
+    assert run(_stats([a, b])) == {a: (51, 50), b: (50, 0)}
+    assert accumulator.pending() == {}
+    assert list((tmp_path / "log").glob("*.log")) == []
+
+
+def test_log_is_replayed_once_after_a_crash(client, auth_headers, tmp_path, run):
+    a, b = _question_ids(client, auth_headers, 2)
+    directory = str(tmp_path / "log")
+
+    crashed = StatAccumulator(directory)
+    crashed.record({a: True, b: True})
+    crashed.record({a: False})
+    # 模拟进程崩溃：没有写回，日志段留在磁盘上，最后一行只写了一半
+    crashed._segment.file.write('{"1":')
+    crashed._segment.file.close()
+
+    # 另一个已写回但来不及删除的段不会被重复累加
+    applied = StatAccumulator(directory)
+    applied.record({b: True})
+
+    async def mark_applied():
+        async with AsyncSessionLocal() as db:
+            await applied._apply(db, applied._segment.deltas, [applied._segment.id])
+        applied._segment.file.close()
+
+    run(mark_applied())
+
+    async def recover():
+        async with AsyncSessionLocal() as db:
+            return await StatAccumulator(directory).recover(db)
+
+    assert run(recover()) == 1
+    assert run(_stats([a, b])) == {a: (2, 1), b: (2, 2)}
+    assert run(recover()) == 0
+    assert run(_stats([a, b])) == {a: (2, 1), b: (2, 2)}
+
+
+def test_new_segment_is_locked_before_recover_can_see_it(tmp_path, monkeypatch):
+    real_fcntl = stat_module.fcntl
+    if real_fcntl is None:
+        pytest.skip("segment locking requires fcntl")
+    directory = tmp_path / "log"
+    visible = []
+
+    class RecordingFcntl:
+        LOCK_EX, LOCK_NB = real_fcntl.LOCK_EX, real_fcntl.LOCK_NB
+
+        @staticmethod
+        def flock(file, operation):
+            # 加锁之前，recover 扫描的 .log 中还没有这个段
+            visible.extend(directory.glob("*.log"))
+            real_fcntl.flock(file, operation)
+
+    monkeypatch.setattr(stat_module, "fcntl", RecordingFcntl)
+    accumulator = StatAccumulator(str(directory))
+    accumulator.record({1: True})
+    assert visible == []
+    assert list(directory.iterdir()) == [accumulator._segment.path]
+
+    # 段已被本进程锁定，其它进程的 recover 无法锁住它
+    with open(accumulator._segment.path, "r+", encoding="utf-8") as other, pytest.raises(OSError):
+        real_fcntl.flock(other, real_fcntl.LOCK_EX | real_fcntl.LOCK_NB)
+    accumulator._segment.close(remove=True)
@@ -0,0 +1,55 @@
+# backend/tests/test_quiz_import.py
+import json
+
+from app.config import settings
+
+prefix = settings.API_V1_STR
+
+
+def _create_bank(client, headers):
+    response = client.post(f"{prefix}/quizzes/banks", headers=headers, json={"name": "import"})
+    assert response.status_code == 201
+    return response.json()["id"]
+
+
+def test_import_jsonl_reports_row_errors(client, auth_headers):
+    bank_id = _create_bank(client, auth_headers)
+    rows = [
+        {"prompt": "1+1=?", "answer": "2", "difficulty": "easy",
+         "options": [{"content": "2", "is_correct": True}, {"content": "3"}]},
+        {"prompt": "缺少答案"},
+        "not json",
+        {"prompt": "2+2=?", "answer": "4", "difficulty": "hard"},
+    ]
+    body = "\n".join(r if isinstance(r, str) else json.dumps(r, ensure_ascii=False) for r in rows)
+    response = client.post(
+        f"{prefix}/quizzes/banks/{bank_id}/questions/import",
+        headers={**auth_headers, "Content-Type": "application/x-ndjson"},
+        content=body.encode("utf-8"),
+    )
+    assert response.status_code == 200
+    result = response.json()
+    assert result["total"] == 4
+    assert result["imported"] == 2
+    assert [e["line"] for e in result["errors"]] == [2, 3]
+
+    questions = client.get(f"{prefix}/quizzes/banks/{bank_id}/questions", headers=auth_headers).json()
+    assert len(questions) == 2
+    first = next(q for q in questions if q["prompt"] == "1+1=?")
+    assert sorted((o["content"], o["is_correct"]) for o in first["options"]) == [("2", True), ("3", False)]
+
+
+def test_import_csv_in_batches(client, auth_headers):
+    bank_id = _create_bank(client, auth_headers)
+    lines = ["prompt,answer,explanation,difficulty,options"]
+    lines += [f'"问题 {i}","{i}",,medium,*{i}|x' for i in range(25)]
+    lines.append('"跨行\n问题","a",,easy,')
+    response = client.post(
+        f"{prefix}/quizzes/banks/{bank_id}/questions/import",
+        headers={**auth_headers, "Content-Type": "text/csv"},
+        content="\n".join(lines).encode("utf-8"),
+    )
+    assert response.status_code == 200
+    result = response.json()
+    assert result["imported"] == 26
+    assert result["failed"] == 0
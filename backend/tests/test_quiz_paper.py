@@ -0,0 +1,84 @@
+# backend/tests/test_quiz_paper.py
+import uuid
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+from app.config import settings
+from app.db.base import SessionLocal, async_engine
+from app.schemas.user import UserCreate
+from app.services.auth_service import AuthService
+
+prefix = settings.API_V1_STR
+
+
+@contextmanager
+def count_queries():
+    """统计代码块内异步引擎发出的 SQL 语句数"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+
+
+def other_taker(client):
+    email = f"taker_{uuid.uuid4().hex[:12]}@example.com"
+    db = SessionLocal()
+    try:
+        AuthService.create_user(db, UserCreate(email=email, password="123456"))
+    finally:
+        db.close()
+    token = client.post(f"{prefix}/auth/login", data={"username": email, "password": "123456"}).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_quiz_paper_is_cached_and_shuffled_per_taker(client, auth_headers):
+    bank_id = client.post(f"{prefix}/quizzes/banks", headers=auth_headers, json={"name": "paper"}).json()["id"]
+    for i in range(10):
+        client.post(f"{prefix}/quizzes/banks/{bank_id}/questions", headers=auth_headers, json={
+            "bank_id": bank_id, "prompt": f"第 {i} 题", "answer": "B", "explanation": "解析",
+            "options": [{"content": "A"}, {"content": "B", "is_correct": True}]
+        })
+    quiz = client.post(f"{prefix}/quizzes/quizzes", headers=auth_headers, json={
+        "bank_id": bank_id, "title": "随堂测验", "duration_seconds": 600, "question_count": 10
+    }).json()
+    url = f"{prefix}/quizzes/quizzes/{quiz['id']}/paper"
+
+    response = client.get(url, headers=auth_headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    paper = response.json()
+    assert (paper["id"], paper["title"], paper["random_order"]) == (quiz["id"], "随堂测验", True)
+    assert len(paper["questions"]) == 10
+    # 试卷不泄露答案
+    assert "answer" not in response.text and "is_correct" not in response.text and "解析" not in response.text
+    assert set(paper["questions"][0]) == {"id", "prompt", "difficulty", "options"}
+
+    # 缓存命中时不访问数据库，同一考生顺序稳定
+    client.get(f"{prefix}/users/me", headers=auth_headers)
+    with count_queries() as statements:
+        again = client.get(url, headers=auth_headers)
+    assert statements == []
+    assert again.content == response.content
+
+    # 其它考生拿到同一组题目的不同排列
+    other = client.get(url, headers=other_taker(client)).json()
+    assert sorted(q["id"] for q in other["questions"]) == sorted(q["id"] for q in paper["questions"])
+    assert [q["id"] for q in other["questions"]] != [q["id"] for q in paper["questions"]]
+
+    # 修改题目后快照失效
+    question_id = paper["questions"][0]["id"]
+    client.put(f"{prefix}/quizzes/questions/{question_id}", headers=auth_headers, json={"prompt": "改过的题目"})
+    prompts = {q["id"]: q["prompt"] for q in client.get(url, headers=auth_headers).json()["questions"]}
+    assert prompts[question_id] == "改过的题目"
+
+    client.delete(f"{prefix}/quizzes/questions/{question_id}", headers=auth_headers)
+    assert question_id not in {q["id"] for q in client.get(url, headers=auth_headers).json()["questions"]}
+
+    assert client.get(f"{prefix}/quizzes/quizzes/0/paper", headers=auth_headers).status_code == 404
@@ -0,0 +1,53 @@
+# backend/tests/test_quiz_sampler.py
+import json
+
+from app.config import settings
+
+prefix = settings.API_V1_STR
+
+
+def _bank_with_questions(client, headers, difficulties):
+    bank_id = client.post(f"{prefix}/quizzes/banks", headers=headers, json={"name": "sampler"}).json()["id"]
+    body = "\n".join(
+        json.dumps({"prompt": f"q{i}", "answer": "a", "difficulty": d})
+        for i, d in enumerate(difficulties)
+    )
+    response = client.post(
+        f"{prefix}/quizzes/banks/{bank_id}/questions/import",
+        headers=headers, content=body.encode("utf-8"),
+    )
+    assert response.json()["imported"] == len(difficulties)
+    return bank_id
+
+
+def _create_quiz(client, headers, bank_id, **kwargs):
+    return client.post(f"{prefix}/quizzes/quizzes", headers=headers, json={
+        "bank_id": bank_id, "title": "quiz", "duration_seconds": 600, **kwargs
+    })
+
+
+def test_create_quiz_samples_distinct_questions(client, auth_headers):
+    bank_id = _bank_with_questions(client, auth_headers, ["easy"] * 10 + ["hard"] * 5)
+    response = _create_quiz(client, auth_headers, bank_id, question_count=8)
+    assert response.status_code == 201
+    quiz_questions = response.json()["quiz_questions"]
+    assert len({qq["question_id"] for qq in quiz_questions}) == 8
+    assert sorted(qq["sequence_index"] for qq in quiz_questions) == list(range(1, 9))
+
+    # 超过题库大小时返回全部问题
+    response = _create_quiz(client, auth_headers, bank_id, question_count=100)
+    assert len(response.json()["quiz_questions"]) == 15
+
+
+def test_create_quiz_stratified_by_difficulty(client, auth_headers):
+    bank_id = _bank_with_questions(client, auth_headers, ["easy"] * 6 + ["medium"] * 2 + ["hard"] * 4)
+    response = _create_quiz(client, auth_headers, bank_id, difficulty_counts={"easy": 3, "hard": 2})
+    assert response.status_code == 201
+    difficulties = [qq["question"]["difficulty"] for qq in response.json()["quiz_questions"]]
+    assert sorted(difficulties) == ["easy"] * 3 + ["hard"] * 2
+
+    response = _create_quiz(client, auth_headers, bank_id, difficulty_counts={"medium": 3})
+    assert response.status_code == 400
+
+    response = _create_quiz(client, auth_headers, bank_id, difficulty_counts={"easy": -1})
+    assert response.status_code == 422
@@ -0,0 +1,118 @@
+# backend/tests/test_retrieval.py
+
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from app.config import settings
+from app.db.base import AsyncSessionLocal
+from app.llm import LLMClient
+from app.llm.retrieval import BankIndex, RetrievalIndex, retrieval_index, tokenize
+
+prefix = settings.API_V1_STR
+
+
+def test_bm25_ranking_and_incremental_updates():
+    assert tokenize("光合作用 C4 Plants 和") == ["c4", "plants", "光合", "合作", "作用", "和"]
+
+    index = BankIndex()
+    index.replace("file:a", ["光合作用在叶绿体中进行", "细胞呼吸发生在线粒体"])
+    index.replace("question:1", ["牛顿第一定律又称惯性定律"])
+    assert [p.source for p in index.search("叶绿体 光合作用", 2)][0] == "file:a"
+    assert index.search("惯性", 1)[0].text == "牛顿第一定律又称惯性定律"
+
+    index.replace("question:1", ["欧姆定律描述电流与电压的关系"])
+    assert index.search("惯性", 3) == []
+    index.remove("file:a")
+    assert len(index) == 1
+    assert index.search("线粒体", 3) == []
+
+
+def test_dense_vectors_are_fused_with_bm25():
+    np = pytest.importorskip("numpy")
+
+    class TopicEmbedder:
+        """把文本映射到两个主题方向的玩具向量模型"""
+        def embed(self, texts):
+            return np.array([[1.0, 0.0] if "植物" in t or "叶" in t else [0.0, 1.0] for t in texts])
+
+    retrieval = RetrievalIndex()
+    retrieval.embedder = TopicEmbedder()
+    index = BankIndex()
+    texts = ["叶绿体把光能转化为化学能", "电流与电压成正比"]
+    index.replace("file:a", texts, retrieval._embed(texts))
+    # 查询词与文档没有共同词，只能靠向量召回
+    results = index.search("植物", 1, retrieval._embed(["植物"])[0])
+    assert results[0].text == "叶绿体把光能转化为化学能"
+
+
+def test_chat_sends_relevant_passages(client, auth_headers, monkeypatch, llm_reply):
+    systems = []
+
+    def handler(request):
+        systems.append(json.loads(request.content)["messages"][0]["content"])
+        return llm_reply(request, "好的")
+
+    monkeypatch.setattr(
+        "app.services.chat_service.LLMClient",
+        lambda: LLMClient(api_key="k", transport=httpx.MockTransport(handler)),
+    )
+    bank_id = client.post(f"{prefix}/quizzes/banks", headers=auth_headers, json={"name": "rag"}).json()["id"]
+    paragraphs = ["线粒体是细胞进行有氧呼吸的主要场所。", "地球绕太阳公转一周约为一年。"]
+    file_id = client.post(
+        f"{prefix}/files/upload/{bank_id}", headers=auth_headers,
+        files={"file": ("notes.txt", "\n\n".join(paragraphs).encode("utf-8"), "text/plain")},
+    ).json()["id"]
+
+    def ask(message):
+        client.post(f"{prefix}/chat/{bank_id}/0", headers=auth_headers, json={"message": message})
+        return systems[-1]
+
+    assert "线粒体是细胞进行有氧呼吸的主要场所" in ask("有氧呼吸在哪里进行？")
+
+    # 索引已加载后新增的问题增量可见
+    client.post(f"{prefix}/quizzes/banks/{bank_id}/questions", headers=auth_headers, json={
+        "bank_id": bank_id, "prompt": "酶的化学本质主要是什么？", "answer": "蛋白质"
+    })
+    assert "酶的化学本质主要是什么" in ask("酶是什么物质")
+
+    client.delete(f"{prefix}/files/{file_id}", headers=auth_headers)
+    assert "线粒体" not in ask("有氧呼吸在哪里进行？")
+
+
+def test_incremental_updates_embed_off_the_event_loop(client, auth_headers, monkeypatch, run):
+    np = pytest.importorskip("numpy")
+    on_loop = []
+
+    class RecordingEmbedder:
+        def embed(self, texts):
+            try:
+                asyncio.get_running_loop()
+                on_loop.append(True)
+            except RuntimeError:
+                on_loop.append(False)
+            return np.ones((len(texts), 2))
+
+    bank_id = client.post(f"{prefix}/quizzes/banks", headers=auth_headers, json={"name": "embed"}).json()["id"]
+    monkeypatch.setattr(retrieval_index, "embedder", RecordingEmbedder())
+
+    async def load():
+        async with AsyncSessionLocal() as db:
+            await retrieval_index.search(db, bank_id, "加载")
+
+    run(load())
+    try:
+        client.post(
+            f"{prefix}/quizzes/banks/{bank_id}/questions/import", headers=auth_headers,
+            content=json.dumps({"prompt": "导入的问题", "answer": "a"}).encode("utf-8"),
+        )
+        client.post(
+            f"{prefix}/files/upload/{bank_id}", headers=auth_headers,
+            files={"file": ("embed.txt", "需要编码的文本块".encode("utf-8"), "text/plain")},
+        )
+    finally:
+        retrieval_index.invalidate(bank_id)
+    # 空题库加载时无需编码；导入问题和文件解析各编码一次，都不在事件循环上
+    assert on_loop == [False, False]
@@ -0,0 +1,124 @@
+# backend/tests/test_search.py
+
+import asyncio
+import uuid
+
+from sqlalchemy import delete
+
+from app.config import settings
+from app.db.base import AsyncSessionLocal, SessionLocal
+from app.db.models.search import QuestionSearch
+from app.schemas.user import UserCreate
+from app.services.auth_service import AuthService
+import app.services.search_service as search_module
+from app.services.search_service import SearchService, highlight
+
+prefix = settings.API_V1_STR
+
+
+def test_highlight():
+    assert highlight("细胞膜的主要成分是磷脂", ["成分"]) == "细胞膜的主要<mark>成分</mark>是磷脂"
+    snippet = highlight("x" * 100 + " <b>Mitochondria</b> " + "y" * 100, ["mitochondria"], length=40)
+    assert snippet.startswith("…") and snippet.endswith("…")
+    assert "&lt;b&gt;<mark>Mitochondria</mark>&lt;/b&gt;" in snippet
+
+
+def test_search_questions(client, auth_headers, run):
+    def create_bank(name, questions):
+        bank_id = client.post(f"{prefix}/quizzes/banks", headers=auth_headers, json={"name": name}).json()["id"]
+        ids = []
+        for question in questions:
+            ids.append(client.post(
+                f"{prefix}/quizzes/banks/{bank_id}/questions", headers=auth_headers,
+                json={"bank_id": bank_id, **question}
+            ).json()["id"])
+        return bank_id, ids
+
+    biology, (cell, photo, enzyme) = create_bank("生物", [
+        {"prompt": "细胞膜的主要成分是什么？", "answer": "磷脂和蛋白质", "difficulty": "easy"},
+        {"prompt": "光合作用的场所是哪里？", "answer": "叶绿体",
+         "explanation": "光合作用把光能转化为化学能，光合作用是植物的基本生命活动", "difficulty": "hard"},
+        {"prompt": "下列哪一项是酶的特性？", "answer": "高效性",
+         "options": [{"content": "高效性", "is_correct": True}, {"content": "Photosynthesis", "is_correct": False}]},
+    ])
+    physics, (newton,) = create_bank("物理", [{"prompt": "牛顿第一定律与光合作用无关", "answer": "惯性"}])
+
+    def search(**params):
+        response = client.get(f"{prefix}/quizzes/questions/search", headers=auth_headers, params=params)
+        assert response.status_code == 200
+        return response.json()
+
+    hits = search(q="光合作用")
+    assert {hit["question"]["id"] for hit in hits} == {photo, newton}
+    assert hits[0]["score"] >= hits[1]["score"]
+    assert all("<mark>光合</mark>" in hit["snippet"] for hit in hits)
+
+    assert [hit["question"]["id"] for hit in search(q="光合作用", bank_id=physics)] == [newton]
+    assert [hit["question"]["id"] for hit in search(q="光合作用", difficulty="hard")] == [photo]
+    # 选项内容、英文大小写
+    assert [hit["question"]["id"] for hit in search(q="photosynthesis")] == [enzyme]
+    # 单字按前缀匹配，所有词都要命中
+    assert [hit["question"]["id"] for hit in search(q="酶")] == [enzyme]
+    assert search(q="细胞膜 叶绿体") == []
+
+    client.put(f"{prefix}/quizzes/questions/{cell}", headers=auth_headers, json={"prompt": "线粒体的功能是什么？"})
+    assert search(q="细胞膜") == []
+    assert [hit["question"]["id"] for hit in search(q="线粒体")] == [cell]
+
+    client.delete(f"{prefix}/quizzes/questions/{newton}", headers=auth_headers)
+    assert [hit["question"]["id"] for hit in search(q="光合作用")] == [photo]
+
+    # 先排序再分页：最新的问题最相关时也要排在第一
+    _, (_, _, best) = create_bank("斑马", [
+        {"prompt": "zebra", "answer": "a " * 40},
+        {"prompt": "zebra", "answer": "b " * 40},
+        {"prompt": "zebra zebra zebra", "answer": "zebra"},
+    ])
+    assert [hit["question"]["id"] for hit in search(q="zebra", limit=1)] == [best]
+
+    # 其他用户的题库不可见
+    email = f"user_{uuid.uuid4().hex[:12]}@example.com"
+    with SessionLocal() as db:
+        AuthService.create_user(db, UserCreate(email=email, password="123456"))
+    token = client.post(f"{prefix}/auth/login", data={"username": email, "password": "123456"}).json()
+    other_headers = {"Authorization": f"Bearer {token['access_token']}"}
+    assert client.get(
+        f"{prefix}/quizzes/questions/search", headers=other_headers, params={"q": "光合作用"}
+    ).json() == []
+
+    # 升级前没有检索文档的问题在启动时补建；多个进程同时补建时不因主键冲突失败
+    async def drop_and_backfill():
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(QuestionSearch).where(QuestionSearch.bank_id == biology))
+            await db.commit()
+
+        async def backfill():
+            async with AsyncSessionLocal() as db:
+                return await SearchService.backfill(db)
+
+        return await asyncio.gather(backfill(), backfill())
+
+    assert sum(run(drop_and_backfill())) >= 3
+    assert [hit["question"]["id"] for hit in search(q="photosynthesis")] == [enzyme]
+
+
+def test_common_words_rank_the_newest_matches(client, auth_headers, monkeypatch):
+    monkeypatch.setattr(search_module, "RANK_CANDIDATES", 3)
+    bank_id = client.post(f"{prefix}/quizzes/banks", headers=auth_headers, json={"name": "上限"}).json()["id"]
+    oldest_best, *rest = [
+        client.post(f"{prefix}/quizzes/banks/{bank_id}/questions", headers=auth_headers, json={
+            "bank_id": bank_id, "prompt": prompt, "answer": "answer"
+        }).json()["id"]
+        for prompt in ["quokka quokka quokka", "quokka one", "quokka two", "quokka three", "quokka four"]
+    ]
+
+    def search(**params):
+        response = client.get(f"{prefix}/quizzes/questions/search", headers=auth_headers, params={
+            "q": "quokka", "bank_id": bank_id, **params
+        })
+        return [hit["question"]["id"] for hit in response.json()]
+
+    # 命中超过上限时只对最新的命中排序，更早的问题翻不到
+    assert sorted(search(limit=10)) == rest[-3:]
+    assert search(skip=3) == []
+    assert oldest_best not in search(limit=10)
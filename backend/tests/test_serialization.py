@@ -0,0 +1,55 @@
+# backend/tests/test_serialization.py
+import json
+from typing import List
+
+import pytest
+from sqlalchemy import select
+
+from app.api import responses
+from app.api.responses import FastJSONResponse, JSONSerializer
+from app.config import settings
+from app.db.base import SessionLocal
+from app.db.models.quiz import QuestionOption
+from app.schemas.quiz import QuestionOptionInDB
+
+prefix = settings.API_V1_STR
+
+
+def test_list_endpoints_use_precompiled_serializers(client, auth_headers):
+    bank_id = client.post(f"{prefix}/quizzes/banks", headers=auth_headers, json={"name": "serialize"}).json()["id"]
+    created = client.post(f"{prefix}/quizzes/banks/{bank_id}/questions", headers=auth_headers, json={
+        "bank_id": bank_id, "prompt": "1 + 1 = ?", "answer": "2", "difficulty": "easy",
+        "options": [{"content": "1"}, {"content": "2", "is_correct": True}]
+    }).json()
+
+    questions = client.get(f"{prefix}/quizzes/banks/{bank_id}/questions", headers=auth_headers).json()
+    assert questions == [created]
+    bank = client.get(f"{prefix}/quizzes/banks/{bank_id}", headers=auth_headers).json()
+    assert bank["name"] == "serialize" and bank["questions"] == [created]
+    banks = client.get(f"{prefix}/quizzes/banks?view=full&limit=500", headers=auth_headers).json()
+    assert [b["questions"] for b in banks if b["id"] == bank_id] == [[created]]
+
+    # Row 元组可直接校验
+    db = SessionLocal()
+    try:
+        rows = db.execute(select(
+            QuestionOption.id, QuestionOption.question_id, QuestionOption.content, QuestionOption.is_correct
+        ).where(QuestionOption.question_id == created["id"]).order_by(QuestionOption.id)).all()
+    finally:
+        db.close()
+    assert json.loads(JSONSerializer(List[QuestionOptionInDB]).dump(rows)) == created["options"]
+
+
+def test_fast_json_response_with_and_without_orjson(monkeypatch):
+    assert FastJSONResponse(b'{"a":1}').body == b'{"a":1}'
+    content = {"名称": [1, None], 2: True}
+    expected = {"名称": [1, None], "2": True}
+
+    orjson = pytest.importorskip("orjson")
+    assert responses.orjson is orjson
+    assert FastJSONResponse(content).body == orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    assert json.loads(FastJSONResponse(content).body) == expected
+
+    # 未安装 orjson 时退回标准库，结果相同
+    monkeypatch.setattr(responses, "orjson", None)
+    assert json.loads(FastJSONResponse(content).body) == expected